@@ -0,0 +1,395 @@
+"""
+Headless-Einstieg ohne Qt (z. B. auf dem Proxmox-Host, per cron oder Skript).
+
+    python -m sshupdater.cli check --all
+    python -m sshupdater.cli sim --tag web --ndjson
+    python -m sshupdater.cli upgrade --name ct-101 --name ct-102 --concurrency 4
+    python -m sshupdater.cli daemon --interval 60 --ndjson
+
+Master-Passwort (nur für Hosts mit Passwort-Auth nötig): Umgebungsvariable
+SSHUPDATER_MASTER_PASSWORD, --password-file oder interaktive Abfrage.
+"""
+from __future__ import annotations
+import argparse, asyncio, getpass, json, logging, os, signal, sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sshupdater import __version__
+from sshupdater.core import db, crypto, ssh_client, executor, cache, probe, reach, timeouts, reboot, eta, breaker
+from sshupdater.core.scheduler import Scheduler
+
+# ---------- Hostauswahl / Vault ----------
+
+def _select_hosts(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    hosts = db.list_hosts()
+    if args.all:
+        return hosts
+    ids = set(args.id or [])
+    names = set(args.name or [])
+    tags = set(args.tag or [])
+    sel = []
+    for h in hosts:
+        try:
+            host_tags = set(json.loads(h.get("tags_json") or "[]"))
+        except ValueError:
+            host_tags = set()
+        if h["id"] in ids or h.get("name") in names or host_tags & tags:
+            sel.append(h)
+    return sel
+
+def _unlock_vault(hosts: List[Dict[str, Any]], password_file: Optional[str]) -> None:
+    """Vault nur entsperren, wenn ein ausgewählter Host Passwort-Auth nutzt."""
+    if not any(h.get("auth_method") == "password" for h in hosts):
+        return
+    if not crypto.keystore_exists():
+        raise SystemExit("Kein Keystore vorhanden – bitte zuerst die GUI einrichten.")
+    pw = os.environ.get("SSHUPDATER_MASTER_PASSWORD")
+    if not pw and password_file:
+        with open(password_file, encoding="utf-8") as f:
+            pw = f.readline().rstrip("\n")
+    if not pw and sys.stdin.isatty():
+        pw = getpass.getpass("Master-Passwort: ")
+    if not pw:
+        raise SystemExit("Master-Passwort fehlt (SSHUPDATER_MASTER_PASSWORD / --password-file).")
+    try:
+        crypto.set_master_password(pw)
+    except crypto.WrongPassword as e:
+        raise SystemExit(str(e))
+
+# ---------- Ausgabe ----------
+
+class _Output:
+    """text: lesbare Zeilen, json: ein Array am Ende, ndjson: ein Event pro Zeile (sofort)."""
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.results: List[Dict[str, Any]] = []
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        if self.fmt == "ndjson":
+            print(json.dumps(event, ensure_ascii=False, default=str), flush=True)
+        elif self.fmt == "json":
+            if event["event"] == "result":
+                self.results.append(event)
+        else:
+            line = _render_text(event)
+            if line:
+                print(line, flush=True)
+
+    def finish(self, summary: Dict[str, Any]) -> None:
+        if self.fmt == "json":
+            print(json.dumps({"results": self.results, **summary}, ensure_ascii=False, indent=2, default=str))
+        else:
+            self.emit({"event": "done", **summary})
+
+def _render_text(ev: Dict[str, Any]) -> str:
+    name = ev.get("name", "?")
+    if ev["event"] == "line":
+        return f"{name}: {ev['line']}"
+    if ev["event"] == "stall":
+        text = f"⏸ {name}: seit {ev['idle']} s keine Ausgabe" + (f" – {ev['hint']}" if ev.get("hint") else "")
+        if ev.get("last_line"):
+            text += f"\n    letzte Zeile: {ev['last_line']}"
+        return text + "".join(f"\n    {p}" for p in ev.get("tree") or [])
+    if ev["event"] == "resumed":
+        return f"▶ {name}: Ausgabe läuft wieder"
+    if ev["event"] == "overdue":
+        return f"⏱ {name}: läuft länger als erwartet (> {eta.describe(ev['limit'])}) – kein Abbruch"
+    if ev["event"] == "progress":
+        return ""  # im Text stehen die Zeilen selbst; Fortschritt nur als ndjson-Event
+    if ev["event"] == "done":
+        text = f"\nFertig: {ev['ok']} ok, {ev['errors']} Fehler."
+        if ev.get("eta") is not None:
+            text += f" Geschätzte Upgrade-Dauer: {eta.describe(ev['eta'])} (max. {ev['concurrency']} parallel)."
+        return text
+    if ev.get("status") != "ok":
+        return f"✖ {name}: {ev.get('note', 'Fehler')}"
+    op = ev["op"]
+    cached = " (Cache)" if ev.get("cache_age") is not None else ""
+    if op == "check":
+        return f"✔ {name} [{ev.get('distro', '?')}]: {ev.get('updates', 0)} Updates{cached}"
+    if op == "sim":
+        duration = f", Dauer {eta.describe(ev['eta'])}" if ev.get("eta") is not None else ""
+        return f"🧪 {name} [{ev.get('distro', '?')}]: {ev.get('packages', 0)} Pakete geplant{duration}{cached}"
+    if op == "clean-sim":
+        return f"🧪 {name}: {ev.get('packages', 0)} Pakete würden entfernt.{cached}"
+    if op == "upgrade":
+        return f"✅ {name}: Upgrade abgeschlossen ({ev.get('distro', '?')}).{ssh_client.needs_note(ev)}"
+    if op == "clean":
+        return f"✅ {name}: Autoremove abgeschlossen."
+    if op == "restart":
+        return f"♻ {name}: {ev.get('note', '')}"
+    if op == "reach":
+        return f"✔ {name}: erreichbar über {ev.get('ip')} ({ev.get('rtt_ms')} ms){' – ' + ev['banner'] if ev.get('banner') else ''}"
+    if "downtime" in ev:
+        return f"✅ {name}: {ev['note']}"
+    return f"🔁 {name}: {ev.get('note', 'Reboot ausgelöst')}"
+
+# ---------- Ausführung ----------
+
+def _persist(op: str, res: Dict[str, Any]) -> None:
+    """Ergebnisse wie die GUI in der DB ablegen."""
+    hid = res.get("host_id")
+    if hid is None or res.get("breaker"):
+        return  # gesperrt = nicht geprüft, letzte Prüfung bleibt stehen
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if op == "check" and res.get("cache_age") is None:
+        ok = res.get("status") == "ok"
+        db.set_check_result(hid, ts, int(res.get("updates", 0)) if ok else None, res.get("fingerprint") if ok else None)
+    elif op == "upgrade":
+        cache.invalidate(hid)
+        if res.get("status") == "ok":
+            db.set_check_result(hid, ts, 0)
+    elif op in ("clean", "reboot"):
+        cache.invalidate(hid)
+
+def _job_for(op: str, args: argparse.Namespace):
+    if op == "check":
+        def check(h):
+            return ssh_client.check_updates_for_host(h, refresh=args.refresh, force=args.force)
+        return cache.cached_job(cache.check_op(args.refresh), check, force=args.force)
+    if op == "sim":
+        def sim(h):
+            return ssh_client.simulate_upgrade_for_host(h, refresh=args.refresh)
+        return cache.cached_job("sim", sim, force=args.force)
+    if op == "clean-sim":
+        return cache.cached_job("clean-sim", ssh_client.simulate_autoremove_for_host, force=args.force)
+    if op == "upgrade":
+        return ssh_client.upgrade_host_stream
+    if op == "restart":
+        def restart(h):
+            return ssh_client.restart_services_for_host(h, dry_run=args.dry_run)
+        return restart
+    if op == "clean":
+        return ssh_client.autoremove_host_stream
+    return ssh_client.reboot_host
+
+# Befehlsart (timeouts.KINDS) je Operation -> FanOut startet lange Hosts zuerst
+_KINDS = {"check": "check", "sim": "sim", "clean-sim": "sim", "upgrade": "upgrade",
+          "clean": "autoremove", "restart": "restart"}
+
+async def _items(op: str, args: argparse.Namespace, hosts: List[Dict[str, Any]]):
+    if op == "reboot":
+        # Reboot (ggf. mit Warten) hat eigene Phasen; "triggered" wird als Zeile gemeldet
+        async for h, res in reboot.reboot_fleet(hosts, wait=args.wait, deadline=args.deadline,
+                                                limit=args.concurrency, force=args.force, fast=args.fast):
+            if res.get("stage") == "triggered":
+                yield h, {"type": "line", "line": f"{res.get('note', 'Reboot ausgelöst')} – warte auf Rückkehr …"}
+            else:
+                yield h, res
+        return
+    fan = executor.FanOut(hosts, _job_for(op, args), limit=args.concurrency, force=args.force, kind=_KINDS.get(op))
+    async for h, item in fan:
+        if isinstance(item, dict) and item.get("type") == "stall" and getattr(args, "abort_stalled", False):
+            fan.cancel(h["id"])
+        yield h, item
+
+async def _run(op: str, args: argparse.Namespace, hosts: List[Dict[str, Any]], out: _Output) -> Dict[str, Any]:
+    counts: Dict[str, Any] = {"ok": 0, "errors": 0}
+    etas: List[float] = []
+    try:
+        async for h, item in _items(op, args, hosts):
+            base = {"op": op, "host_id": h["id"], "name": h.get("name") or "?"}
+            if isinstance(item, breaker.BreakerOpen):
+                res = {**executor.error_result(h, str(item)), "breaker": True}
+            elif isinstance(item, Exception):
+                res = executor.error_result(h, str(item))
+            elif isinstance(item, dict) and item.get("type") == "line":
+                out.emit({"event": "line", **base, "line": item["line"]})
+                continue
+            elif isinstance(item, dict) and item.get("type") in ("stall", "resumed", "progress", "overdue"):
+                ev = {k: v for k, v in item.items() if k not in ("type", "host_id")}
+                out.emit({"event": item["type"], **base, **ev})
+                continue
+            elif isinstance(item, dict) and item.get("type") == "result":
+                res = item.get("result") or {}
+            else:
+                res = item
+            res = {**res, **base}
+            if op == "sim" and res.get("status") == "ok":
+                if res.get("eta") is None:  # Cache-Eintrag von vor der ETA-Historie
+                    res["eta"] = eta.predict(h["id"], res.get("distro"), int(res.get("packages") or 0),
+                                             res.get("download_bytes"))
+                etas.append(res["eta"])
+            _persist(op, res)
+            counts["ok" if res.get("status") == "ok" else "errors"] += 1
+            out.emit({"event": "result", **res})
+    finally:
+        await ssh_client.get_pool().close_all()
+    if etas:
+        # Gesamtdauer eines Upgrades mit derselben Parallelität
+        counts["concurrency"] = args.concurrency or executor.concurrency_limit()
+        counts["eta"] = eta.makespan(etas, counts["concurrency"])
+    return counts
+
+async def _reach(args: argparse.Namespace, hosts: List[Dict[str, Any]], out: _Output) -> Dict[str, int]:
+    counts = {"ok": 0, "errors": 0}
+    results = await reach.probe_hosts(hosts, banner=args.banner or reach.banner_enabled())
+    for h in hosts:
+        r = results.get(h["id"]) or {"ok": False, "error": "IP fehlt"}
+        res = {"op": "reach", "host_id": h["id"], "name": h.get("name") or "?",
+               "status": "ok" if r["ok"] else "error", "note": f"Offline – {r.get('error')}",
+               "ip": r.get("ip"), "rtt_ms": r.get("rtt_ms"), "banner": r.get("banner")}
+        if r["ok"]:
+            del res["note"]
+        counts["ok" if r["ok"] else "errors"] += 1
+        out.emit({"event": "result", **res})
+    return counts
+
+def _timeouts(args: argparse.Namespace, hosts: List[Dict[str, Any]]) -> int:
+    """Gelernte Timeouts anzeigen bzw. manuell setzen/zurücksetzen."""
+    for spec in args.set or []:
+        kind, _, sec = spec.partition("=")
+        if kind not in timeouts.KINDS:
+            raise SystemExit(f"Unbekannte Art '{kind}' (erlaubt: {', '.join(timeouts.KINDS)})")
+        try:
+            value = float(sec)
+        except ValueError:
+            raise SystemExit(f"Ungültige Sekunden in '{spec}'")
+        for h in hosts:
+            db.set_timeout_override(h["id"], kind, value)
+    for kind in args.clear or []:
+        kinds = list(timeouts.KINDS) if kind == "all" else [kind]
+        for h in hosts:
+            for k in kinds:
+                db.set_timeout_override(h["id"], k, None)
+
+    names = {h["id"]: h.get("name") or "?" for h in hosts}
+    rows = [r for r in timeouts.overview() if r["host_id"] in names]
+    for r in rows:
+        r["name"] = names[r["host_id"]]
+    if args.fmt == "json":
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    elif args.fmt == "ndjson":
+        for r in rows:
+            print(json.dumps(r, ensure_ascii=False))
+    else:
+        fmt = "{:<20} {:<11} {:>5} {:>8} {:>8} {:>8} {:>8}"
+        print(fmt.format("Host", "Art", "n", "p99", "gelernt", "manuell", "wirksam"))
+        for r in rows:
+            cells = [r["p99"], r["learned"], r["override"], r["effective"]]
+            print(fmt.format(r["name"][:20], r["kind"], r["samples"],
+                             *("–" if v is None else f"{v:g}" for v in cells)))
+    return 0
+
+async def _daemon(args: argparse.Namespace, out: _Output) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Strg+C beendet per KeyboardInterrupt
+
+    def on_result(res: Dict[str, Any]) -> None:
+        out.emit({"event": "result", "op": "check", **res})
+
+    sched = Scheduler(interval=args.interval * 60 if args.interval else None,
+                      jitter=args.jitter, limit=args.concurrency, on_result=on_result)
+    try:
+        await sched.run(stop)
+    finally:
+        await ssh_client.get_pool().close_all()
+
+# ---------- Argumente ----------
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="sshupdater", description="SSH Updater – headless")
+    p.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    p.add_argument("-v", "--verbose", action="store_true", help="SSH-Log auf stderr")
+    sub = p.add_subparsers(dest="op", required=True)
+
+    def add_common(sp: argparse.ArgumentParser) -> None:
+        sel = sp.add_argument_group("Hostauswahl")
+        sel.add_argument("--all", action="store_true", help="alle Hosts")
+        sel.add_argument("--id", type=int, action="append", help="Host-ID (mehrfach möglich)")
+        sel.add_argument("--name", action="append", help="Hostname (mehrfach möglich)")
+        sel.add_argument("--tag", action="append", help="Tag (mehrfach möglich)")
+        sp.add_argument("--concurrency", type=int, default=None, help="max. parallele Hosts")
+        fmt = sp.add_mutually_exclusive_group()
+        fmt.add_argument("--json", dest="fmt", action="store_const", const="json", help="JSON am Ende")
+        fmt.add_argument("--ndjson", dest="fmt", action="store_const", const="ndjson", help="ein JSON-Event pro Zeile")
+        sp.add_argument("--password-file", help="Datei mit Master-Passwort (erste Zeile)")
+        sp.add_argument("--force", action="store_true", help="Cache und Sperre (Circuit Breaker) ignorieren")
+        sp.set_defaults(fmt="text")
+
+    for op, text in (("check", "Updates prüfen"), ("sim", "Upgrade simulieren")):
+        sp = sub.add_parser(op, help=text)
+        add_common(sp)
+        sp.add_argument("--refresh", choices=probe.REFRESH_MODES, default=None, help="Index-Refresh (Standard: Setting)")
+
+    sp = sub.add_parser("upgrade", help="Upgrade ausführen")
+    add_common(sp)
+    sp.add_argument("--abort-stalled", action="store_true", help="Hosts ohne Ausgabe (Setting 'stall_idle') abbrechen")
+    sp = sub.add_parser("clean", help="autoremove --purge (Debian)")
+    add_common(sp)
+    sp.add_argument("--abort-stalled", action="store_true", help="Hosts ohne Ausgabe (Setting 'stall_idle') abbrechen")
+    sp.add_argument("--dry-run", action="store_true", help="nur simulieren")
+    sp = sub.add_parser("reboot", help="Reboot auslösen")
+    add_common(sp)
+    sp.add_argument("--wait", action="store_true", help="warten, bis die Hosts zurück sind (Downtime messen)")
+    sp.add_argument("--deadline", type=float, default=None, help="max. Wartezeit in Sekunden (Standard: Setting)")
+    sp.add_argument("--fast", action="store_true", help="per kexec neu starten (ohne Firmware/POST), sonst normaler Reboot")
+    sp.add_argument("--only-required", action="store_true",
+                    help="nur Hosts mit gemeldetem Neustart-Bedarf (reboot-required/needrestart)")
+    sp = sub.add_parser("restart", help="nur betroffene Dienste neu starten (needrestart/needs-restarting)")
+    add_common(sp)
+    sp.add_argument("--dry-run", action="store_true", help="nur Bedarf anzeigen")
+
+    sp = sub.add_parser("reach", help="nur TCP-Erreichbarkeit prüfen (kein SSH)")
+    add_common(sp)
+    sp.add_argument("--banner", action="store_true", help="SSH-Banner lesen")
+
+    sp = sub.add_parser("timeouts", help="gelernte Timeouts anzeigen/überschreiben")
+    add_common(sp)
+    sp.add_argument("--set", action="append", metavar="ART=SEK", help="manuelles Timeout setzen (z. B. upgrade=5400)")
+    sp.add_argument("--clear", action="append", metavar="ART", help="manuelles Timeout entfernen ('all' = alle)")
+
+    sp = sub.add_parser("daemon", help="alle Hosts dauerhaft periodisch prüfen")
+    sp.add_argument("--interval", type=float, default=None, help="Prüfintervall je Host in Minuten (Standard: Setting)")
+    sp.add_argument("--jitter", type=float, default=None, help="Jitter als Anteil des Intervalls, 0–0.5")
+    sp.add_argument("--concurrency", type=int, default=None, help="max. parallele Prüfungen")
+    sp.add_argument("--ndjson", dest="fmt", action="store_const", const="ndjson", help="ein JSON-Event pro Zeile")
+    sp.add_argument("--password-file", help="Datei mit Master-Passwort (erste Zeile)")
+    sp.set_defaults(fmt="text")
+    return p
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not args.verbose:
+        logging.getLogger("asyncssh").setLevel(logging.WARNING)
+    db.init_db()
+    if args.op == "daemon":
+        _unlock_vault(db.list_hosts(), args.password_file)
+        try:
+            asyncio.run(_daemon(args, _Output(args.fmt)))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if not (args.all or args.id or args.name or args.tag):
+        if args.op in ("check", "sim", "reach", "timeouts") or (args.op in ("clean", "restart") and args.dry_run):
+            args.all = True
+        else:
+            raise SystemExit(f"'{args.op}' verändert Hosts – bitte --all oder eine Auswahl angeben.")
+    hosts = _select_hosts(args)
+    if not hosts:
+        raise SystemExit("Keine passenden Hosts.")
+    if args.op == "reboot" and args.only_required:
+        hosts = [h for h in hosts if h.get("reboot_required")]
+        if not hosts and args.fmt == "text":
+            print("Kein ausgewählter Host meldet Neustart-Bedarf.")
+    if args.op == "timeouts":
+        return _timeouts(args, hosts)
+    out = _Output(args.fmt)
+    if args.op == "reach":
+        op = "reach"
+        counts = asyncio.run(_reach(args, hosts, out))
+    else:
+        _unlock_vault(hosts, args.password_file)
+        op = "clean-sim" if args.op == "clean" and args.dry_run else args.op
+        counts = asyncio.run(_run(op, args, hosts, out))
+    out.finish({"op": op, **counts})
+    return 0 if counts["errors"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
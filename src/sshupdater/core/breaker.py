@@ -0,0 +1,64 @@
+from __future__ import annotations
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+from . import db
+from .settings import BREAKER_THRESHOLD, BREAKER_BASE, BREAKER_MAX
+
+class BreakerOpen(Exception):
+    """Host ist nach wiederholten Verbindungsfehlern vorübergehend gesperrt."""
+
+def _setting_int(key: str, default: int) -> int:
+    try:
+        return int(db.get_setting(key, default))
+    except (TypeError, ValueError):
+        return default
+
+def threshold() -> int:
+    """Fehler in Folge, ab denen gesperrt wird (Setting 'breaker_threshold', 0 = aus)."""
+    return max(0, _setting_int("breaker_threshold", BREAKER_THRESHOLD))
+
+def backoff(fail_count: int) -> float:
+    """Sperrdauer: BREAKER_BASE, danach je weiterem Fehler verdoppelt, max. BREAKER_MAX."""
+    n = max(0, fail_count - threshold())
+    return float(min(_setting_int("breaker_max", BREAKER_MAX), _setting_int("breaker_base", BREAKER_BASE) * 2 ** min(n, 20)))
+
+def is_open(host: Dict[str, Any], now: Optional[float] = None) -> bool:
+    if threshold() == 0:
+        return False
+    until = host.get("breaker_until")
+    return bool(until) and until > (now or time.time())
+
+def describe(host: Dict[str, Any]) -> Optional[str]:
+    """Kurztext für Tabelle/Log, None wenn geschlossen."""
+    if not is_open(host):
+        return None
+    until = datetime.fromtimestamp(host["breaker_until"]).strftime("%H:%M")
+    return f"Gesperrt bis {until} ({host.get('fail_count') or 0} Fehler)"
+
+def check(host: Dict[str, Any]) -> None:
+    """Wirft BreakerOpen, solange das Sperrfenster läuft."""
+    text = describe(host)
+    if text:
+        raise BreakerOpen(f"{text} – erzwingen zum Umgehen")
+
+def record_failure(host: Dict[str, Any]) -> None:
+    """Verbindungsfehler zählen; ab der Schwelle öffnet die Sicherung mit wachsendem Fenster."""
+    if host.get("id") is None:
+        return
+    now = time.time()
+    count = int(host.get("fail_count") or 0) + 1
+    limit = threshold()
+    until = now + backoff(count) if limit and count >= limit else None
+    db.set_breaker(host["id"], count, now, until)
+    host.update(fail_count=count, last_fail=now, breaker_until=until)
+
+def record_success(host: Dict[str, Any]) -> None:
+    """Erfolgreiche Verbindung schließt die Sicherung (nur schreiben, wenn nötig)."""
+    if host.get("id") is None or not (host.get("fail_count") or host.get("breaker_until")):
+        return
+    db.set_breaker(host["id"], 0, host.get("last_fail"), None)
+    host.update(fail_count=0, breaker_until=None)
+
+def reset(host_id: int) -> None:
+    db.set_breaker(host_id, 0, None, None)
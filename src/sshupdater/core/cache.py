@@ -0,0 +1,47 @@
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict
+from . import db, probe
+from .settings import RESULT_TTL
+
+# Nur lesende Operationen werden gecacht (Checks je Refresh-Modus, siehe check_op)
+OPS = ("check", "sim", "clean-sim")
+
+def check_op(refresh: str | None = None) -> str:
+    """
+    Cache-Schlüssel eines Checks inkl. Refresh-Modus ('check:auto' …): ein Ergebnis
+    ohne Index-Refresh ('never') darf keinen Check mit 'always' bedienen.
+    """
+    mode = refresh or db.get_setting("refresh_mode", "auto")
+    return f"check:{mode if mode in probe.REFRESH_MODES else 'auto'}"
+
+def result_ttl() -> float:
+    try:
+        return float(db.get_setting("result_ttl", RESULT_TTL))
+    except (TypeError, ValueError):
+        return RESULT_TTL
+
+def cached_job(op: str, fn: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]], *, force: bool = False, ttl: float | None = None):
+    """
+    Verpackt einen Host-Job (z. B. ssh_client.check_updates_for_host) mit Cache:
+    Liegt ein erfolgreiches Ergebnis jünger als `ttl` vor, wird es ohne SSH
+    geliefert (mit 'cache_age' in Sekunden). force=True fragt immer neu ab.
+    """
+    ttl = result_ttl() if ttl is None else ttl
+
+    async def job(host: Dict[str, Any]) -> Dict[str, Any]:
+        if not force and ttl > 0:
+            hit = db.get_result(host["id"], op, ttl)
+            if hit is not None:
+                res, age = hit
+                res["cache_age"] = age
+                return res
+        res = await fn(host)
+        if res.get("status") == "ok":
+            db.put_result(host["id"], op, res)
+        return res
+
+    return job
+
+def invalidate(host_id: int) -> None:
+    """Nach Änderungen am Host (Upgrade, Autoremove, Reboot) alle Einträge verwerfen."""
+    db.clear_results(host_id)
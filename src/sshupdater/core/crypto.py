@@ -1,7 +1,7 @@
 from __future__ import annotations
 import os, base64
 from pathlib import Path
-from typing import Optional
+from typing import Callable, List, Optional
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives import hashes
 from cryptography.fernet import Fernet, InvalidToken
@@ -11,6 +11,8 @@ from .settings import DATA_DIR
 
 _SALT_PATH = DATA_DIR / "vault.salt"
 _FERNET: Optional[Fernet] = None
+# Aufräumfunktionen für entschlüsselte Daten (z. B. Passwort-Cache), siehe lock()
+_LOCK_HOOKS: List[Callable[[], None]] = []
 
 # NEU:
 class WrongPassword(Exception):
@@ -71,6 +73,21 @@ def set_master_password(password: str) -> None:
 def is_unlocked() -> bool:
     return _FERNET is not None
 
+def on_lock(hook: Callable[[], None]) -> None:
+    """hook wird bei lock() aufgerufen, um zwischengespeicherte Klartexte zu verwerfen."""
+    if hook not in _LOCK_HOOKS:
+        _LOCK_HOOKS.append(hook)
+
+def lock() -> None:
+    """Vault sperren: Schlüssel vergessen und alle entschlüsselten Caches leeren."""
+    global _FERNET
+    _FERNET = None
+    for hook in _LOCK_HOOKS:
+        try:
+            hook()
+        except Exception:
+            pass
+
 def encrypt_str(value: str) -> bytes:
     """Gibt einen Fernet-Token (bytes) zurück."""
     if not is_unlocked():
@@ -1,8 +1,8 @@
 from __future__ import annotations
-import json, sqlite3
+import atexit, json, sqlite3, threading, time
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-from .settings import DB_PATH
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .settings import DB_PATH, CREDENTIAL_TTL
 from . import crypto
 
 def _connect() -> sqlite3.Connection:
@@ -50,9 +50,72 @@ def init_db() -> None:
         FOREIGN KEY(host_id) REFERENCES hosts(id)
     );
     """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS results (
+        host_id INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        ts REAL NOT NULL,
+        result_json TEXT NOT NULL,
+        PRIMARY KEY(host_id, op),
+        FOREIGN KEY(host_id) REFERENCES hosts(id)
+    );
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS durations (
+        host_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        ts REAL NOT NULL,
+        seconds REAL NOT NULL,
+        FOREIGN KEY(host_id) REFERENCES hosts(id)
+    );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_durations_host_kind ON durations(host_id, kind, ts)")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS timeouts (
+        host_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        learned REAL,
+        override REAL,
+        PRIMARY KEY(host_id, kind),
+        FOREIGN KEY(host_id) REFERENCES hosts(id)
+    );
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS upgrade_runs (
+        host_id INTEGER NOT NULL,
+        distro TEXT NOT NULL,
+        ts REAL NOT NULL,
+        packages INTEGER NOT NULL,
+        download_bytes INTEGER,
+        seconds REAL NOT NULL,
+        FOREIGN KEY(host_id) REFERENCES hosts(id)
+    );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_upgrade_runs_distro ON upgrade_runs(distro, host_id, ts)")
+    _ensure_columns(cur, "hosts", _HOST_EXTRA_COLUMNS)
     con.commit()
     con.close()
 
+# Spalten, die nach dem ersten Release dazugekommen sind (Migration bestehender DBs)
+_HOST_EXTRA_COLUMNS = {
+    "caps_json": "TEXT",
+    "caps_ts": "REAL",
+    "state_fp": "TEXT",
+    "last_good_ip": "TEXT",
+    "fail_count": "INTEGER DEFAULT 0",
+    "last_fail": "REAL",
+    "breaker_until": "REAL",
+    "reboot_required": "INTEGER DEFAULT 0",
+    "restart_json": "TEXT",
+    "needs_ts": "REAL",
+}
+
+def _ensure_columns(cur: sqlite3.Cursor, table: str, columns: Dict[str, str]) -> None:
+    have = {r[1] for r in cur.execute(f"PRAGMA table_info({table})")}
+    for name, decl in columns.items():
+        if name not in have:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
 # -------- Settings DAO --------
 
 def set_setting(key: str, value: Any) -> None:
@@ -116,6 +179,8 @@ def add_or_update_host(
         host_id = cur.lastrowid
 
     con.commit(); con.close()
+    if password_enc is not None:
+        clear_password_cache(host_id)
     return host_id
 
 def list_hosts() -> List[Dict[str, Any]]:
@@ -137,21 +202,261 @@ def set_host_password(host_id: int, password_plain: str) -> None:
     token = crypto.encrypt_str(password_plain)
     con.execute("UPDATE hosts SET password_enc=? WHERE id=?", (token, host_id))
     con.commit(); con.close()
+    clear_password_cache(host_id)
+
+# -------- Passwort-Cache (entschlüsselt, nur im Speicher) --------
+# host_id -> (Ablaufzeit, Klartext). Wird bei crypto.lock() und Programmende verworfen;
+# Python-Strings lassen sich nicht sicher überschreiben, es werden nur die Referenzen gelöscht.
+_PW_CACHE: Dict[int, Tuple[float, Optional[str]]] = {}
+_PW_LOCK = threading.Lock()
+
+def _credential_ttl() -> float:
+    try:
+        return float(get_setting("credential_ttl", CREDENTIAL_TTL))
+    except (TypeError, ValueError):
+        return CREDENTIAL_TTL
+
+def clear_password_cache(host_id: Optional[int] = None) -> None:
+    with _PW_LOCK:
+        if host_id is None:
+            _PW_CACHE.clear()
+        else:
+            _PW_CACHE.pop(host_id, None)
+
+crypto.on_lock(clear_password_cache)
+atexit.register(clear_password_cache)
+
+def prefetch_host_passwords(host_ids: Iterable[int]) -> None:
+    """Passwörter mehrerer Hosts mit einer Abfrage laden und entschlüsseln (vor einem Lauf)."""
+    ttl = _credential_ttl()
+    now = time.monotonic()
+    with _PW_LOCK:
+        missing = [i for i in set(host_ids) if i not in _PW_CACHE or _PW_CACHE[i][0] <= now]
+    if not missing or ttl <= 0 or not crypto.is_unlocked():
+        return
+    con = _connect()
+    rows = con.execute(
+        f"SELECT id, password_enc FROM hosts WHERE id IN ({','.join('?' * len(missing))})", missing
+    ).fetchall()
+    con.close()
+    found: Dict[int, Tuple[float, Optional[str]]] = {}
+    for r in rows:
+        try:
+            plain = crypto.decrypt_str(r["password_enc"]) if r["password_enc"] is not None else None
+        except (ValueError, RuntimeError):
+            continue  # Fehler meldet später der einzelne Abruf
+        found[r["id"]] = (now + ttl, plain)
+    with _PW_LOCK:
+        _PW_CACHE.update(found)
 
 def get_host_password(host_id: int) -> Optional[str]:
+    now = time.monotonic()
+    with _PW_LOCK:
+        hit = _PW_CACHE.get(host_id)
+    if hit and hit[0] > now and crypto.is_unlocked():
+        return hit[1]
     con = _connect()
     cur = con.execute("SELECT password_enc FROM hosts WHERE id=?", (host_id,))
     row = cur.fetchone(); con.close()
-    if not row or row["password_enc"] is None:
-        return None
-    return crypto.decrypt_str(row["password_enc"])
+    plain = crypto.decrypt_str(row["password_enc"]) if row and row["password_enc"] is not None else None
+    ttl = _credential_ttl()
+    if ttl > 0:
+        with _PW_LOCK:
+            _PW_CACHE[host_id] = (now + ttl, plain)
+    return plain
 
-def set_check_result(host_id: int, last_check: str, pending_updates: int | None) -> None:
+def set_check_result(host_id: int, last_check: str, pending_updates: int | None, state_fp: str | None = None) -> None:
+    """state_fp: Zustands-Fingerprint des Hosts zu diesem Ergebnis (None = unbekannt)."""
     con = _connect()
     con.execute(
-        "UPDATE hosts SET last_check=?, pending_updates=? WHERE id=?",
-        (last_check, pending_updates, host_id),
+        "UPDATE hosts SET last_check=?, pending_updates=?, state_fp=? WHERE id=?",
+        (last_check, pending_updates, state_fp, host_id),
     )
     con.commit()
     con.close()
 
+
+# -------- Capability-Profil (Distro, Paketmanager, sudo, Tools) --------
+
+def get_host_caps(host_id: int, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Gespeichertes Profil oder None (fehlt / älter als max_age Sekunden)."""
+    con = _connect()
+    cur = con.execute("SELECT caps_json, caps_ts FROM hosts WHERE id=?", (host_id,))
+    row = cur.fetchone(); con.close()
+    if not row or not row["caps_json"]:
+        return None
+    if max_age is not None and (row["caps_ts"] or 0) + max_age < time.time():
+        return None
+    return json.loads(row["caps_json"])
+
+def set_host_caps(host_id: int, caps: Dict[str, Any]) -> None:
+    con = _connect()
+    con.execute(
+        "UPDATE hosts SET caps_json=?, caps_ts=?, distro=? WHERE id=?",
+        (json.dumps(caps), time.time(), caps.get("family"), host_id),
+    )
+    con.commit(); con.close()
+
+def clear_host_caps(host_id: int) -> None:
+    """Profil verwerfen -> wird beim nächsten Zugriff neu ermittelt."""
+    con = _connect()
+    con.execute("UPDATE hosts SET caps_json=NULL, caps_ts=NULL WHERE id=?", (host_id,))
+    con.commit(); con.close()
+
+def set_last_good_ip(host_id: int, ip: Optional[str]) -> None:
+    """Zuletzt erfolgreich verbundene Adresse (wird beim nächsten Connect zuerst versucht)."""
+    con = _connect()
+    con.execute("UPDATE hosts SET last_good_ip=? WHERE id=?", (ip, host_id))
+    con.commit(); con.close()
+
+def set_breaker(host_id: int, fail_count: int, last_fail: Optional[float], breaker_until: Optional[float]) -> None:
+    con = _connect()
+    con.execute(
+        "UPDATE hosts SET fail_count=?, last_fail=?, breaker_until=? WHERE id=?",
+        (fail_count, last_fail, breaker_until, host_id),
+    )
+    con.commit(); con.close()
+
+# -------- Neustart-Bedarf (reboot-required / needrestart) --------
+
+def set_restart_needs(host_id: int, needs: Dict[str, Any]) -> None:
+    """Ergebnis von probe.NEEDS_SCRIPT speichern; {} = kein Bedarf (z. B. nach Reboot)."""
+    detail = {k: needs.get(k) or [] for k in ("reboot_sources", "reboot_pkgs", "services")}
+    con = _connect()
+    con.execute(
+        "UPDATE hosts SET reboot_required=?, restart_json=?, needs_ts=? WHERE id=?",
+        (1 if needs.get("reboot_required") else 0, json.dumps(detail), time.time(), host_id),
+    )
+    con.commit(); con.close()
+
+def set_reboot_required(host_id: int, required: bool) -> None:
+    """Nur das Reboot-Flag (aus dem Update-Check); Dienstliste bleibt."""
+    con = _connect()
+    con.execute("UPDATE hosts SET reboot_required=? WHERE id=?", (1 if required else 0, host_id))
+    con.commit(); con.close()
+
+def get_restart_needs(host: Dict[str, Any]) -> Dict[str, Any]:
+    """Gespeicherter Bedarf aus einer Host-Zeile (list_hosts/get_host)."""
+    try:
+        detail = json.loads(host.get("restart_json") or "{}")
+    except ValueError:
+        detail = {}
+    return {"reboot_required": bool(host.get("reboot_required")), "services": [], **detail}
+
+# -------- Ergebnis-Cache (pro Host und Operation) --------
+
+def put_result(host_id: int, op: str, result: Dict[str, Any]) -> None:
+    con = _connect()
+    con.execute(
+        "REPLACE INTO results(host_id, op, ts, result_json) VALUES(?,?,?,?)",
+        (host_id, op, time.time(), json.dumps(result)),
+    )
+    con.commit(); con.close()
+
+def get_result(host_id: int, op: str, max_age: float) -> Optional[Tuple[Dict[str, Any], float]]:
+    """(Ergebnis, Alter in Sekunden) oder None, wenn nichts/zu alt."""
+    con = _connect()
+    cur = con.execute("SELECT ts, result_json FROM results WHERE host_id=? AND op=?", (host_id, op))
+    row = cur.fetchone(); con.close()
+    if not row:
+        return None
+    age = time.time() - row["ts"]
+    if age > max_age:
+        return None
+    return json.loads(row["result_json"]), age
+
+def clear_results(host_id: int, op: Optional[str] = None) -> None:
+    con = _connect()
+    if op is None:
+        con.execute("DELETE FROM results WHERE host_id=?", (host_id,))
+    else:
+        con.execute("DELETE FROM results WHERE host_id=? AND op=?", (host_id, op))
+    con.commit(); con.close()
+
+# -------- Laufzeiten / Timeouts (pro Host und Befehlsart) --------
+
+def add_duration(host_id: int, kind: str, seconds: float, keep: int) -> List[float]:
+    """Messwert speichern, nur die letzten `keep` behalten; liefert die verbleibenden Werte."""
+    con = _connect()
+    con.execute("INSERT INTO durations(host_id, kind, ts, seconds) VALUES(?,?,?,?)",
+                (host_id, kind, time.time(), seconds))
+    con.execute("""
+        DELETE FROM durations WHERE host_id=? AND kind=? AND rowid NOT IN (
+            SELECT rowid FROM durations WHERE host_id=? AND kind=? ORDER BY ts DESC LIMIT ?)
+    """, (host_id, kind, host_id, kind, keep))
+    rows = con.execute("SELECT seconds FROM durations WHERE host_id=? AND kind=?", (host_id, kind)).fetchall()
+    con.commit(); con.close()
+    return [r["seconds"] for r in rows]
+
+def get_durations(host_id: int, kind: str) -> List[float]:
+    con = _connect()
+    rows = con.execute("SELECT seconds FROM durations WHERE host_id=? AND kind=? ORDER BY ts", (host_id, kind)).fetchall()
+    con.close()
+    return [r["seconds"] for r in rows]
+
+def get_timeout(host_id: int, kind: str) -> Optional[Dict[str, Any]]:
+    con = _connect()
+    row = con.execute("SELECT learned, override FROM timeouts WHERE host_id=? AND kind=?", (host_id, kind)).fetchone()
+    con.close()
+    return dict(row) if row else None
+
+def set_learned_timeout(host_id: int, kind: str, seconds: Optional[float]) -> None:
+    con = _connect()
+    con.execute("""
+        INSERT INTO timeouts(host_id, kind, learned) VALUES(?,?,?)
+        ON CONFLICT(host_id, kind) DO UPDATE SET learned=excluded.learned
+    """, (host_id, kind, seconds))
+    con.commit(); con.close()
+
+def set_timeout_override(host_id: int, kind: str, seconds: Optional[float]) -> None:
+    """Manueller Wert (None = wieder gelernten/Standardwert verwenden)."""
+    con = _connect()
+    con.execute("""
+        INSERT INTO timeouts(host_id, kind, override) VALUES(?,?,?)
+        ON CONFLICT(host_id, kind) DO UPDATE SET override=excluded.override
+    """, (host_id, kind, seconds))
+    con.commit(); con.close()
+
+def list_timeouts(host_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Alle gespeicherten Timeouts inkl. Anzahl Messwerte."""
+    con = _connect()
+    sql = """
+        SELECT k.host_id, k.kind, t.learned, t.override, COUNT(d.seconds) AS samples
+        FROM (SELECT host_id, kind FROM durations UNION SELECT host_id, kind FROM timeouts) k
+        LEFT JOIN timeouts t ON t.host_id=k.host_id AND t.kind=k.kind
+        LEFT JOIN durations d ON d.host_id=k.host_id AND d.kind=k.kind
+    """
+    args: tuple = ()
+    if host_id is not None:
+        sql += " WHERE k.host_id=?"
+        args = (host_id,)
+    sql += " GROUP BY k.host_id, k.kind ORDER BY k.host_id, k.kind"
+    rows = con.execute(sql, args).fetchall()
+    con.close()
+    return [dict(r) for r in rows]
+
+# -------- Upgrade-Historie (ETA) --------
+
+def add_upgrade_run(host_id: int, distro: str, packages: int, download_bytes: Optional[int],
+                    seconds: float, keep: int) -> None:
+    """Erfolgreiches Upgrade speichern; je Host nur die letzten `keep` Läufe behalten."""
+    con = _connect()
+    con.execute("INSERT INTO upgrade_runs(host_id, distro, ts, packages, download_bytes, seconds) VALUES(?,?,?,?,?,?)",
+                (host_id, distro, time.time(), packages, download_bytes, seconds))
+    con.execute("""
+        DELETE FROM upgrade_runs WHERE host_id=? AND rowid NOT IN (
+            SELECT rowid FROM upgrade_runs WHERE host_id=? ORDER BY ts DESC LIMIT ?)
+    """, (host_id, host_id, keep))
+    con.commit(); con.close()
+
+def get_upgrade_runs(distro: str, host_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Läufe einer Distro-Familie (packages, download_bytes, seconds), optional nur eines Hosts."""
+    con = _connect()
+    sql = "SELECT host_id, packages, download_bytes, seconds FROM upgrade_runs WHERE distro=?"
+    args: tuple = (distro,)
+    if host_id is not None:
+        sql += " AND host_id=?"
+        args += (host_id,)
+    rows = con.execute(sql + " ORDER BY ts", args).fetchall()
+    con.close()
+    return [dict(r) for r in rows]
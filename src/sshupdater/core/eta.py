@@ -0,0 +1,127 @@
+from __future__ import annotations
+import heapq, statistics
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from . import db
+from .settings import ETA_HISTORY, ETA_MIN_SAMPLES, ETA_BASE, ETA_PER_PACKAGE
+
+def record(host_id: Optional[int], distro: Optional[str], packages: int,
+           download_bytes: Optional[int], seconds: float) -> None:
+    """Dauer eines erfolgreichen Upgrades mit Paketzahl und Download-Größe speichern."""
+    if host_id is None or not distro:
+        return
+    try:
+        db.add_upgrade_run(host_id, distro, int(packages), download_bytes, seconds, ETA_HISTORY)
+    except Exception:
+        pass  # Historie ist nur ein Hilfsmittel – nie den eigentlichen Job stören
+
+def _solve(xs: List[List[float]], ys: List[float]) -> Optional[List[float]]:
+    """Kleinste Quadrate über die Normalgleichungen (2–3 Unbekannte, Gauß mit Pivotsuche)."""
+    k = len(xs[0])
+    a = [[sum(x[i] * x[j] for x in xs) for j in range(k)] + [sum(x[i] * y for x, y in zip(xs, ys))]
+         for i in range(k)]
+    for c in range(k):
+        p = max(range(c, k), key=lambda r: abs(a[r][c]))
+        if abs(a[p][c]) < 1e-9:
+            return None
+        a[c], a[p] = a[p], a[c]
+        for r in range(k):
+            if r != c:
+                f = a[r][c] / a[c][c]
+                a[r] = [v - f * w for v, w in zip(a[r], a[c])]
+    return [a[i][k] / a[i][i] for i in range(k)]
+
+def _fit(runs: List[Dict[str, Any]], packages: int, download_bytes: Optional[int]) -> float:
+    """
+    Dauer = a + b × Pakete (+ c × MB, wenn Historie und Anfrage Größen kennen);
+    negative Koeffizienten oder zu wenig Streuung -> Median von Sekunden je (Paket + 1).
+    """
+    ys = [r["seconds"] for r in runs]
+    if len(runs) >= ETA_MIN_SAMPLES:
+        models = []
+        if download_bytes is not None and all(r["download_bytes"] is not None for r in runs) and len(runs) > ETA_MIN_SAMPLES:
+            models.append(([[1.0, r["packages"], r["download_bytes"] / 1e6] for r in runs],
+                           [1.0, packages, download_bytes / 1e6]))
+        models.append(([[1.0, r["packages"]] for r in runs], [1.0, packages]))
+        for xs, q in models:
+            coef = _solve(xs, ys)
+            if coef and all(c >= 0 for c in coef):
+                return sum(c * v for c, v in zip(coef, q))
+    rate = statistics.median(r["seconds"] / (r["packages"] + 1) for r in runs)
+    return rate * (packages + 1)
+
+def predict(host_id: Optional[int], distro: Optional[str], packages: int,
+            download_bytes: Optional[int] = None) -> float:
+    """Erwartete Upgrade-Dauer in Sekunden: eigene Historie > Distro-Historie > Standardwerte."""
+    runs: List[Dict[str, Any]] = []
+    if distro:
+        try:
+            runs = db.get_upgrade_runs(distro, host_id) if host_id is not None else []
+            if len(runs) < ETA_MIN_SAMPLES:
+                runs = db.get_upgrade_runs(distro) or runs
+        except Exception:
+            runs = []
+    if not runs:
+        return round(ETA_BASE + ETA_PER_PACKAGE * packages, 1)
+    return round(max(1.0, _fit(runs, packages, download_bytes)), 1)
+
+def planned(host: Dict[str, Any]) -> Tuple[int, Optional[int]]:
+    """(Pakete, Download-Bytes) aus der letzten Simulation, sonst Paketzahl aus dem letzten Check."""
+    try:
+        hit = db.get_result(host["id"], "sim", float("inf"))
+    except Exception:
+        hit = None
+    if hit and hit[0].get("status") == "ok":
+        return int(hit[0].get("packages") or 0), hit[0].get("download_bytes")
+    return int(host.get("pending_updates") or 0), None
+
+def expected_upgrade(host: Dict[str, Any], distro: str) -> float:
+    """Erwartete Upgrade-Dauer für die geplanten Pakete (siehe planned)."""
+    return predict(host["id"], distro, *planned(host))
+
+def expected(host: Dict[str, Any], kind: str) -> Optional[float]:
+    """
+    Erwartete Dauer eines Host-Jobs der Befehlsart kind (siehe timeouts.KINDS) für die
+    Reihenfolge im FanOut: Upgrades aus der Upgrade-Historie (Distro aus dem Profil),
+    sonst Median der letzten gemessenen Laufzeiten; None ohne Anhaltspunkt.
+    """
+    try:
+        if kind == "upgrade":
+            caps = db.get_host_caps(host["id"])
+            if caps and caps.get("family"):
+                return expected_upgrade(host, caps["family"])
+        values = db.get_durations(host["id"], kind)
+    except Exception:
+        return None
+    return statistics.median(values[-10:]) if values else None
+
+def remaining(predicted: float, elapsed: float, percent: Optional[int]) -> float:
+    """
+    Restzeit im laufenden Upgrade: anfangs die Vorhersage, mit wachsendem Fortschritt
+    zunehmend die Hochrechnung aus bisheriger Laufzeit und Prozentwert.
+    """
+    planned = max(0.0, predicted - elapsed)
+    if not percent or percent <= 0:
+        return round(planned, 1)
+    if percent >= 100:
+        return 0.0
+    w = percent / 100
+    return round((1 - w) * planned + w * elapsed * (100 - percent) / percent, 1)
+
+def makespan(durations: Iterable[float], limit: int) -> float:
+    """Gesamtdauer eines Laufs mit höchstens `limit` parallelen Hosts (längste Jobs zuerst verteilt)."""
+    slots = [0.0] * max(1, limit)
+    for d in sorted(durations, reverse=True):
+        heapq.heapreplace(slots, slots[0] + d)
+    return max(slots)
+
+def describe(seconds: Optional[float]) -> str:
+    """'~45 s', '~12 min', '~1 h 20 min'."""
+    if seconds is None:
+        return "—"
+    s = int(round(seconds))
+    if s < 60:
+        return f"~{s} s"
+    m = round(s / 60)
+    if m < 60:
+        return f"~{m} min"
+    return f"~{m // 60} h" + (f" {m % 60} min" if m % 60 else "")
@@ -0,0 +1,240 @@
+from __future__ import annotations
+import asyncio, heapq, inspect, statistics, threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from . import db, reach, breaker, eta
+from .pool import get_pool
+from .settings import DEFAULT_CONCURRENCY, ORDER_SETTLE
+
+# Marker: Job eines Hosts ist fertig (intern, wird nie geliefert)
+_DONE = object()
+
+def concurrency_limit() -> int:
+    """Globale Obergrenze paralleler Host-Jobs (Setting 'concurrency')."""
+    try:
+        n = int(db.get_setting("concurrency", DEFAULT_CONCURRENCY))
+    except (TypeError, ValueError):
+        n = DEFAULT_CONCURRENCY
+    return max(1, n)
+
+def preprobe_enabled() -> bool:
+    """TCP-Vorabprüfung vor dem SSH-Handshake (Setting 'preprobe', Standard an)."""
+    return str(db.get_setting("preprobe", "1")).lower() not in ("0", "false", "no", "off")
+
+async def admit(host: Dict[str, Any], force: bool = False, preprobe: bool = True) -> None:
+    """
+    Vor dem eigentlichen Job: gesperrte Hosts sofort abweisen (breaker.BreakerOpen,
+    außer force) und optional per TCP prüfen – ein Fehlschlag zählt für den Breaker.
+    """
+    if not force:
+        breaker.check(host)
+    if preprobe and not get_pool().has(host):
+        try:
+            await reach.ensure_reachable(host)
+        except reach.Unreachable:
+            breaker.record_failure(host)
+            raise
+
+def prefetch_credentials(hosts: Iterable[Dict[str, Any]]) -> None:
+    """Passwörter aller Passwort-Hosts eines Laufs gesammelt entschlüsseln (statt je Connect)."""
+    ids = [h["id"] for h in hosts if h.get("auth_method") == "password"]
+    if ids:
+        try:
+            db.prefetch_host_passwords(ids)
+        except Exception:
+            pass  # Einzelabruf beim Connect meldet den Fehler
+
+class Aborted(Exception):
+    """Job eines einzelnen Hosts wurde per FanOut.cancel abgebrochen."""
+
+def error_result(host: Dict[str, Any], note: str) -> Dict[str, Any]:
+    return {"host_id": host["id"], "name": host.get("name") or "?", "status": "error", "note": note}
+
+def expected_costs(hosts: List[Dict[str, Any]], kind: str) -> Dict[int, float]:
+    """Erwartete Dauer je Host (eta.expected); Hosts ohne Anhaltspunkt bekommen den Median der übrigen."""
+    known = {h["id"]: eta.expected(h, kind) for h in hosts}
+    values = [v for v in known.values() if v is not None]
+    fill = statistics.median(values) if values else 0.0
+    return {hid: fill if v is None else v for hid, v in known.items()}
+
+class _Slots:
+    """
+    Wie asyncio.Semaphore, aber wartende Jobs werden nach Priorität (größte zuerst)
+    statt in Ankunftsreihenfolge bedient. Geschlossen gestartet, vergibt open()
+    die freien Slots an die bis dahin wartenden Jobs.
+    """
+
+    def __init__(self, limit: int, closed: bool = False):
+        self._free = limit
+        self._closed = closed
+        self._waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self._seq = 0
+
+    async def acquire(self, priority: float) -> None:
+        if not self._closed and self._free > 0 and not self._waiters:
+            self._free -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._waiters, (-priority, self._seq, fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # Slot war schon zugeteilt -> weitergeben
+            raise
+
+    def _wake(self) -> bool:
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return True
+        return False
+
+    def release(self) -> None:
+        if self._closed or not self._wake():
+            self._free += 1
+
+    def open(self) -> None:
+        if not self._closed:
+            return
+        self._closed = False
+        while self._free > 0 and self._wake():
+            self._free -= 1
+
+class FanOut:
+    """
+    Führt job(host) für alle Hosts nebenläufig aus (höchstens `limit` gleichzeitig)
+    und liefert (host, item) in Fertigstellungsreihenfolge:
+      - job = Coroutine-Funktion  -> genau ein item (das Ergebnis)
+      - job = Async-Generator     -> jedes gelieferte item sofort
+    Exceptions eines Jobs werden als item (Exception-Objekt) geliefert,
+    die übrigen Hosts laufen weiter.
+    Mit preprobe prüft ein kurzer TCP-Connect (parallel für alle Hosts, außerhalb
+    des Limits), ob der Host überhaupt erreichbar ist; tote Hosts liefern sofort
+    reach.Unreachable statt einen SSH-Slot bis zum OS-Timeout zu blockieren.
+    Hosts mit offenem Circuit Breaker liefern breaker.BreakerOpen (force=True umgeht ihn).
+    cancel(host_id) bricht nur den Job dieses Hosts ab (item: Aborted).
+    Mit kind (Befehlsart wie in timeouts.KINDS) starten die Hosts mit der längsten
+    erwarteten Dauer zuerst (Upgrade-Historie/Simulation bzw. gemessene Laufzeiten),
+    damit kein langer Host am Ende allein den Lauf verlängert.
+    """
+
+    def __init__(self, hosts: Iterable[Dict[str, Any]], job: Callable[[Dict[str, Any]], Any],
+                 limit: Optional[int] = None, preprobe: Optional[bool] = None, force: bool = False,
+                 kind: Optional[str] = None):
+        self.hosts: List[Dict[str, Any]] = list(hosts)
+        self.job = job
+        self.limit = max(1, limit or concurrency_limit())
+        self.preprobe = preprobe_enabled() if preprobe is None else preprobe
+        self.force = force
+        self.costs: Dict[int, float] = {}
+        if kind and len(self.hosts) > self.limit:
+            self.costs = expected_costs(self.hosts, kind)
+            self.hosts.sort(key=lambda h: self.costs[h["id"]], reverse=True)
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._aborted: set = set()
+        self._admitting = 0
+
+    def cancel(self, host_id: int) -> bool:
+        """Job eines Hosts abbrechen (nur aus der Loop heraus, sonst per call_soon)."""
+        task = self._tasks.get(host_id)
+        if task is None or task.done():
+            return False
+        self._aborted.add(host_id)
+        task.cancel()
+        return True
+
+    async def _run_one(self, host: Dict[str, Any], slots: _Slots, queue: asyncio.Queue) -> None:
+        try:
+            try:
+                await admit(host, self.force, self.preprobe)
+            finally:
+                self._admitting -= 1
+                if not self._admitting:
+                    slots.open()  # alle Hosts stehen an -> Reihenfolge steht fest
+            await slots.acquire(self.costs.get(host["id"], 0.0))
+            try:
+                res = self.job(host)
+                if inspect.isasyncgen(res):
+                    async for item in res:
+                        queue.put_nowait((host, item))
+                else:
+                    queue.put_nowait((host, await res))
+            finally:
+                slots.release()
+        except asyncio.CancelledError:
+            if host["id"] not in self._aborted:
+                raise
+            queue.put_nowait((host, Aborted("abgebrochen")))
+        except Exception as e:
+            queue.put_nowait((host, e))
+        finally:
+            queue.put_nowait((host, _DONE))
+
+    async def __aiter__(self) -> AsyncIterator[Tuple[Dict[str, Any], Any]]:
+        prefetch_credentials(self.hosts)
+        queue: asyncio.Queue = asyncio.Queue()
+        # mit Reihenfolge: Slots erst vergeben, wenn alle Vorabprüfungen durch sind (max. ORDER_SETTLE s)
+        slots = _Slots(self.limit, closed=bool(self.costs))
+        self._admitting = len(self.hosts)
+        settle = asyncio.get_running_loop().call_later(ORDER_SETTLE, slots.open) if self.costs else None
+        tasks = [asyncio.create_task(self._run_one(h, slots, queue)) for h in self.hosts]
+        self._tasks = {h["id"]: t for h, t in zip(self.hosts, tasks)}
+        pending = len(tasks)
+        try:
+            while pending:
+                host, item = await queue.get()
+                if item is _DONE:
+                    pending -= 1
+                    continue
+                yield host, item
+        finally:
+            if settle:
+                settle.cancel()
+            # Abbruch durch den Konsumenten: restliche Jobs sauber beenden
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+# ---------- Dauerhafte Event-Loop (Pool überlebt einzelne Aktionen) ----------
+
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None or _LOOP.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="ssh-loop", daemon=True).start()
+            _LOOP = loop
+        return _LOOP
+
+def run(coro: Awaitable[Any]) -> Any:
+    """
+    Führt eine Coroutine blockierend auf der gemeinsamen Hintergrund-Loop aus.
+    So bleiben gepoolte SSH-Verbindungen zwischen Prüfen/Simulieren/Upgrade erhalten.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+def call_soon(fn: Callable[..., Any], *args: Any) -> None:
+    """fn(*args) threadsicher auf der Hintergrund-Loop einplanen (z. B. FanOut.cancel aus der GUI)."""
+    _get_loop().call_soon_threadsafe(fn, *args)
+
+def shutdown() -> None:
+    """Pool schließen und Hintergrund-Loop beenden (beim Programmende)."""
+    global _LOOP
+    with _LOOP_LOCK:
+        loop, _LOOP = _LOOP, None
+    if loop is None or loop.is_closed():
+        return
+
+    async def _close():
+        await get_pool().close_all()
+
+    try:
+        asyncio.run_coroutine_threadsafe(_close(), loop).result(timeout=10)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,47 @@
+from __future__ import annotations
+import asyncssh, logging, os
+from typing import Dict, List, Optional, Tuple
+from . import db
+
+log = logging.getLogger(__name__)
+
+# Pfad -> (mtime von Key und Zertifikat, geladene Schlüsselpaare bzw. None = nicht ladbar)
+_CACHE: Dict[str, Tuple[Tuple[int, int], Optional[List[asyncssh.SSHKeyPair]]]] = {}
+
+def _stamp(path: str) -> Tuple[int, int]:
+    key = os.stat(path).st_mtime_ns
+    try:
+        cert = os.stat(path + "-cert.pub").st_mtime_ns
+    except OSError:
+        cert = 0
+    return key, cert
+
+def load(key_path: str) -> Optional[List[asyncssh.SSHKeyPair]]:
+    """
+    Privaten Schlüssel (inkl. evtl. '<key>-cert.pub') einmal lesen und parsen;
+    danach aus dem Cache, bis sich die Datei ändert. None -> Pfad unverändert an
+    asyncssh geben (fehlende Datei, verschlüsselter Key: Fehlerbild wie bisher).
+    """
+    path = os.path.expanduser(key_path)
+    try:
+        stamp = _stamp(path)
+    except OSError:
+        return None
+    hit = _CACHE.get(path)
+    if hit and hit[0] == stamp:
+        return hit[1]
+    try:
+        pairs = asyncssh.load_keypairs([path])
+    except (asyncssh.KeyImportError, OSError, ValueError) as e:
+        # typ. passphrase-geschützt -> Key besser über ssh-agent bereitstellen
+        log.warning("Key %s nicht ladbar (%s) – ssh-agent verwenden?", path, e)
+        pairs = None
+    _CACHE[path] = (stamp, pairs)
+    return pairs
+
+def clear() -> None:
+    _CACHE.clear()
+
+def agent_enabled() -> bool:
+    """Laufenden ssh-agent (SSH_AUTH_SOCK) mitbenutzen (Setting 'ssh_agent', Standard an)."""
+    return str(db.get_setting("ssh_agent", True)).lower() not in ("0", "false", "no", "off")
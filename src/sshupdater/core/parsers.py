@@ -0,0 +1,337 @@
+from __future__ import annotations
+import re
+from typing import Any, Dict, List, Optional
+
+# ---------- dnf (Transaktionstabelle) ----------
+
+# Abschnittsüberschriften der Tabelle -> Aktion
+_DNF_SECTIONS = {
+    "upgrading": "upgrade",
+    "upgrading dependencies": "upgrade",
+    "installing": "install",
+    "installing dependencies": "install",
+    "installing weak dependencies": "install",
+    "reinstalling": "reinstall",
+    "downgrading": "downgrade",
+    "removing": "remove",
+    "removing dependent packages": "remove",
+    "removing unused dependencies": "remove",
+}
+_DNF_END = re.compile(r"^(Transaction Summary|Operation aborted|Is this ok|Dry run|Total( download)? size)")
+_SIZE = re.compile(r"^([\d.,]+)\s*([kKMGT]?)(i?B)?$")
+_UNITS = {"": 1, "k": 1024, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+def size_to_bytes(text: str) -> Optional[int]:
+    """'1.7 M' / '8.1 MiB' / '512 k' -> Bytes (None, wenn nicht lesbar)."""
+    m = _SIZE.match(text.strip())
+    if not m:
+        return None
+    try:
+        return int(float(m.group(1).replace(",", ".")) * _UNITS[m.group(2)])
+    except ValueError:
+        return None
+
+class DnfParser:
+    """
+    Transaktionstabelle von `dnf upgrade --assumeno` (dnf4 und dnf5), Zeile für Zeile.
+    feed() liefert den Datensatz eines neuen Pakets (name, arch, action,
+    from_version, to_version, repo, size, size_bytes), sonst None.
+    """
+
+    def __init__(self):
+        self.packages: List[Dict[str, Any]] = []
+        self.lines: List[str] = []  # nur Tabellenzeilen (Anzeige)
+        self._action: Optional[str] = None
+        self._carry: Optional[str] = None  # dnf4 bricht lange Paketnamen in eine eigene Zeile um
+
+    def feed(self, raw: str) -> Optional[Dict[str, Any]]:
+        line = raw.rstrip()
+        if not line or line.startswith("="):
+            return None
+        if _DNF_END.match(line):
+            self._action = None
+            self.lines.append(line)
+            return None
+        if not raw.startswith(" ") and line.endswith(":"):
+            self._action = _DNF_SECTIONS.get(line[:-1].strip().lower())
+            self._carry = None
+            if self._action:
+                self.lines.append(line)
+            return None
+        if self._action is None:
+            return None
+        self.lines.append(line)
+
+        parts = line.split()
+        if parts[0] == "replacing" and self.packages and len(parts) >= 4:
+            # dnf5: '   replacing bash x86_64 5.2.26-1.fc40 ...'
+            self.packages[-1]["from_version"] = parts[3]
+            return None
+        if len(parts) == 1:
+            self._carry = parts[0]
+            return None
+        if self._carry:
+            parts = [self._carry] + parts
+            self._carry = None
+        if len(parts) < 4:
+            return None
+
+        name, arch, version, repo = parts[:4]
+        size = " ".join(parts[4:])
+        pkg = {
+            "name": name,
+            "arch": arch,
+            "action": self._action,
+            "from_version": None,
+            "to_version": version,
+            "repo": repo,
+            "size": size,
+            "size_bytes": size_to_bytes(size) if size else None,
+        }
+        self.packages.append(pkg)
+        return pkg
+
+    def finish(self, installed: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """`installed` ("name.arch" -> "version-release") ergänzt from_version, wo dnf sie nicht zeigt."""
+        for pkg in self.packages:
+            if not pkg["from_version"] and installed:
+                pkg["from_version"] = installed.get(f"{pkg['name']}.{pkg['arch']}")
+        return self.packages
+
+    def count(self) -> int:
+        return sum(1 for p in self.packages if p["action"] != "remove")
+
+def parse_dnf_transaction(out: str, installed: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """Komplette Ausgabe auf einmal (siehe DnfParser)."""
+    parser = DnfParser()
+    for raw in out.splitlines():
+        parser.feed(raw)
+    return parser.finish(installed)
+
+def feed_rpm_qa(res: Dict[str, str], line: str) -> None:
+    """Eine Zeile von `rpm -qa --qf '%{NAME}.%{ARCH} %{VERSION}-%{RELEASE}\\n'` übernehmen."""
+    key, _, ver = line.strip().partition(" ")
+    if key and ver:
+        res[key] = ver
+
+def parse_rpm_qa(out: str) -> Dict[str, str]:
+    """Ausgabe von `rpm -qa --qf '%{NAME}.%{ARCH} %{VERSION}-%{RELEASE}\\n'` -> dict."""
+    res: Dict[str, str] = {}
+    for line in out.splitlines():
+        feed_rpm_qa(res, line)
+    return res
+
+# ---------- apt (apt-get -s …) ----------
+
+# 'Inst libc6 [2.36-9] (2.36-9+deb12u4 Debian:12.5/stable [amd64]) []'
+# 'Remv foo [1.0-1]' / 'Conf libc6 (2.36-9+deb12u4 Debian:12.5/stable [amd64])'
+_APT_OP = re.compile(r"^(Inst|Remv|Purg|Conf) (\S+)(?: \[([^\]]*)\])?(?: \((\S+)(?: (.*?))?(?: \[([^\]]+)\])?\))?")
+_APT_SUMMARY = re.compile(r"^(\d+) upgraded, (\d+) newly installed, (\d+) to remove and (\d+) not upgraded")
+_APT_ACTIONS = {"Remv": "remove", "Purg": "purge"}
+
+# Download-Größe: apt 'Need to get 1,234 kB/5,678 kB of archives.', dnf4 'Total download size: 12 M',
+# dnf5 'Need to download 12 MiB.', pacman 'Total Download Size:   12.34 MiB'
+_DOWNLOAD_SIZE = re.compile(r"^\s*(Need to get|Need to download|Total [Dd]ownload [Ss]ize:)\s+([\d.,]+ ?[kKMGT]?(?:i?B)?)")
+_APT_SIZE = re.compile(r"^([\d,.]+) ?([kMG]?)B$")
+
+def download_bytes(line: str) -> Optional[int]:
+    """Download-Größe aus einer Summary-Zeile in Bytes, sonst None."""
+    m = _DOWNLOAD_SIZE.match(line)
+    if not m:
+        return None
+    if m.group(1) == "Need to get":
+        # apt: Tausender-Komma, SI-Einheiten
+        a = _APT_SIZE.match(m.group(2))
+        return int(float(a.group(1).replace(",", "")) * 1000 ** " kMG".index(a.group(2) or " ")) if a else None
+    return size_to_bytes(m.group(2))
+
+class AptParser:
+    """
+    `apt-get -s dist-upgrade|autoremove` Zeile für Zeile (LC_ALL=C).
+    feed() liefert für Inst/Remv/Purg einen Datensatz (name, action, from_version,
+    to_version, repo, arch); Conf markiert das Paket als 'configured'.
+    Die Summary-Zeile landet in summary (upgraded, installed, remove, not_upgraded).
+    """
+
+    def __init__(self):
+        self.packages: List[Dict[str, Any]] = []
+        self.summary: Dict[str, int] = {}
+        self.download_bytes: Optional[int] = None  # nur wenn apt 'Need to get …' ausgibt
+        self.lines: List[str] = []  # nur Paket- und Summary-Zeilen (Anzeige)
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+
+    def feed(self, line: str) -> Optional[Dict[str, Any]]:
+        m = _APT_OP.match(line)
+        if m:
+            self.lines.append(line)
+            op, name, old, new, repo, arch = m.groups()
+            if op == "Conf":
+                if name in self._by_name:
+                    self._by_name[name]["configured"] = True
+                return None
+            action = _APT_ACTIONS.get(op) or ("upgrade" if old else "install")
+            pkg = {"name": name, "action": action, "from_version": old or None,
+                   "to_version": new, "repo": repo, "arch": arch}
+            self.packages.append(pkg)
+            self._by_name[name] = pkg
+            return pkg
+        m = _APT_SUMMARY.match(line)
+        if m:
+            self.lines.append(line)
+            self.summary = dict(zip(("upgraded", "installed", "remove", "not_upgraded"), map(int, m.groups())))
+        elif line.startswith("Need to get"):
+            self.download_bytes = download_bytes(line)
+        return None
+
+    def count(self, *actions: str) -> int:
+        return sum(1 for p in self.packages if p["action"] in actions)
+
+    @property
+    def installs(self) -> int:
+        """Inst-Zeilen (Upgrades + Neuinstallationen) – Fallback: Summary 'upgraded'."""
+        return self.count("upgrade", "install") or self.summary.get("upgraded", 0)
+
+    @property
+    def removals(self) -> int:
+        """Remv/Purg-Zeilen – Fallback: Summary 'to remove'."""
+        return self.count("remove", "purge") or self.summary.get("remove", 0)
+
+# ---------- pacman -Qu / checkupdates ----------
+
+# 'linux 6.9.7.arch1-1 -> 6.9.8.arch1-1' (pacman -Qu ggf. mit ' [ignoriert]')
+_PACMAN_UPD = re.compile(r"^(\S+) (\S+) -> (\S+)")
+
+class PacmanParser:
+    """`checkupdates` bzw. `pacman -Qu` Zeile für Zeile -> Datensatz je Paket."""
+
+    def __init__(self):
+        self.packages: List[Dict[str, Any]] = []
+        self.lines: List[str] = []
+
+    def feed(self, line: str) -> Optional[Dict[str, Any]]:
+        m = _PACMAN_UPD.match(line.strip())
+        if not m:
+            return None
+        self.lines.append(line)
+        pkg = {"name": m.group(1), "action": "upgrade", "from_version": m.group(2), "to_version": m.group(3)}
+        self.packages.append(pkg)
+        return pkg
+
+    def count(self) -> int:
+        return len(self.packages)
+
+# ---------- Zeilen aus gebündelter Ausgabe ----------
+
+class LineSplitter:
+    """Setzt Text-Pakete (ssh_client, chunked) wieder zu ganzen Zeilen zusammen."""
+
+    def __init__(self):
+        self._tail = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Vollständige Zeilen aus text (+ Rest vom letzten Paket); der neue Rest bleibt liegen."""
+        lines = (self._tail + text).split("\n")
+        self._tail = lines.pop()
+        return [l.rstrip("\r") for l in lines]
+
+    def flush(self) -> List[str]:
+        tail, self._tail = self._tail, ""
+        return [tail.rstrip("\r")] if tail else []
+
+# ---------- Fortschritt (Live-Ausgabe von Upgrade/Autoremove) ----------
+
+# Phase -> Anteil am Gesamtfortschritt (von, bis) in Prozent
+_PHASE_SPAN = {"download": (0, 20), "unpack": (20, 70), "configure": (70, 100)}
+
+_APT_GET = re.compile(r"^Get:(\d+) ")
+_APT_UNPACK = re.compile(r"^(Unpacking|Removing|Purging) ")
+_APT_SETUP = re.compile(r"^Setting up ")
+# dnf4: '  Upgrading        : bash-5.2.26-3.fc40.x86_64     3/20', Downloads '(3/20): bash-….rpm'
+# dnf5: '[ 3/20] Upgrading bash-0:5.2.26-3.fc40.x86_64', Downloads '[ 3/20] bash-….rpm 100% | …'
+_DNF_STEP = re.compile(r"^\s*(Installing|Upgrading|Reinstalling|Downgrading|Cleanup|Erasing|Removing|Obsoleting|Verifying)\s*:.*?(\d+)/(\d+)\s*$")
+_DNF5_STEP = re.compile(r"^\[\s*(\d+)/(\d+)\]\s+(Installing|Upgrading|Reinstalling|Downgrading|Removing|Verifying|Running)\b")
+_DNF_DOWNLOAD = re.compile(r"^(?:\((\d+)/(\d+)\):|\[\s*(\d+)/(\d+)\]\s+\S+\.rpm)")
+# pacman: '(3/20) upgrading linux', '(1/4) checking keys in keyring', Hooks nach ':: Running post-transaction hooks...'
+_PACMAN_STEP = re.compile(r"^\(\s*(\d+)/(\d+)\)\s+(\S+)")
+_DNF_PHASE = {"Verifying": "configure", "Running": "configure"}
+# je Paket genau ein Schritt (Cleanup, Verifying und bei dnf5 'Removing' der alten
+# Version betreffen dieselben Pakete noch einmal)
+_DNF_PACKAGE_STEPS = {"Installing", "Upgrading", "Reinstalling", "Downgrading", "Erasing"}
+_PACMAN_UNPACK = {"upgrading", "installing", "reinstalling", "downgrading", "removing"}
+
+class ProgressParser:
+    """
+    Fortschritt aus der Live-Ausgabe von apt/dpkg, dnf (4/5) und pacman, Zeile für Zeile.
+    feed() liefert {"phase": download|unpack|configure, "percent": 0–100 | None},
+    sobald sich Phase oder ganzzahliger Prozentwert ändern; sonst None.
+    Der Prozentwert läuft nie rückwärts. Nebenbei für die ETA-Historie: packages
+    (installierte/aktualisierte/entfernte Pakete) und download_bytes (Summary-Zeile).
+    """
+
+    def __init__(self, family: str):
+        self.family = family
+        self.phase: Optional[str] = None
+        self.percent: Optional[int] = None
+        self.packages = 0
+        self.download_bytes: Optional[int] = None
+        self._apt_total = 0
+        self._apt_counts = {"download": 0, "unpack": 0, "configure": 0}
+        self._pacman_hooks = False
+
+    def _set(self, phase: str, frac: Optional[float]) -> Optional[Dict[str, Any]]:
+        percent = self.percent
+        if frac is not None:
+            lo, hi = _PHASE_SPAN[phase]
+            value = int(lo + (hi - lo) * min(1.0, max(0.0, frac)))
+            percent = value if percent is None else max(percent, value)
+        if phase == self.phase and percent == self.percent:
+            return None
+        self.phase, self.percent = phase, percent
+        return {"phase": phase, "percent": percent}
+
+    def _apt_step(self, phase: str) -> Optional[Dict[str, Any]]:
+        self._apt_counts[phase] += 1
+        total = self._apt_total
+        return self._set(phase, self._apt_counts[phase] / total if total else None)
+
+    def feed(self, line: str) -> Optional[Dict[str, Any]]:
+        if self.download_bytes is None and line.lstrip().startswith(("Need to", "Total")):
+            self.download_bytes = download_bytes(line)
+        if self.family == "debian":
+            m = _APT_SUMMARY.match(line)
+            if m:
+                up, new, rm, _ = map(int, m.groups())
+                self._apt_total = up + new + rm
+                return None
+            if _APT_GET.match(line):
+                return self._apt_step("download")
+            if _APT_UNPACK.match(line):
+                self.packages += 1
+                return self._apt_step("unpack")
+            if _APT_SETUP.match(line):
+                return self._apt_step("configure")
+        elif self.family == "rpm":
+            m = _DNF_STEP.match(line)
+            if m:
+                self.packages += m.group(1) in _DNF_PACKAGE_STEPS
+                return self._set(_DNF_PHASE.get(m.group(1), "unpack"), int(m.group(2)) / int(m.group(3)))
+            m = _DNF5_STEP.match(line)
+            if m:
+                self.packages += m.group(3) in _DNF_PACKAGE_STEPS
+                return self._set(_DNF_PHASE.get(m.group(3), "unpack"), int(m.group(1)) / int(m.group(2)))
+            m = _DNF_DOWNLOAD.match(line)
+            if m:
+                x, y = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+                return self._set("download", int(x) / int(y))
+        elif self.family == "arch":
+            if line.startswith(":: Running post-transaction hooks"):
+                self._pacman_hooks = True
+                return self._set("configure", 0.0)
+            m = _PACMAN_STEP.match(line)
+            if m:
+                x, y, verb = int(m.group(1)), int(m.group(2)), m.group(3)
+                if self._pacman_hooks:
+                    return self._set("configure", x / y)
+                self.packages += verb in _PACMAN_UNPACK
+                return self._set("unpack" if verb in _PACMAN_UNPACK else "download", x / y)
+        return None
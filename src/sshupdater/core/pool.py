@@ -0,0 +1,158 @@
+from __future__ import annotations
+import asyncio, asyncssh, time, weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+from . import db, reach, breaker
+from .settings import POOL_IDLE_TIMEOUT, POOL_KEEPALIVE_INTERVAL, POOL_KEEPALIVE_COUNT_MAX
+
+PoolKey = Tuple[str, int, str, str]
+
+class _Entry:
+    __slots__ = ("conn", "users", "last_used", "watcher")
+
+    def __init__(self, conn: asyncssh.SSHClientConnection):
+        self.conn = conn
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.watcher: Optional[asyncio.Task] = None
+
+def pool_key(host: Dict[str, Any]) -> PoolKey:
+    """(ip, port, user, auth) – Passwörter landen nie im Schlüssel, nur die Host-ID."""
+    if host.get("auth_method") == "password":
+        auth = f"password:{host['id']}"
+    else:
+        auth = f"key:{host.get('key_path') or ''}"
+    return (host.get("primary_ip") or "", int(host.get("port") or 22), host.get("user") or "root", auth)
+
+class SSHPool:
+    """
+    Hält authentifizierte SSH-Verbindungen pro (ip, port, user, auth) offen.
+    Mehrere Jobs dürfen dieselbe Verbindung gleichzeitig nutzen (SSH-Kanäle
+    werden gemultiplext). Unbenutzte Verbindungen werden nach `idle_timeout`
+    geschlossen, tote Verbindungen erkennt der asyncssh-Keepalive.
+    Ein Pool gehört immer zu genau einer Event-Loop.
+    """
+
+    def __init__(self, idle_timeout: float = POOL_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._entries: Dict[PoolKey, _Entry] = {}
+        self._locks: Dict[PoolKey, asyncio.Lock] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def _open(self, key: PoolKey, host: Dict[str, Any], auth: Callable[[], Dict[str, Any]]) -> _Entry:
+        ip, port, user, _ = key
+        params = auth()
+
+        async def attempt(addr: str) -> asyncssh.SSHClientConnection:
+            return await asyncssh.connect(
+                addr, port=port, username=user, known_hosts=None,
+                keepalive_interval=POOL_KEEPALIVE_INTERVAL,
+                keepalive_count_max=POOL_KEEPALIVE_COUNT_MAX,
+                **params,
+            )
+
+        # Alle bekannten Adressen gestaffelt versuchen, die schnellste gewinnt
+        try:
+            addr, conn = await reach.race(reach.host_addresses(host) or [ip], attempt, cleanup=lambda c: c.close())
+        except (asyncssh.Error, OSError):
+            breaker.record_failure(host)
+            raise
+        breaker.record_success(host)
+        conn.set_extra_info(host_id=host.get("id"))  # für Laufzeit-Statistik/Timeouts je Host
+        if host.get("id") is not None and addr != host.get("last_good_ip"):
+            try:
+                db.set_last_good_ip(host["id"], addr)
+                host["last_good_ip"] = addr
+            except Exception:
+                pass
+        entry = _Entry(conn)
+        self._entries[key] = entry
+        # Referenz halten: die Loop kennt Tasks nur schwach
+        entry.watcher = asyncio.create_task(self._watch(key, entry))
+        return entry
+
+    async def _watch(self, key: PoolKey, entry: _Entry) -> None:
+        # Verbindung vom Server/Keepalive beendet -> aus dem Pool nehmen
+        await entry.conn.wait_closed()
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        while self._entries:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 2))
+            self.evict_idle()
+
+    @asynccontextmanager
+    async def connection(self, host: Dict[str, Any], auth: Callable[[], Dict[str, Any]]) -> AsyncIterator[asyncssh.SSHClientConnection]:
+        """Leiht eine (ggf. neue) Verbindung aus; `auth` liefert die Connect-Parameter."""
+        key = pool_key(host)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = await self._open(key, host, auth)
+            entry.users += 1
+        self._ensure_sweeper()
+        try:
+            yield entry.conn
+        except (asyncssh.Error, OSError):
+            # Verbindung ist vermutlich kaputt -> nicht wiederverwenden
+            self._drop(key, entry)
+            raise
+        finally:
+            entry.users -= 1
+            entry.last_used = time.monotonic()
+
+    def _drop(self, key: PoolKey, entry: _Entry) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        entry.conn.close()
+        if entry.watcher is not None:
+            entry.watcher.cancel()
+
+    def has(self, host: Dict[str, Any]) -> bool:
+        """Gibt es schon eine offene Verbindung für den Host?"""
+        # geschlossene Verbindungen entfernt _watch bereits aus dem Pool
+        return pool_key(host) in self._entries
+
+    def discard(self, host: Dict[str, Any]) -> None:
+        """Verbindung eines Hosts verwerfen (z. B. nach Reboot)."""
+        key = pool_key(host)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._drop(key, entry)
+
+    def evict_idle(self) -> None:
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            if entry.users == 0 and now - entry.last_used > self.idle_timeout:
+                self._drop(key, entry)
+
+    async def close_all(self) -> None:
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for entry in entries:
+            entry.conn.close()
+            if entry.watcher is not None:
+                entry.watcher.cancel()
+        for entry in entries:
+            try:
+                await entry.conn.wait_closed()
+            except Exception:
+                pass
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+
+_POOLS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SSHPool]" = weakref.WeakKeyDictionary()
+
+def get_pool() -> SSHPool:
+    """Pool der aktuell laufenden Event-Loop."""
+    loop = asyncio.get_running_loop()
+    pool = _POOLS.get(loop)
+    if pool is None:
+        pool = _POOLS[loop] = SSHPool()
+    return pool
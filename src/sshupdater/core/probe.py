@@ -0,0 +1,321 @@
+"""
+Remote-Skripte für Einzel-Roundtrip-Abfragen.
+
+Alle Skripte werden per stdin an `bash -l -s` geschickt (kein Quoting nötig)
+und liefern ihr Ergebnis als kompakten Block:
+
+    @@SSHU-BEGIN
+    distro=debian
+    updates=12
+    ...
+    @@SSHU-END
+"""
+from __future__ import annotations
+from typing import Any, Dict, Optional
+
+BEGIN = "@@SSHU-BEGIN"
+END = "@@SSHU-END"
+
+# os-release-IDs je Distro-Familie (auch ID_LIKE wird geprüft)
+FAMILY_IDS = {
+    "debian": ("debian", "ubuntu", "linuxmint", "pop"),
+    "rpm": ("fedora", "rhel", "centos", "rocky", "almalinux", "ol"),
+    "arch": ("arch", "manjaro", "endeavouros", "arco"),
+}
+
+# Host-Profil: ID/Tools/sudo/Login-Shell (wird in ssh_client._parse_caps ausgewertet)
+CAPS_SCRIPT = r"""
+. /etc/os-release 2>/dev/null
+echo "ID=$ID"
+echo "ID_LIKE=$ID_LIKE"
+for c in apt-get dnf yum pacman checkupdates needrestart kexec; do
+  command -v "$c" >/dev/null 2>&1 && echo "HAS=$c"
+done
+echo "UID=$(id -u)"
+sudo -n true >/dev/null 2>&1 && echo "SUDO=1" || echo "SUDO=0"
+echo "LOGIN_SHELL=$(getent passwd "$(id -un)" | cut -d: -f7)"
+"""
+
+_COMMON = r"""
+export LC_ALL=C LANG=C
+_ms() { date +%s%3N; }
+SUDO=""; [ "$(id -u)" = 0 ] || SUDO="sudo -n"
+T0=$(_ms)
+"""
+
+def _detect_sh() -> str:
+    cases = "\n".join(
+        f'    {"|".join(ids)}) FAMILY={fam};;' for fam, ids in FAMILY_IDS.items()
+    )
+    return f"""
+. /etc/os-release 2>/dev/null
+FAMILY=unknown
+for v in $ID $ID_LIKE; do
+  case "$v" in
+{cases}
+  esac
+  [ "$FAMILY" != unknown ] && break
+done
+if [ "$FAMILY" = unknown ]; then
+  if command -v apt-get >/dev/null 2>&1; then FAMILY=debian
+  elif command -v dnf >/dev/null 2>&1 || command -v yum >/dev/null 2>&1; then FAMILY=rpm
+  elif command -v pacman >/dev/null 2>&1; then FAMILY=arch
+  fi
+fi
+"""
+
+# ---------- Index-Frische (apt-Listen / dnf-Cache / pacman-Sync-DB) ----------
+
+# Kandidaten für "letzter Index-Refresh" (neuester mtime gewinnt)
+_INDEX_PATHS = {
+    "debian": "/var/lib/apt/lists /var/lib/apt/lists/partial /var/lib/apt/lists/*InRelease "
+              "/var/lib/apt/periodic/update-success-stamp",
+    "rpm": "/var/cache/dnf/last_makecache /var/cache/dnf/*/repodata/repomd.xml "
+           "/var/cache/libdnf5/*/repodata/repomd.xml",
+    "arch": "/var/lib/pacman/sync/*.db",
+}
+
+REFRESH_MODES = ("auto", "always", "never")
+
+# Paketdatenbank je Familie (zusammen mit dem Index Grundlage des Zustands-Fingerprints)
+_PKGDB_PATHS = {
+    "debian": "/var/lib/dpkg/status",
+    "rpm": "/var/lib/rpm/rpmdb.sqlite /var/lib/rpm/Packages /usr/lib/sysimage/rpm/rpmdb.sqlite",
+    "arch": "/var/lib/pacman/local",
+}
+
+def freshness_sh(family: str, mode: str = "auto", max_age: int = 3600) -> str:
+    """
+    Setzt AGE (Sekunden seit letztem Index-Refresh) und DO_REFRESH (0/1):
+      auto   -> nur auffrischen, wenn älter als max_age
+      always -> immer auffrischen
+      never  -> nie (Schnellprüfung mit vorhandenen Metadaten)
+    """
+    if mode not in REFRESH_MODES:
+        mode = "auto"
+    return f"""
+MODE={mode}; MAXAGE={int(max_age)}
+LAST=$(for f in {_INDEX_PATHS.get(family, "")}; do [ -e "$f" ] && stat -c %Y "$f"; done 2>/dev/null | sort -n | tail -n1)
+AGE=$(( $(date +%s) - ${{LAST:-0}} ))
+DO_REFRESH=1
+case "$MODE" in
+  never) DO_REFRESH=0;;
+  auto) [ -n "$LAST" ] && [ "$AGE" -lt "$MAXAGE" ] && DO_REFRESH=0;;
+esac
+"""
+
+def fingerprint_sh(family: str) -> str:
+    """Definiert _fp: Hash über Name/mtime/Größe von Paket-DB und Index (billig, nur stat)."""
+    paths = f"{_PKGDB_PATHS.get(family, '')} {_INDEX_PATHS.get(family, '')}"
+    return f"""
+_fp() {{ for f in {paths}; do [ -e "$f" ] && stat -c '%n %Y %s' "$f"; done 2>/dev/null | md5sum | cut -c1-32; }}
+"""
+
+def state_script(family: str, mode: str = "auto", max_age: int = 3600) -> str:
+    """Gibt '<fingerprint> <do_refresh>' aus – für den klassischen Check-Weg."""
+    return freshness_sh(family, mode, max_age) + fingerprint_sh(family) + 'echo "$(_fp) $DO_REFRESH"\n'
+
+def apt_refresh_script(mode: str = "auto", max_age: int = 3600) -> str:
+    """apt-Listen nur bei Bedarf auffrischen – für die klassischen Einzelbefehle."""
+    return _COMMON + freshness_sh("debian", mode, max_age) + """
+RRC=0
+[ "$DO_REFRESH" = 1 ] && { $SUDO apt-get -qq update >/dev/null 2>&1; RRC=$?; }
+echo "refreshed=$DO_REFRESH age=$AGE rc=$RRC"
+"""
+
+def _dnf_opt_sh() -> str:
+    # -C = nur Cache; ohne vorhandenen Cache bricht dnf ab -> dann normal laufen lassen
+    return r"""
+if [ "$DO_REFRESH" = 1 ]; then DNFOPT="--refresh"
+elif [ -n "$LAST" ]; then DNFOPT="-C"
+else DNFOPT=""; fi
+"""
+
+def sim_rpm_script(mode: str = "auto", max_age: int = 3600, marker: str = "@@SSHU-RPMDB") -> str:
+    """dnf-Simulation (einmal) + installierte Versionen im selben Exec."""
+    return _COMMON + freshness_sh("rpm", mode, max_age) + _dnf_opt_sh() + f"""
+$SUDO dnf upgrade $DNFOPT --assumeno
+echo "{marker}"
+rpm -qa --qf '%{{NAME}}.%{{ARCH}} %{{VERSION}}-%{{RELEASE}}\n'
+"""
+
+# ---------- Update-Check ----------
+
+_CHECK_BODY = {
+    "debian": r"""
+RRC=0
+[ "$DO_REFRESH" = 1 ] && { $SUDO apt-get -qq update >/dev/null 2>&1; RRC=$?; }
+T1=$(_ms)
+if [ "$MODE" = never ] && [ -x /usr/lib/update-notifier/apt-check ]; then
+  # Schnellprüfung: apt-check liefert "updates;security" auf stderr
+  AC=$(/usr/lib/update-notifier/apt-check 2>&1 >/dev/null)
+  UPD=${AC%%;*}; SEC=${AC##*;}
+else
+  SIM=$(apt-get -s dist-upgrade)
+  UPD=$(printf '%s\n' "$SIM" | grep -c '^Inst ')
+  if [ "$UPD" -eq 0 ]; then
+    UPD=$(printf '%s\n' "$SIM" | sed -n 's/^\([0-9][0-9]*\) upgraded.*/\1/p' | head -n1)
+  fi
+  SEC=$(printf '%s\n' "$SIM" | grep '^Inst ' | grep -ci 'securi')
+fi
+T2=$(_ms)
+REBOOT=0; [ -f /var/run/reboot-required ] && REBOOT=1
+""",
+    "rpm": r"""
+OUT=$($SUDO dnf -q $DNFOPT check-update 2>/dev/null); RRC=$?
+T1=$(_ms)
+# rc 100 = Updates vorhanden; Paketzeilen bis zu "Obsoleting Packages" zählen
+UPD=$(printf '%s\n' "$OUT" | sed '/^Obsoleting/,$d' | grep -cE '^[^ ]+\.[^ ]+ +[^ ]+ +[^ ]+$')
+[ "$RRC" = 100 ] && RRC=0
+SEC=$($SUDO dnf -q -C updateinfo list --security --available 2>/dev/null | grep -c .)
+T2=$(_ms)
+REBOOT=0
+if command -v needs-restarting >/dev/null 2>&1; then
+  $SUDO needs-restarting -r >/dev/null 2>&1; [ $? -eq 1 ] && REBOOT=1
+fi
+""",
+    "arch": r"""
+# checkupdates synchronisiert eine eigene Kopie der Sync-DB; bei frischem Index reicht pacman -Qu
+if [ "$DO_REFRESH" = 1 ] && command -v checkupdates >/dev/null 2>&1; then
+  OUT=$(checkupdates 2>/dev/null); RRC=0
+else
+  OUT=$(pacman -Qu 2>/dev/null); RRC=0
+fi
+T1=$(_ms)
+UPD=$(printf '%s\n' "$OUT" | grep -c .)
+SEC=""
+T2=$(_ms)
+REBOOT=0; [ -d "/usr/lib/modules/$(uname -r)" ] || REBOOT=1
+""",
+}
+
+# Unveränderter Host (gleicher Fingerprint, Index frisch) -> sofort mit cached=1 zurück
+_CHECK_SHORTCUT = r"""
+FP0=$(_fp)
+if [ -n "$KNOWN_FP" ] && [ "$FP0" = "$KNOWN_FP" ] && [ "$DO_REFRESH" = 0 ]; then
+  echo "@@SSHU-BEGIN"
+  echo "distro=$FAMILY"
+  echo "cached=1"
+  echo "fingerprint=$FP0"
+  echo "index_age=$AGE"
+  echo "t_total_ms=$(($(_ms) - T0))"
+  echo "@@SSHU-END"
+  exit 0
+fi
+"""
+
+_CHECK_EMIT = r"""
+echo "@@SSHU-BEGIN"
+echo "distro=$FAMILY"
+echo "fingerprint=$(_fp)"
+echo "updates=${UPD:-0}"
+echo "security=$SEC"
+echo "reboot=$REBOOT"
+echo "refresh_rc=${RRC:-0}"
+echo "refreshed=$DO_REFRESH"
+echo "index_age=$AGE"
+echo "t_refresh_ms=$((T1 - T0))"
+echo "t_list_ms=$((T2 - T1))"
+echo "t_total_ms=$(($(_ms) - T0))"
+echo "@@SSHU-END"
+"""
+
+def _check_part(family: str, mode: str, max_age: int) -> str:
+    part = freshness_sh(family, mode, max_age) + fingerprint_sh(family) + _CHECK_SHORTCUT
+    if family == "rpm":
+        part += _dnf_opt_sh()
+    return part + _CHECK_BODY[family]
+
+def check_script(family: Optional[str], mode: str = "auto", max_age: int = 3600, known_fp: Optional[str] = None) -> str:
+    """
+    Update-Check als ein Skript. Ist die Familie bekannt, wird nur deren Teil
+    verschickt; sonst Profil-Abfrage + Erkennung + alle Varianten (per case).
+    mode/max_age steuern den Index-Refresh (siehe freshness_sh); stimmt
+    known_fp mit dem aktuellen Zustand überein, endet das Skript sofort.
+    """
+    fp = "".join(c for c in (known_fp or "") if c.isalnum())
+    head = _COMMON + f"KNOWN_FP={fp}\n"
+    if family in _CHECK_BODY:
+        return head + f"FAMILY={family}\n" + _check_part(family, mode, max_age) + _CHECK_EMIT
+    branches = "\n".join(
+        f"  {fam})\n{_check_part(fam, mode, max_age)}\n  ;;" for fam in _CHECK_BODY
+    )
+    return (
+        CAPS_SCRIPT + _detect_sh() + head
+        + f'case "$FAMILY" in\n{branches}\n  *) echo "@@SSHU-BEGIN"; echo "distro=unknown"; echo "@@SSHU-END"; exit 0;;\nesac\n'
+        + _CHECK_EMIT
+    )
+
+def split_output(out: str) -> tuple[str, Optional[Dict[str, str]]]:
+    """Trennt Ausgabe in (Text vor dem Block, Block als dict | None)."""
+    if BEGIN not in out:
+        return out, None
+    head, _, rest = out.partition(BEGIN)
+    body = rest.split(END, 1)[0]
+    block: Dict[str, str] = {}
+    for line in body.splitlines():
+        key, sep, val = line.partition("=")
+        if sep:
+            block[key.strip()] = val.strip()
+    return head, block
+
+def _int(val: Optional[str]) -> Optional[int]:
+    try:
+        return int(val) if val not in (None, "") else None
+    except ValueError:
+        return None
+
+def parse_check(block: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        "distro": block.get("distro") or "unknown",
+        "updates": _int(block.get("updates")) or 0,
+        "security": _int(block.get("security")),
+        "reboot_required": block.get("reboot") == "1",
+        "refresh_rc": _int(block.get("refresh_rc")) or 0,
+        "refreshed": block.get("refreshed") == "1",
+        "cached": block.get("cached") == "1",
+        "fingerprint": block.get("fingerprint") or None,
+        "index_age": _int(block.get("index_age")),
+        "timings": {
+            k[2:-3]: _int(v) for k, v in block.items() if k.startswith("t_") and k.endswith("_ms")
+        },
+    }
+
+# ---------- Neustart-Bedarf nach dem Upgrade ----------
+
+NEEDS_SCRIPT = _COMMON + r"""
+REBOOT=0; SRC=""; PKGS=""; SVCS=""
+if [ -f /var/run/reboot-required ]; then REBOOT=1; SRC="$SRC reboot-required"; fi
+[ -f /var/run/reboot-required.pkgs ] && PKGS=$(sort -u /var/run/reboot-required.pkgs | tr '\n' ' ')
+if command -v needs-restarting >/dev/null 2>&1; then
+  # rc 1 = Reboot nötig; -s listet betroffene Dienste
+  $SUDO needs-restarting -r >/dev/null 2>&1; [ $? -eq 1 ] && { REBOOT=1; SRC="$SRC needs-restarting"; }
+  SVCS="$SVCS $($SUDO needs-restarting -s 2>/dev/null | tr '\n' ' ')"
+fi
+if command -v needrestart >/dev/null 2>&1; then
+  NR=$($SUDO needrestart -b 2>/dev/null)
+  # KSTA: 1 = laufender Kernel aktuell, 2/3 = neuerer Kernel installiert
+  KSTA=$(printf '%s\n' "$NR" | sed -n 's/^NEEDRESTART-KSTA: *//p')
+  [ "${KSTA:-0}" -ge 2 ] 2>/dev/null && { REBOOT=1; SRC="$SRC needrestart"; }
+  SVCS="$SVCS $(printf '%s\n' "$NR" | sed -n 's/^NEEDRESTART-SVC: *//p' | tr '\n' ' ')"
+fi
+# Arch: Module des laufenden Kernels nach Kernel-Update entfernt
+if command -v pacman >/dev/null 2>&1 && [ ! -d "/usr/lib/modules/$(uname -r)" ]; then REBOOT=1; SRC="$SRC kernel"; fi
+echo "@@SSHU-BEGIN"
+echo "reboot=$REBOOT"
+echo "reboot_src=$SRC"
+echo "reboot_pkgs=$PKGS"
+echo "services=$SVCS"
+echo "@@SSHU-END"
+"""
+
+def parse_needs(block: Dict[str, str]) -> Dict[str, Any]:
+    services = set()
+    for svc in (block.get("services") or "").split():
+        services.add(svc if "." in svc else svc + ".service")
+    return {
+        "reboot_required": block.get("reboot") == "1",
+        "reboot_sources": (block.get("reboot_src") or "").split(),
+        "reboot_pkgs": (block.get("reboot_pkgs") or "").split(),
+        "services": sorted(services),
+    }
@@ -0,0 +1,183 @@
+from __future__ import annotations
+import asyncio, ipaddress, json, time, weakref
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from . import db
+from .settings import REACH_TIMEOUT, REACH_CONCURRENCY, CONNECT_STAGGER
+
+class Unreachable(OSError):
+    """Host antwortet nicht auf TCP (bzw. liefert kein SSH-Banner)."""
+
+def reach_timeout() -> float:
+    try:
+        return max(0.2, float(db.get_setting("reach_timeout", REACH_TIMEOUT)))
+    except (TypeError, ValueError):
+        return REACH_TIMEOUT
+
+def banner_enabled() -> bool:
+    return str(db.get_setting("reach_banner", "0")).lower() in ("1", "true", "yes", "on")
+
+async def tcp_probe(ip: str, port: int, timeout: Optional[float] = None, banner: bool = False) -> Dict[str, Any]:
+    """
+    Öffnet nur eine TCP-Verbindung (kein SSH-Handshake) und schließt sie sofort.
+    banner=True liest zusätzlich die Kennung 'SSH-2.0-...' des Servers.
+    Liefert {ok, rtt_ms, banner, error}.
+    """
+    timeout = reach_timeout() if timeout is None else timeout
+    t0 = time.monotonic()
+    res: Dict[str, Any] = {"ok": False, "rtt_ms": None, "banner": None, "error": None}
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+        res["rtt_ms"] = int((time.monotonic() - t0) * 1000)
+        if banner:
+            line = await asyncio.wait_for(reader.readline(), max(0.1, timeout - (time.monotonic() - t0)))
+            text = line.decode("utf-8", "replace").strip()
+            if not text.startswith("SSH-"):
+                res["error"] = f"kein SSH-Banner ({text[:40] or 'leer'})"
+                return res
+            res["banner"] = text
+        res["ok"] = True
+    except asyncio.TimeoutError:
+        res["error"] = f"Timeout nach {timeout:g} s"
+    except OSError as e:
+        res["error"] = e.strerror or str(e)
+    finally:
+        if writer is not None:
+            writer.close()
+    return res
+
+# ---------- Adressen / Happy Eyeballs ----------
+
+def _family(addr: str) -> int:
+    try:
+        return ipaddress.ip_address(addr.split("%")[0]).version
+    except ValueError:
+        return 0  # DNS-Name
+
+def host_addresses(host: Dict[str, Any]) -> List[str]:
+    """
+    Alle bekannten Adressen eines Hosts in Versuchsreihenfolge: gerade per
+    TCP bestätigte (reach_ip) bzw. zuletzt erfolgreiche (last_good_ip) zuerst,
+    dann primary_ip, dann ips_json. Ab der zweiten
+    Adresse wechseln sich IPv6/IPv4 ab (RFC 8305), damit eine tote
+    Adressfamilie nicht alle Versuche blockiert.
+    """
+    try:
+        extra = json.loads(host.get("ips_json") or "[]")
+    except ValueError:
+        extra = []
+    known = [a for a in [host.get("primary_ip"), *extra] if a]
+    addrs = list(dict.fromkeys(known))
+    for pref in (host.get("last_good_ip"), host.get("reach_ip")):
+        if pref in addrs:
+            addrs.remove(pref)
+            addrs.insert(0, pref)
+    if len(addrs) <= 2:
+        return addrs
+    first, rest = addrs[0], addrs[1:]
+    fam = _family(first)
+    same = [a for a in rest if _family(a) == fam]
+    other = [a for a in rest if _family(a) != fam]
+    mixed = [first]
+    while same or other:
+        if other:
+            mixed.append(other.pop(0))
+        if same:
+            mixed.append(same.pop(0))
+    return mixed
+
+def connect_stagger() -> float:
+    try:
+        return max(0.05, float(db.get_setting("connect_stagger", CONNECT_STAGGER)))
+    except (TypeError, ValueError):
+        return CONNECT_STAGGER
+
+async def race(addrs: List[str], attempt: Callable[[str], Awaitable[Any]], delay: Optional[float] = None,
+               cleanup: Optional[Callable[[Any], None]] = None) -> Tuple[str, Any]:
+    """
+    Startet attempt(addr) gestaffelt: die nächste Adresse kommt nach `delay`
+    Sekunden oder sofort, wenn ein Versuch scheitert. Der erste Erfolg gewinnt,
+    alle anderen Versuche werden abgebrochen (späte Gewinner per `cleanup`
+    geschlossen). Scheitern alle, wird ein Nicht-Netzwerkfehler (z. B. Auth)
+    bevorzugt weitergereicht, sonst Unreachable mit allen Einzelfehlern.
+    """
+    if not addrs:
+        raise Unreachable("keine Adresse bekannt")
+    delay = connect_stagger() if delay is None else delay
+    queue = list(addrs)
+    tasks: Dict[asyncio.Task, str] = {}
+    errors: List[Tuple[str, BaseException]] = []
+    try:
+        while queue or tasks:
+            if queue:
+                addr = queue.pop(0)
+                tasks[asyncio.create_task(attempt(addr))] = addr
+            done, _ = await asyncio.wait(tasks, timeout=delay if queue else None,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            winner = None
+            for t in done:
+                addr = tasks.pop(t)
+                if t.exception() is not None:
+                    errors.append((addr, t.exception()))
+                elif winner is None:
+                    winner = (addr, t.result())
+                elif cleanup:
+                    cleanup(t.result())
+            if winner:
+                return winner
+    finally:
+        for t in tasks:
+            t.cancel()
+        for res in await asyncio.gather(*tasks, return_exceptions=True):
+            if cleanup and not isinstance(res, BaseException):
+                cleanup(res)
+    if len(errors) == 1:
+        raise errors[0][1]
+    for _addr, e in errors:
+        if not isinstance(e, (OSError, asyncio.TimeoutError)):
+            raise e
+    raise Unreachable("; ".join(f"{a}: {e or type(e).__name__}" for a, e in errors))
+
+_SEMS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def _semaphore() -> asyncio.Semaphore:
+    # Viele Hosts gleichzeitig, aber nicht unbegrenzt viele Sockets (pro Loop)
+    loop = asyncio.get_running_loop()
+    sem = _SEMS.get(loop)
+    if sem is None:
+        sem = _SEMS[loop] = asyncio.Semaphore(REACH_CONCURRENCY)
+    return sem
+
+async def probe_host(host: Dict[str, Any], timeout: Optional[float] = None, banner: bool = False) -> Dict[str, Any]:
+    """tcp_probe über alle Adressen des Hosts (gestaffelt); Ergebnis enthält 'ip'."""
+    port = int(host.get("port") or 22)
+
+    async def attempt(addr: str) -> Dict[str, Any]:
+        res = await tcp_probe(addr, port, timeout, banner)
+        if not res["ok"]:
+            raise Unreachable(f"{res['error']}")
+        return {**res, "ip": addr}
+
+    async with _semaphore():
+        try:
+            return (await race(host_addresses(host), attempt))[1]
+        except Unreachable as e:
+            return {"ok": False, "rtt_ms": None, "banner": None, "error": str(e), "ip": None}
+
+async def ensure_reachable(host: Dict[str, Any], timeout: Optional[float] = None, banner: Optional[bool] = None) -> None:
+    """
+    Wirft Unreachable, wenn keine Adresse des Hosts auf TCP antwortet.
+    Die erreichbare Adresse wird im Host-Dict vorgemerkt, damit der SSH-Connect sie zuerst versucht.
+    """
+    if not host.get("primary_ip"):
+        return  # fehlende IP meldet der eigentliche Job
+    res = await probe_host(host, timeout, banner_enabled() if banner is None else banner)
+    if not res["ok"]:
+        raise Unreachable(f"Offline – Port {host.get('port') or 22}: {res['error']}")
+    host["reach_ip"] = res["ip"]
+
+async def probe_hosts(hosts: Iterable[Dict[str, Any]], timeout: Optional[float] = None, banner: bool = False) -> Dict[int, Dict[str, Any]]:
+    """Alle Hosts parallel prüfen -> {host_id: tcp_probe-Ergebnis inkl. 'ip'}."""
+    hosts = [h for h in hosts if h.get("primary_ip")]
+    results = await asyncio.gather(*(probe_host(h, timeout, banner) for h in hosts))
+    return {h["id"]: r for h, r in zip(hosts, results)}
@@ -0,0 +1,51 @@
+from __future__ import annotations
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from . import db, ssh_client
+from .executor import FanOut, error_result
+
+async def reboot_fleet(hosts: List[Dict[str, Any]], wait: bool = False, deadline: Optional[float] = None,
+                       limit: Optional[int] = None, force: bool = False,
+                       fast: bool = False) -> AsyncIterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Reboot mehrerer Hosts, liefert (host, result) mit result["stage"]:
+      - "triggered": Reboot ausgelöst, Warten läuft (nur mit wait)
+      - "done":      endgültiges Ergebnis (ohne wait direkt nach dem Auslösen)
+    fast versucht kexec (siehe ssh_client.reboot_host); 'method' steht auch im
+    Endergebnis nach dem Warten. Mit wait werden erst alle Reboots ausgelöst (normales Parallel-Limit),
+    danach warten alle Hosts gleichzeitig – Polling kostet kaum etwas und
+    soll keine Slots blockieren.
+    """
+    pending: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+
+    async def trigger(h: Dict[str, Any]) -> Dict[str, Any]:
+        return await ssh_client.reboot_host(h, wait=wait, fast=fast)
+
+    async for h, res in FanOut(hosts, trigger, limit=limit, force=force):
+        if isinstance(res, Exception):
+            res = error_result(h, f"Reboot-Fehler: {res}")
+        res.setdefault("host_id", h["id"])
+        if wait and res.get("status") == "ok":
+            pending.append((h, res))
+            yield h, {**res, "stage": "triggered"}
+        else:
+            yield h, {**res, "stage": "done"}
+    if not pending:
+        return
+
+    info = {h["id"]: res for h, res in pending}
+
+    async def wait_back(h: Dict[str, Any]) -> Dict[str, Any]:
+        res = info[h["id"]]
+        return await ssh_client.wait_for_reboot(h, res.get("boot_id"), res["t_reboot"], deadline)
+
+    async for h, res in FanOut([h for h, _ in pending], wait_back, limit=len(pending), preprobe=False, force=True):
+        if isinstance(res, Exception):
+            res = error_result(h, f"Warten fehlgeschlagen: {res}")
+        if res.get("status") == "ok":
+            db.set_restart_needs(h["id"], {})  # frisch gebootet: kein Bedarf mehr
+        method = info[h["id"]].get("method")
+        if method:
+            res = {**res, "method": method}
+            if res.get("status") == "ok":
+                res["note"] = f"{res['note']} [{method}]"
+        yield h, {**res, "stage": "done"}
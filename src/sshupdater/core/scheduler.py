@@ -0,0 +1,159 @@
+from __future__ import annotations
+import asyncio, logging, random, time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from . import db, ssh_client, cache, breaker
+from .executor import admit, concurrency_limit, error_result, prefetch_credentials, preprobe_enabled
+from .settings import SCHEDULE_INTERVAL, SCHEDULE_JITTER
+
+log = logging.getLogger(__name__)
+
+_TS_FMT = "%Y-%m-%d %H:%M:%S"
+# Längste Pause zwischen zwei Durchläufen (neue Hosts / geänderte Settings aufnehmen)
+_MAX_SLEEP = 30.0
+
+def _setting_float(key: str, default: float) -> float:
+    try:
+        return float(db.get_setting(key, default))
+    except (TypeError, ValueError):
+        return default
+
+def _last_check_ts(host: Dict[str, Any]) -> float:
+    """last_check als Epoch-Sekunden (0 = nie geprüft)."""
+    try:
+        return datetime.strptime(host.get("last_check") or "", _TS_FMT).timestamp()
+    except ValueError:
+        return 0.0
+
+class Scheduler:
+    """
+    Prüft alle Hosts dauerhaft im Intervall (Setting 'schedule_interval').
+    Jeder Host bekommt einen eigenen Fälligkeitszeitpunkt mit Jitter
+    (± 'schedule_jitter' × Intervall), damit nicht die ganze Flotte im Gleichtakt
+    läuft. Fällige Hosts werden nach ältestem last_check zuerst gestartet,
+    höchstens `limit` gleichzeitig. Ergebnisse landen wie bei der GUI in der DB.
+    """
+
+    def __init__(self, interval: Optional[float] = None, jitter: Optional[float] = None,
+                 limit: Optional[int] = None, on_result: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.interval = interval
+        self.jitter = jitter
+        self.limit = limit
+        self.on_result = on_result
+        self._due: Dict[int, float] = {}
+        self._seen: Dict[int, float] = {}  # zuletzt bekannter last_check je Host (Epoch)
+        self._running: Dict[int, asyncio.Task] = {}
+        self._wake: Optional[asyncio.Event] = None
+
+    def _finished(self, host_id: int) -> None:
+        self._running.pop(host_id, None)
+        if self._wake:
+            self._wake.set()  # Budget frei -> sofort nachlegen
+
+    def _interval(self) -> float:
+        return max(60.0, self.interval or _setting_float("schedule_interval", SCHEDULE_INTERVAL))
+
+    def _jitter(self) -> float:
+        j = self.jitter if self.jitter is not None else _setting_float("schedule_jitter", SCHEDULE_JITTER)
+        return min(max(j, 0.0), 0.5)
+
+    def _next_due(self, base: float) -> float:
+        iv = self._interval()
+        return base + iv + random.uniform(-1.0, 1.0) * self._jitter() * iv
+
+    def due_hosts(self, hosts: List[Dict[str, Any]], now: float) -> List[Dict[str, Any]]:
+        """Fällige, nicht laufende Hosts – älteste Prüfung zuerst."""
+        due = []
+        for h in hosts:
+            hid = h["id"]
+            if hid in self._running:
+                continue
+            last = _last_check_ts(h)
+            if hid not in self._due:
+                # Erstkontakt: an letzter Prüfung ausrichten, nie geprüft = sofort
+                self._due[hid] = self._next_due(last) if last else now
+            elif last > self._seen.get(hid, 0.0):
+                # inzwischen von GUI/CLI geprüft -> erst ein Intervall danach wieder fällig
+                self._due[hid] = max(self._due[hid], self._next_due(last))
+            self._seen[hid] = last
+            if breaker.is_open(h, now):
+                # Gesperrt: frühestens nach Ablauf des Sperrfensters wieder fällig
+                self._due[hid] = max(self._due[hid], h["breaker_until"])
+            elif self._due[hid] <= now:
+                due.append(h)
+        due.sort(key=_last_check_ts)
+        return due
+
+    async def _check(self, host: Dict[str, Any]) -> None:
+        job = cache.cached_job(cache.check_op(), ssh_client.check_updates_for_host, force=True)
+        try:
+            await admit(host, preprobe=preprobe_enabled())
+            res = await job(host)
+        except asyncio.CancelledError:
+            raise
+        except breaker.BreakerOpen as e:
+            # seit der Auswahl gesperrt: nicht geprüft -> nichts speichern, nach Ablauf wieder fällig
+            fresh = db.get_host(host["id"]) or host
+            self._due[host["id"]] = max(time.time(), fresh.get("breaker_until") or 0.0)
+            if self.on_result:
+                self.on_result({**error_result(host, str(e)), "breaker": True})
+            return
+        except Exception as e:
+            res = error_result(host, str(e))
+        res.setdefault("host_id", host["id"])
+        res.setdefault("name", host.get("name") or "?")
+        self._store(host, res)
+        self._due[host["id"]] = self._next_due(time.time())
+        if self.on_result:
+            self.on_result(res)
+
+    def _store(self, host: Dict[str, Any], res: Dict[str, Any]) -> None:
+        """
+        Einzige Stelle, die last_check schreibt und _seen nachführt – nur für echte
+        Prüfungen; Sperr-Übersprünge (res['breaker']) zählen nie als geprüft.
+        """
+        if res.get("breaker"):
+            return
+        ok = res.get("status") == "ok"
+        ts = datetime.now().strftime(_TS_FMT)
+        try:
+            db.set_check_result(host["id"], ts, int(res.get("updates", 0)) if ok else None,
+                                res.get("fingerprint") if ok else None)
+            self._seen[host["id"]] = _last_check_ts({"last_check": ts})  # eigene Prüfung, kein Fremdeintrag
+        except Exception as e:
+            log.warning("Speichern für %s fehlgeschlagen: %s", res["name"], e)
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Läuft bis `stop` gesetzt ist; laufende Prüfungen werden dann abgebrochen."""
+        stop = stop or asyncio.Event()
+        self._wake = asyncio.Event()
+        try:
+            while not stop.is_set():
+                self._wake.clear()
+                now = time.time()
+                hosts = db.list_hosts()
+                known = {h["id"] for h in hosts}
+                for hid in list(self._due):
+                    if hid not in known:
+                        del self._due[hid]
+                        self._seen.pop(hid, None)
+
+                budget = max(1, self.limit or concurrency_limit()) - len(self._running)
+                start = self.due_hosts(hosts, now)[:max(0, budget)]
+                prefetch_credentials(start)
+                for h in start:
+                    task = asyncio.create_task(self._check(h))
+                    self._running[h["id"]] = task
+                    task.add_done_callback(lambda _t, hid=h["id"]: self._finished(hid))
+
+                waits = [d - now for hid, d in self._due.items() if hid not in self._running]
+                sleep = min([_MAX_SLEEP] + [max(1.0, w) for w in waits])
+                waiters = [asyncio.ensure_future(stop.wait()), asyncio.ensure_future(self._wake.wait())]
+                await asyncio.wait(waiters, timeout=sleep, return_when=asyncio.FIRST_COMPLETED)
+                for w in waiters:
+                    w.cancel()
+        finally:
+            tasks = list(self._running.values())
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
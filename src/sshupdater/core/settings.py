@@ -24,3 +24,83 @@ if _theme_file.exists():
         THEME = "light"
 else:
     THEME = "light"  # Fallback-Theme
+
+# Standard: max. parallele Host-Jobs (überschreibbar per DB-Setting "concurrency")
+DEFAULT_CONCURRENCY = 8
+
+# SSH-Verbindungspool: Leerlauf bis zum Schließen, Keepalive-Intervall/-Fehlversuche
+POOL_IDLE_TIMEOUT = 300
+POOL_KEEPALIVE_INTERVAL = 30
+POOL_KEEPALIVE_COUNT_MAX = 3
+
+# Gültigkeit des Host-Capability-Profils in Sekunden (DB-Setting "caps_ttl")
+CAPS_TTL = 24 * 3600
+
+# Paketindex (apt-Listen/dnf-Cache/pacman-DB) gilt so lange als frisch (Sekunden, DB-Setting "index_max_age")
+INDEX_MAX_AGE = 3600
+
+# Ergebnis-Cache für Prüfen/Simulieren/Bereinigen-Simulation (Sekunden, DB-Setting "result_ttl")
+RESULT_TTL = 300
+
+# Daemon: Prüfintervall je Host (Sekunden, DB-Setting "schedule_interval")
+# und Jitter als Anteil des Intervalls (DB-Setting "schedule_jitter")
+SCHEDULE_INTERVAL = 3600
+SCHEDULE_JITTER = 0.1
+
+# TCP-Vorabprüfung vor dem SSH-Handshake: Timeout in Sekunden (DB-Setting "reach_timeout",
+# abschaltbar per "preprobe" = 0) und max. gleichzeitige Sockets
+REACH_TIMEOUT = 2.0
+REACH_CONCURRENCY = 64
+
+# Mehrere Adressen je Host: Versatz bis zum nächsten parallelen Versuch (Sekunden, DB-Setting "connect_stagger")
+CONNECT_STAGGER = 0.25
+
+# Circuit Breaker: nach so vielen Verbindungsfehlern in Folge wird ein Host gesperrt
+# (DB-Setting "breaker_threshold", 0 = aus); Sperrfenster verdoppelt sich ab
+# BREAKER_BASE bis BREAKER_MAX Sekunden ("breaker_base" / "breaker_max")
+BREAKER_THRESHOLD = 3
+BREAKER_BASE = 300
+BREAKER_MAX = 24 * 3600
+
+# Gelernte Timeouts: p99 der letzten TIMEOUT_SAMPLES Laufzeiten × Faktor (DB-Setting "timeout_factor"),
+# erst ab TIMEOUT_MIN_SAMPLES Messwerten; Grenzen je Befehlsart in core/timeouts.py
+TIMEOUT_FACTOR = 3.0
+TIMEOUT_SAMPLES = 50
+TIMEOUT_MIN_SAMPLES = 5
+
+# Entschlüsselte Host-Passwörter so lange im Speicher halten (Sekunden, DB-Setting "credential_ttl", 0 = aus)
+CREDENTIAL_TTL = 900
+
+# Reboot mit Warten: max. Wartezeit bis der Host zurück ist (Sekunden, DB-Setting "reboot_wait_timeout")
+# und Abstand der Erreichbarkeitsprüfungen
+REBOOT_WAIT_TIMEOUT = 600
+REBOOT_POLL_INTERVAL = 2.0
+
+# "Dienste neu starten" lässt diese Units aus (Regex, DB-Setting "restart_skip") –
+# ein Neustart würde Sitzungen bzw. den Desktop beenden
+RESTART_SKIP = r"^(dbus|dbus-broker|systemd-logind|display-manager|gdm|sddm|lightdm)\.service$|^(user|getty|serial-getty)@"
+
+# Live-Ausgabe von Upgrade/Autoremove gebündelt weiterreichen: ein Paket je
+# STREAM_WINDOW Sekunden bzw. spätestens ab STREAM_CHUNK Bytes
+STREAM_WINDOW = 0.05
+STREAM_CHUNK = 64 * 1024
+
+# Upgrade/Autoremove gilt als hängend, wenn so lange keine Ausgabe kam (Sekunden,
+# DB-Setting "stall_idle", 0 = aus); STALL_PROBE: dann Prozessbaum abfragen ("stall_probe")
+STALL_IDLE = 300
+STALL_PROBE = True
+
+# GUI: Fortschrittsspalten (Phase/Prozent) höchstens alle PROGRESS_REFRESH Sekunden neu setzen
+PROGRESS_REFRESH = 0.25
+
+# ETA für Upgrades aus der Historie (Pakete, Download-Größe, Dauer): je Host die letzten ETA_HISTORY Läufe;
+# eigene Läufe erst ab ETA_MIN_SAMPLES, sonst alle Hosts derselben Distro-Familie,
+# ganz ohne Historie ETA_BASE + ETA_PER_PACKAGE × Pakete (Sekunden)
+ETA_HISTORY = 50
+ETA_MIN_SAMPLES = 3
+ETA_BASE = 60.0
+ETA_PER_PACKAGE = 5.0
+
+# FanOut mit Befehlsart: längste erwartete Jobs zuerst. Die Slots werden erst vergeben, wenn alle
+# Hosts die Vorabprüfung hinter sich haben, höchstens aber nach ORDER_SETTLE Sekunden
+ORDER_SETTLE = 0.2
@@ -1,7 +1,9 @@
 from __future__ import annotations
-import asyncio, asyncssh, re
-from typing import Dict, Any, Tuple
-from . import db
+import asyncio, asyncssh, codecs, functools, re, shlex, time
+from typing import Dict, Any, List, Optional, Tuple
+from . import db, probe, parsers, timeouts, keys, reach, eta
+from .pool import get_pool
+from .settings import CAPS_TTL, INDEX_MAX_AGE, REBOOT_WAIT_TIMEOUT, REBOOT_POLL_INTERVAL, RESTART_SKIP, STREAM_WINDOW, STREAM_CHUNK, STALL_IDLE, STALL_PROBE
 
 def _auth_params(host: Dict[str, Any]) -> Dict[str, Any]:
     params: Dict[str, Any] = {}
@@ -12,54 +14,143 @@ def _auth_params(host: Dict[str, Any]) -> Dict[str, Any]:
     else:
         key_path = host.get("key_path")
         if key_path:
-            params["client_keys"] = [key_path]
+            # geparster Key aus dem Cache statt Datei bei jedem Connect neu zu lesen
+            params["client_keys"] = keys.load(key_path) or [key_path]
+    if not keys.agent_enabled():
+        params["agent_path"] = None
     return params
 
-async def _run(conn: asyncssh.SSHClientConnection, cmd: str, timeout: int = 90) -> Tuple[int, str, str]:
+def _connect(host: Dict[str, Any]):
+    """Verbindung aus dem Pool leihen (wird nach Gebrauch offen gehalten)."""
+    return get_pool().connection(host, lambda: _auth_params(host))
+
+def _host_id(conn) -> int | None:
+    return conn.get_extra_info("host_id")
+
+async def _run(conn: asyncssh.SSHClientConnection, cmd: str, timeout: float | None = None,
+               input: str | None = None, kind: str | None = None) -> Tuple[int, str, str]:
+    """
+    Befehl ausführen. Ohne explizites timeout gilt das für (Host, kind) gelernte
+    (timeouts.timeout_for); die Laufzeit fließt anschließend in die Statistik ein.
+    """
+    if timeout is None:
+        timeout = timeouts.timeout_for(_host_id(conn), kind) if kind else 90
+    t0 = time.monotonic()
     try:
-        res = await asyncio.wait_for(conn.run(cmd, check=False), timeout=timeout)
-        return res.exit_status, res.stdout, res.stderr
+        res = await asyncio.wait_for(conn.run(cmd, check=False, input=input), timeout=timeout)
     except asyncio.TimeoutError:
-        return 124, "", f"Timeout after {timeout}s: {cmd}"
-
-async def _detect_distro(conn) -> str:
-    code, out, _ = await _run(conn, "bash -lc 'cat /etc/os-release 2>/dev/null'")
-    if code != 0 or not out:
-        return "unknown"
-    m = re.search(r'^ID=(.+)$', out, re.MULTILINE)
-    if not m:
-        return "unknown"
-    val = m.group(1).strip().strip('"').lower()
-    if val in ("debian","ubuntu","linuxmint","pop"):
+        return 124, "", f"Timeout after {timeout:g}s: {cmd}"
+    if kind:
+        timeouts.record(_host_id(conn), kind, time.monotonic() - t0)
+    return res.exit_status, res.stdout, res.stderr
+
+async def _run_lines(conn: asyncssh.SSHClientConnection, cmd: str, feed, timeout: float | None = None,
+                     input: str | None = None, kind: str | None = None) -> Tuple[int, str]:
+    """
+    Wie _run, aber stdout wird nicht gepuffert, sondern zeilenweise an feed(line)
+    gereicht (Parser aus parsers.py). Liefert (rc, stderr).
+    """
+    if timeout is None:
+        timeout = timeouts.timeout_for(_host_id(conn), kind) if kind else 90
+    t0 = time.monotonic()
+
+    async def drive() -> Tuple[int, str]:
+        async with conn.create_process(cmd, input=input) as proc:
+            err = asyncio.ensure_future(proc.stderr.read())
+            async for line in proc.stdout:
+                feed(line.rstrip("\n"))
+            res = await proc.wait()
+            return res.returncode or 0, await err
+
+    try:
+        rc, err = await asyncio.wait_for(drive(), timeout=timeout)
+    except asyncio.TimeoutError:
+        return 124, f"Timeout after {timeout:g}s: {cmd}"
+    if kind:
+        timeouts.record(_host_id(conn), kind, time.monotonic() - t0)
+    return rc, err
+
+# ---------- Host-Profil (Distro, Paketmanager, sudo, Tools) ----------
+
+# Fehlerbilder, die auf ein veraltetes Profil hindeuten (Tool entfernt, sudoers geändert …)
+_STALE_HINTS = ("command not found", ": not found", "a password is required", "a terminal is required")
+
+def _distro_family(os_id: str, id_like: str = "", has: set | None = None) -> str:
+    has = has or set()
+    for val in [os_id] + id_like.split():
+        val = val.strip().strip('"').lower()
+        for family, ids in probe.FAMILY_IDS.items():
+            if val in ids:
+                return family
+    # Fallback: vorhandener Paketmanager
+    if "apt-get" in has:
         return "debian"
-    if val in ("fedora","rhel","centos","rocky","almalinux","ol"):
+    if "dnf" in has or "yum" in has:
         return "rpm"
-    if val in ("arch","manjaro","endeavouros","arco"):
+    if "pacman" in has:
         return "arch"
     return "unknown"
 
+def _parse_caps(out: str) -> Dict[str, Any]:
+    vals: Dict[str, str] = {}
+    has: set = set()
+    for line in out.splitlines():
+        key, _, val = line.partition("=")
+        if key == "HAS":
+            has.add(val.strip())
+        elif key:
+            vals[key] = val.strip().strip('"')
+    pkg_mgr = next((pm for cmd, pm in (("apt-get","apt"),("dnf","dnf"),("yum","yum"),("pacman","pacman")) if cmd in has), None)
+    return {
+        "family": _distro_family(vals.get("ID", ""), vals.get("ID_LIKE", ""), has),
+        "id": vals.get("ID", "").lower(),
+        "pkg_mgr": pkg_mgr,
+        "root": vals.get("UID") == "0",
+        "sudo_nopasswd": vals.get("SUDO") == "1",
+        "checkupdates": "checkupdates" in has,
+        "needrestart": "needrestart" in has,
+        "kexec": "kexec" in has,
+        "login_shell": vals.get("LOGIN_SHELL") or None,
+    }
+
+async def _probe_caps(conn) -> Dict[str, Any]:
+    code, out, _ = await _run(conn, "bash -l -s", input=probe.CAPS_SCRIPT, kind="caps")
+    if code == 124 or not out:
+        return {"family": "unknown"}
+    return _parse_caps(out)
+
+def _caps_ttl() -> float:
+    try:
+        return float(db.get_setting("caps_ttl", CAPS_TTL))
+    except (TypeError, ValueError):
+        return CAPS_TTL
+
+async def _host_caps(conn, host: Dict[str, Any]) -> Dict[str, Any]:
+    """Profil aus der DB (solange gültig), sonst einmal proben und speichern."""
+    caps = db.get_host_caps(host["id"], max_age=_caps_ttl())
+    if caps is None:
+        caps = await _probe_caps(conn)
+        if caps.get("family") != "unknown":
+            db.set_host_caps(host["id"], caps)
+    return caps
+
+def _invalidate_caps_if_stale(host: Dict[str, Any], rc: int, text: str = "") -> None:
+    """Fehlschlag sieht nach verändertem Host aus -> Profil beim nächsten Mal neu proben."""
+    if rc == 127 or any(h in (text or "") for h in _STALE_HINTS):
+        db.clear_host_caps(host["id"])
+
 # ---------- Update Check  ----------
-async def _check_debian(conn):
-    await _run(conn, "bash -lc 'export LC_ALL=C LANG=C; sudo -n apt-get -qq update'")
-    code, out, err = await _run(conn, "bash -lc 'export LC_ALL=C LANG=C; apt-get -s dist-upgrade'")
+async def _check_debian(conn, refresh: str = "auto"):
+    await _run(conn, "bash -l -s", input=probe.apt_refresh_script(refresh, _index_max_age()), kind="refresh")
+    apt = parsers.AptParser()
+    code, err = await _run_lines(conn, "bash -lc 'export LC_ALL=C LANG=C; apt-get -s dist-upgrade'", apt.feed, kind="sim")
     if code == 124:
         return -1, "Timeout"
-
-    n = 0
-    for line in out.splitlines():
-        if line.startswith("Inst "):  # APT schreibt 'Inst <pkg> [...]'
-            n += 1
-
-    # Fallback: Summary-Zeile 'X upgraded, Y newly installed, ...'
-    if n == 0:
-        m = re.search(r'(\d+)\s+upgraded', out)
-        if m:
-            n = int(m.group(1))
-
-    return n, err.strip()
+    # Inst-Zeilen, sonst Summary-Zeile 'X upgraded, Y newly installed, ...'
+    return apt.installs, err.strip()
 
 async def _check_rpm(conn):
-    code, out, err = await _run(conn, "sudo -n dnf -q check-update; echo $?")
+    code, out, err = await _run(conn, "sudo -n dnf -q check-update; echo $?", kind="check")
     last = out.strip().splitlines()[-1] if out else "0"
     try:
         rc = int(last)
@@ -69,133 +160,502 @@ async def _check_rpm(conn):
     return n, err.strip()
 
 async def _check_arch(conn):
-    code, out, err = await _run(conn, "bash -lc 'command -v checkupdates >/dev/null 2>&1 && checkupdates | wc -l || echo 0'")
+    code, out, err = await _run(conn, "bash -lc 'command -v checkupdates >/dev/null 2>&1 && checkupdates | wc -l || echo 0'", kind="check")
     try:
         n = int(out.strip()) if out.strip() else 0
     except ValueError:
         n = 0
     return n, err.strip()
 
-async def check_updates_for_host(host: Dict[str, Any]) -> Dict[str, Any]:
+def _known_fingerprint(host: Dict[str, Any]) -> str | None:
+    """Fingerprint des letzten Checks – nur brauchbar, wenn dazu ein Ergebnis gespeichert ist."""
+    if host.get("pending_updates") is None:
+        return None
+    return host.get("state_fp") or None
+
+def _cached_check(host: Dict[str, Any], distro: str, fingerprint: str | None) -> Dict[str, Any]:
+    return {"distro": distro, "updates": int(host["pending_updates"]), "cached": True, "fingerprint": fingerprint, "note": ""}
+
+async def _check_combined(conn, host: Dict[str, Any], refresh: str = "auto", force: bool = False) -> Dict[str, Any] | None:
+    """
+    Update-Check in einem einzigen Exec (Skript je Distro-Familie, siehe probe.py).
+    Fehlt das Host-Profil, wird es im selben Roundtrip miterhoben.
+    None -> kein auswertbarer Block (z. B. keine bash), klassischer Weg als Fallback.
+    """
+    caps = db.get_host_caps(host["id"], max_age=_caps_ttl())
+    known_fp = None if force else _known_fingerprint(host)
+    script = probe.check_script(caps.get("family") if caps else None, refresh, _index_max_age(), known_fp)
+    # Laufzeit erst nach dem Parsen einordnen: Abkürzung (cached) und echter Check getrennt
+    t0 = time.monotonic()
+    code, out, err = await _run(conn, "bash -l -s", input=script, timeout=timeouts.timeout_for(host["id"], "check"))
+    if code == 124:
+        return {"distro": "?", "updates": -1, "note": "Timeout"}
+    head, block = probe.split_output(out or "")
+    if block is None:
+        return None
+    if caps is None:
+        caps = _parse_caps(head)
+        if caps.get("family") != "unknown":
+            db.set_host_caps(host["id"], caps)
+    res = probe.parse_check(block)
+    timeouts.record(host["id"], "check_cached" if res["cached"] else "check", time.monotonic() - t0)
+    if res["cached"]:
+        return _cached_check(host, res["distro"], res["fingerprint"])
+    note = (err or "").strip()
+    rrc = res.pop("refresh_rc")
+    if rrc:
+        note = (note + "\n" if note else "") + f"Index-Refresh fehlgeschlagen (rc={rrc})"
+    res["note"] = note
+    return res
+
+def _refresh_mode() -> str:
+    mode = db.get_setting("refresh_mode", "auto")
+    return mode if mode in probe.REFRESH_MODES else "auto"
+
+def _index_max_age() -> int:
+    try:
+        return int(db.get_setting("index_max_age", INDEX_MAX_AGE))
+    except (TypeError, ValueError):
+        return INDEX_MAX_AGE
+
+def _combined_check_enabled() -> bool:
+    return db.get_setting("check_mode", "combined") == "combined"
+
+async def check_updates_for_host(host: Dict[str, Any], combined: bool | None = None, refresh: str | None = None, force: bool = False) -> Dict[str, Any]:
+    """
+    Prüft ausstehende Updates. combined=True (Standard, Setting 'check_mode')
+    nutzt den Einzel-Roundtrip-Probe, combined=False die klassischen Einzelbefehle.
+    refresh: 'auto' | 'always' | 'never' (Schnellprüfung), Standard per Setting 'refresh_mode'.
+    Hat sich der Host seit dem letzten Check nicht verändert (Fingerprint in
+    hosts.state_fp), wird pending_updates übernommen (cached=True); force=True prüft immer.
+    """
     name = host.get("name") or f"id:{host['id']}"
     ip = host.get("primary_ip")
-    port = int(host.get("port") or 22)
     user = host.get("user") or "root"
     if not ip or not user:
         return {"host_id": host["id"], "name": name, "status": "error", "note": "IP/User fehlt"}
 
-    params = _auth_params(host)
     try:
-        async with asyncssh.connect(ip, port=port, username=user, known_hosts=None, **params) as conn:
-            distro = await _detect_distro(conn)
+        async with _connect(host) as conn:
+            if combined is None:
+                combined = _combined_check_enabled()
+            refresh = refresh or _refresh_mode()
+            res = await _check_combined(conn, host, refresh, force) if combined else None
+            if res is not None:
+                if res["distro"] == "unknown":
+                    return {"host_id": host["id"], "name": name, "status": "error", "note": "Unbekannte Distro"}
+                _invalidate_caps_if_stale(host, 0, res["note"])
+                res["updates"] = max(res["updates"], 0)
+                if not res.get("cached"):
+                    db.set_reboot_required(host["id"], res["reboot_required"])
+                return {"host_id": host["id"], "name": name, "status": "ok", **res}
+
+            distro = (await _host_caps(conn, host))["family"]
+            fingerprint = None
+            if distro in ("debian", "rpm", "arch"):
+                code, out, _ = await _run(conn, "bash -l -s", input=probe.state_script(distro, refresh, _index_max_age()), kind="state")
+                fingerprint, _, do_refresh = (out or "").strip().partition(" ")
+                known_fp = None if force else _known_fingerprint(host)
+                if known_fp and fingerprint == known_fp and do_refresh == "0":
+                    return {"host_id": host["id"], "name": name, "status": "ok", **_cached_check(host, distro, fingerprint)}
             if distro == "debian":
-                n, note = await _check_debian(conn)
+                n, note = await _check_debian(conn, refresh)
             elif distro == "rpm":
                 n, note = await _check_rpm(conn)
             elif distro == "arch":
                 n, note = await _check_arch(conn)
             else:
                 return {"host_id": host["id"], "name": name, "status": "error", "note": "Unbekannte Distro"}
-            return {"host_id": host["id"], "name": name, "status": "ok", "distro": distro, "updates": max(n,0), "note": note or ""}
+            _invalidate_caps_if_stale(host, 0, note)
+            return {"host_id": host["id"], "name": name, "status": "ok", "distro": distro, "updates": max(n,0), "fingerprint": fingerprint or None, "note": note or ""}
     except (asyncssh.Error, OSError) as e:
         return {"host_id": host["id"], "name": name, "status": "error", "note": f"SSH: {e}"}
 
 # ---------- Simulation (Dry-Run) ----------
 
-async def _sim_debian(conn):
-    # 1) Index aktualisieren (sprachneutral)
-    await _run(conn, "bash -lc 'export LC_ALL=C LANG=C; sudo -n apt-get -qq update'")
+async def _sim_debian(conn, refresh: str = "auto"):
+    # 1) Index aktualisieren, falls älter als erlaubt (sprachneutral)
+    await _run(conn, "bash -l -s", input=probe.apt_refresh_script(refresh, _index_max_age()), kind="refresh")
 
-    # 2) Simulation fahren
-    code, out, err = await _run(conn, "bash -lc 'export LC_ALL=C LANG=C; apt-get -s dist-upgrade'")
+    # 2) Simulation fahren, Ausgabe direkt parsen
+    apt = parsers.AptParser()
+    code, err = await _run_lines(conn, "bash -lc 'export LC_ALL=C LANG=C; apt-get -s dist-upgrade'", apt.feed, kind="sim")
 
     # 3) Pakete zählen
-    n = 0
-    for line in out.splitlines():
-        if line.startswith("Inst "):   # apt-get -s schreibt 'Inst <pkg> ...'
-            n += 1
+    n = apt.count("upgrade", "install")
     if n == 0:
-        code2, out2, _ = await _run(conn, "bash -lc 'export LC_ALL=C LANG=C; apt list --upgradable 2>/dev/null | tail -n +2 | wc -l'")
+        code2, out2, _ = await _run(conn, "bash -lc 'export LC_ALL=C LANG=C; apt list --upgradable 2>/dev/null | tail -n +2 | wc -l'", kind="list")
         try: n = max(n, int(out2.strip()))
         except: pass
 
-    return n, out, err
+    return n, "\n".join(apt.lines), err, apt.packages, apt.download_bytes
 
-async def _sim_rpm(conn):
-    # 'assumeno' zeigt, was passieren würde
-    code, out, err = await _run(conn, "sudo -n dnf -q upgrade --refresh --assumeno")
-    # Heuristik: Zeilen mit 'Upgrading ' zählen
-    _, n_out, _ = await _run(conn, r"bash -lc \"sudo -n dnf -q upgrade --refresh --assumeno | grep -c -E 'Upgrading|Downgrading|Installing' || true\"")
-    try:
-        count = int(n_out.strip())
-    except ValueError:
-        count = 0
-    return count, out, err
+_RPMDB_MARK = "@@SSHU-RPMDB"
+
+async def _sim_rpm(conn, refresh: str = "auto"):
+    # dnf nur EINMAL (--refresh nur bei veraltetem Cache); installierte Versionen im selben Exec
+    script = probe.sim_rpm_script(refresh, _index_max_age(), _RPMDB_MARK)
+    dnf = parsers.DnfParser()
+    installed: Dict[str, str] = {}
+    feed = dnf.feed
+
+    def route(line: str) -> None:
+        nonlocal feed
+        if _RPMDB_MARK in line:
+            feed = lambda l: parsers.feed_rpm_qa(installed, l)
+        else:
+            feed(line)
+
+    code, err = await _run_lines(conn, "bash -l -s", route, input=script, kind="sim")
+    pkgs = dnf.finish(installed)
+    sizes = [p["size_bytes"] for p in pkgs if p.get("size_bytes") is not None]
+    return dnf.count(), "\n".join(dnf.lines), err, pkgs, (sum(sizes) if sizes else None)
 
 async def _sim_arch(conn):
     # Paketliste (ähnlich Dry-Run)
-    code, out, err = await _run(conn, "bash -lc 'command -v checkupdates >/dev/null 2>&1 && checkupdates || true'")
-    count = len([l for l in out.splitlines() if l.strip()])
-    return count, out, err
+    pac = parsers.PacmanParser()
+    code, err = await _run_lines(conn, "bash -lc 'command -v checkupdates >/dev/null 2>&1 && checkupdates || true'", pac.feed, kind="sim")
+    return pac.count(), "\n".join(pac.lines), err, pac.packages, None  # checkupdates kennt keine Größen
 
-async def simulate_upgrade_for_host(host: Dict[str, Any]) -> Dict[str, Any]:
-    """Gibt geplante Paketupdates zurück (ohne Änderungen)."""
+async def simulate_upgrade_for_host(host: Dict[str, Any], refresh: str | None = None) -> Dict[str, Any]:
+    """Gibt geplante Paketupdates zurück (ohne Änderungen). refresh wie bei check_updates_for_host."""
     name = host.get("name") or f"id:{host['id']}"
     ip = host.get("primary_ip")
-    port = int(host.get("port") or 22)
     user = host.get("user") or "root"
     if not ip or not user:
         return {"host_id": host["id"], "name": name, "status": "error", "note": "IP/User fehlt"}
 
-    params = _auth_params(host)
     try:
-        async with asyncssh.connect(ip, port=port, username=user, known_hosts=None, **params) as conn:
-            distro = await _detect_distro(conn)
+        async with _connect(host) as conn:
+            distro = (await _host_caps(conn, host))["family"]
+            extra: Dict[str, Any] = {}
+            refresh = refresh or _refresh_mode()
             if distro == "debian":
-                n, details, note = await _sim_debian(conn)
+                n, details, note, extra["package_list"], size = await _sim_debian(conn, refresh)
             elif distro == "rpm":
-                n, details, note = await _sim_rpm(conn)
+                n, details, note, extra["package_list"], size = await _sim_rpm(conn, refresh)
             elif distro == "arch":
-                n, details, note = await _sim_arch(conn)
+                n, details, note, extra["package_list"], size = await _sim_arch(conn)
             else:
                 return {"host_id": host["id"], "name": name, "status": "error", "note": "Unbekannte Distro"}
+            _invalidate_caps_if_stale(host, 0, note)
+            # erwartete Upgrade-Dauer aus der Historie (Sekunden)
+            extra["download_bytes"] = size
+            extra["eta"] = eta.predict(host["id"], distro, n, size)
             return {
                 "host_id": host["id"], "name": name, "status": "ok",
-                "distro": distro, "packages": n, "details": details, "note": note or ""
+                "distro": distro, "packages": n, "details": details, "note": note or "", **extra
             }
     except (asyncssh.Error, OSError) as e:
         return {"host_id": host["id"], "name": name, "status": "error", "note": f"SSH: {e}"}
 
 # ---------- Upgrade (mit Live-Streaming) ----------
 
-async def _stream(conn, cmd: str, timeout: int = 0):
+# Paketmanager-Prozesse, deren Prozessbaum bei einem Hänger gezeigt wird
+_PKG_PROCS = re.compile(r"(^|/)(apt|apt-get|aptitude|dpkg|dnf|dnf5|yum|rpm|pacman|needrestart)(\s|$)")
+# typische Rückfragen (dpkg-Conffile, apt/dnf/pacman-Bestätigung)
+_PROMPT_HINT = re.compile(r"\[default=\w\]|\(Y/I/N/O/D/Z\)|\[[Yy]/[Nn]\]|Is this ok|\?\s*$")
+
+def _stall_idle() -> float:
+    try:
+        return max(0.0, float(db.get_setting("stall_idle", STALL_IDLE)))
+    except (TypeError, ValueError):
+        return STALL_IDLE
+
+def _stall_probe_enabled() -> bool:
+    return str(db.get_setting("stall_probe", STALL_PROBE)).lower() not in ("0", "false", "no", "off")
+
+async def _stall_probe(conn) -> List[str]:
+    """Prozessbaum der Paketmanager (pid stat laufzeit wchan befehl) über einen zweiten Kanal."""
+    code, out, _ = await _run(conn, "ps -eo pid=,ppid=,stat=,etime=,wchan:20=,args= 2>/dev/null", timeout=10)
+    rows: Dict[int, Tuple[int, str]] = {}
+    for line in (out or "").splitlines():
+        parts = line.split(None, 5)
+        if len(parts) == 6 and parts[0].isdigit() and parts[1].isdigit():
+            rows[int(parts[0])] = (int(parts[1]), " ".join(parts[2:5]) + " " + parts[5][:160])
+    keep = {pid for pid, (_, text) in rows.items() if _PKG_PROCS.search(text.split(" ", 3)[-1])}
+    changed = True
+    while changed:  # Nachfahren (dpkg -> maintainer-skript -> ...) dazunehmen
+        changed = False
+        for pid, (ppid, _) in rows.items():
+            if ppid in keep and pid not in keep:
+                keep.add(pid)
+                changed = True
+    return [f"{pid} {rows[pid][1]}" for pid in sorted(keep)][:30]
+
+class _Watchdog:
+    """
+    Merkt sich die letzte Ausgabe eines Streams; nach STALL_IDLE Sekunden Stille
+    (Setting 'stall_idle', 0 = aus) ist ein Stall-Ereignis fällig, danach erneut
+    je weiteres Fenster, solange nichts kommt.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.idle = _stall_idle()
+        self.last = loop.time()
+        self.next = self.last + self.idle if self.idle else None
+        self.stalled = False
+        self.tail = ""
+
+    def output(self, text: str) -> bool:
+        """Ausgabe gesehen; True, wenn der Stream vorher als hängend gemeldet war."""
+        self.last = self.loop.time()
+        self.next = self.last + self.idle if self.idle else None
+        self.tail = (self.tail + text)[-400:]
+        was, self.stalled = self.stalled, False
+        return was
+
+    def wait(self) -> float | None:
+        return None if self.next is None else max(0.0, self.next - self.loop.time())
+
+    def due(self) -> bool:
+        return self.next is not None and self.loop.time() >= self.next
+
+    async def event(self, conn) -> Dict[str, Any]:
+        self.stalled = True
+        self.next += self.idle
+        last_line = next((l for l in reversed(self.tail.splitlines()) if l.strip()), "")
+        ev: Dict[str, Any] = {"stall": round(self.loop.time() - self.last), "last_line": last_line[-200:],
+                              "hint": "wartet vermutlich auf eine Eingabe" if _PROMPT_HINT.search(last_line) else ""}
+        if _stall_probe_enabled():
+            try:
+                ev["tree"] = await _stall_probe(conn)
+            except (asyncssh.Error, OSError):
+                ev["tree"] = []
+        return ev
+
+def _min_wait(*waits: float | None) -> float | None:
+    vals = [w for w in waits if w is not None]
+    return min(vals) if vals else None
+
+# Stream-Befehle melden zuerst ihre Shell-PID auf stderr (für den Abbruch)
+_PID_MARK = "@@SSHU-PID="
+_BACKGROUND: set = set()
+
+def _with_pid(cmd: str) -> str:
+    return f'echo "{_PID_MARK}$$" >&2; {cmd}'
+
+async def _kill_remote(conn, pid: int) -> None:
+    # sshd startet jede Sitzung als eigene Prozessgruppe -> ganze Gruppe beenden
+    cmd = (f'[ "$(ps -o pgid= -p {pid} | tr -d " ")" = "{pid}" ] && kill -TERM -{pid} 2>/dev/null'
+           f' || kill -TERM {pid} 2>/dev/null; true')
+    try:
+        await _run(conn, cmd, timeout=10)
+    except (asyncssh.Error, OSError):
+        pass
+
+def _stop_remote(conn, proc, pid_read: asyncio.Future) -> None:
+    """Abbruch (Timeout, Benutzer, Stall): Remote-Prozessgruppe beenden, Kanal schließen."""
+    pid = None
+    if pid_read.done() and not pid_read.cancelled() and pid_read.exception() is None:
+        line = pid_read.result()
+        line = line.decode(errors="replace") if isinstance(line, bytes) else line
+        if line.startswith(_PID_MARK) and line[len(_PID_MARK):].strip().isdigit():
+            pid = int(line[len(_PID_MARK):])
+    pid_read.cancel()
+    if pid:
+        task = asyncio.ensure_future(_kill_remote(conn, pid))
+        _BACKGROUND.add(task)
+        task.add_done_callback(_BACKGROUND.discard)
+    proc.close()
+
+async def _stream(conn, cmd: str, timeout: float | None = None, kind: str | None = None):
     """
     Führt einen Befehl aus und liefert stdout zeilenweise (yield).
-    timeout=0 -> kein globales Timeout (Paket-Upgrades können dauern).
-    Gibt am Ende eine Zeile [RC=<code>] aus.
+    Gesamt-Timeout wie bei _run aus (Host, kind) gelernt; timeout=0 -> keins.
+    Bei timeouts.SOFT_KINDS wird nie abgebrochen, nach Ablauf kommt einmal
+    {"overdue": Sekunden}.
+    Kommt STALL_IDLE Sekunden keine Ausgabe, wird zusätzlich ein dict
+    {"stall": Sekunden, "hint", "last_line", "tree"} geliefert, bei neuer
+    Ausgabe danach {"resumed": True}.
+    Gibt am Ende eine Zeile [RC=<code>] aus (124 bei Timeout).
     """
-    proc = await conn.create_process(cmd)
+    if timeout is None:
+        timeout = timeouts.timeout_for(_host_id(conn), kind) if kind else 0
+    hard, warn = (0, timeout) if kind in timeouts.SOFT_KINDS else (timeout, 0)
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    proc = await conn.create_process(_with_pid(cmd))
+    pid_read = asyncio.ensure_future(proc.stderr.readline())
+    dog = _Watchdog(loop)
     rc = 0
+    done = False
+    # readline läuft weiter, wenn nur der Watchdog aufwacht (kein Abbruch mitten im Lesen)
+    read = asyncio.ensure_future(proc.stdout.readline())
     try:
         while True:
-            line = await proc.stdout.readline()
-            if not line:
-                break
-            yield line.rstrip("\n")
-        rc = await proc.wait()
+            elapsed = loop.time() - t0
+            if hard and elapsed >= hard:
+                raise asyncio.TimeoutError
+            if warn and elapsed >= warn:
+                yield {"overdue": warn}
+                warn = 0
+            left = _min_wait(*(t - elapsed for t in (hard, warn) if t))
+            ready, _ = await asyncio.wait({read}, timeout=_min_wait(left, dog.wait()))
+            if read in ready:
+                line = read.result()
+                if not line:
+                    break
+                if dog.output(line):
+                    yield {"resumed": True}
+                yield line.rstrip("\n")
+                read = asyncio.ensure_future(proc.stdout.readline())
+            elif dog.due():
+                yield await dog.event(conn)
+        rc = (await proc.wait()).returncode or 0
+        done = True
+        if kind:
+            timeouts.record(_host_id(conn), kind, loop.time() - t0)
+    except asyncio.TimeoutError:
+        yield f"[client] Timeout nach {hard:g}s: {cmd}"
+        rc = 124
     except Exception as e:
         yield f"[client] stream error: {e}"
         rc = 1
+    finally:
+        read.cancel()
+        if not done:
+            _stop_remote(conn, proc, pid_read)
     # kein return in async generatoren
     yield f"[RC={rc}]"
 
-async def _upgrade_debian(conn, use_sudo: bool):
-    prefix = "sudo -n " if use_sudo else ""
+async def _stream_chunks(conn, cmd: str, timeout: float | None = None, kind: str | None = None):
+    """
+    Wie _stream, aber roh statt zeilenweise: stdout wird gebündelt und als
+    {"offset", "end", "data"} geliefert (Byte-Offsets, data als Text) – ein Paket
+    je STREAM_WINDOW Sekunden bzw. sobald STREAM_CHUNK Bytes anliegen.
+    Stall-/Resumed-/Overdue-Ereignisse wie bei _stream. Zum Schluss {"rc": <code>} (124 bei Timeout).
+    """
+    if timeout is None:
+        timeout = timeouts.timeout_for(_host_id(conn), kind) if kind else 0
+    hard, warn = (0, timeout) if kind in timeouts.SOFT_KINDS else (timeout, 0)
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    proc = await conn.create_process(_with_pid(cmd), encoding=None)
+    pid_read = asyncio.ensure_future(proc.stderr.readline())
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    dog = _Watchdog(loop)
+    buf = bytearray()
+    offset = 0
+    flush_at: float | None = None
+    rc = 0
+    done = False
+
+    def batch(final: bool = False) -> Dict[str, Any]:
+        nonlocal offset
+        start, offset = offset, offset + len(buf)
+        data = decoder.decode(bytes(buf), final)
+        buf.clear()
+        return {"offset": start, "end": offset, "data": data}
+
+    # Lesevorgang läuft weiter, wenn nur das Zeitfenster abläuft (kein Abbruch mitten im read)
+    read = asyncio.ensure_future(proc.stdout.read(STREAM_CHUNK))
+    try:
+        while True:
+            now = loop.time()
+            elapsed = now - t0
+            if hard and elapsed >= hard:
+                raise asyncio.TimeoutError
+            if warn and elapsed >= warn:
+                yield {"overdue": warn}
+                warn = 0
+            left = _min_wait(*(t - elapsed for t in (hard, warn) if t))
+            flush_wait = None if flush_at is None else max(0.0, flush_at - now)
+            ready, _ = await asyncio.wait({read}, timeout=_min_wait(left, flush_wait, dog.wait()))
+            if read in ready:
+                data = read.result()
+                if not data:
+                    break
+                if dog.output(data[-400:].decode("utf-8", "replace")):
+                    yield {"resumed": True}
+                buf += data
+                flush_at = flush_at or loop.time() + STREAM_WINDOW
+                read = asyncio.ensure_future(proc.stdout.read(STREAM_CHUNK))
+            if buf and (len(buf) >= STREAM_CHUNK or loop.time() >= flush_at):
+                yield batch()
+                flush_at = None
+            if not buf and dog.due():
+                yield await dog.event(conn)
+        if buf:
+            yield batch(final=True)
+        rc = (await proc.wait()).returncode or 0
+        done = True
+        if kind:
+            timeouts.record(_host_id(conn), kind, loop.time() - t0)
+    except asyncio.TimeoutError:
+        if buf:
+            yield batch(final=True)
+        yield {"offset": offset, "end": offset, "data": f"\n[client] Timeout nach {hard:g}s: {cmd}\n"}
+        rc = 124
+    except Exception as e:
+        yield {"offset": offset, "end": offset, "data": f"\n[client] stream error: {e}\n"}
+        rc = 1
+    finally:
+        read.cancel()
+        if not done:
+            _stop_remote(conn, proc, pid_read)
+    yield {"rc": rc}
+
+async def _relay(gen, host_id: int, progress: Optional[parsers.ProgressParser] = None):
+    """
+    Ausgabe von _stream bzw. _stream_chunks vereinheitlichen:
+    {"type":"line"} bzw. {"type":"chunk","host_id",...}, {"type":"stall",...} /
+    {"type":"resumed"} vom Watchdog, zuletzt {"type":"rc","rc"}.
+    Mit progress (parsers.ProgressParser) zusätzlich {"type":"progress","host_id",
+    "phase","percent"}, sobald der Parser eine Änderung meldet.
+    """
+    rc = 0
+    splitter = parsers.LineSplitter()
+
+    def track(lines):
+        for l in lines:
+            p = progress.feed(l)
+            if p:
+                yield {"type": "progress", "host_id": host_id, **p}
+
+    async for item in gen:
+        if isinstance(item, dict):
+            if "rc" in item:
+                rc = item["rc"]
+            elif "stall" in item:
+                yield {"type": "stall", "host_id": host_id, "idle": item.pop("stall"), **item}
+            elif "resumed" in item:
+                yield {"type": "resumed", "host_id": host_id}
+            elif "overdue" in item:
+                yield {"type": "overdue", "host_id": host_id, "limit": item["overdue"]}
+            else:
+                yield {"type": "chunk", "host_id": host_id, **item}
+                if progress:
+                    for ev in track(splitter.feed(item["data"])):
+                        yield ev
+        elif item.startswith("[RC="):
+            try:
+                rc = int(item[4:-1])
+            except ValueError:
+                rc = 0
+        else:
+            yield {"type": "line", "line": item}
+            if progress:
+                for ev in track([item]):
+                    yield ev
+    if progress:
+        for ev in track(splitter.flush()):
+            yield ev
+    yield {"type": "rc", "rc": rc}
+
+# Live-Ausgabe immer englisch (ProgressParser/ETA), auch wenn PAM bzw. /etc/default/locale
+# z. B. de_DE setzt; sudo reicht LANG/LC_* per env_check durch
+_C_LOCALE = "LC_ALL=C LANG=C "
+
+async def _upgrade_debian(conn, use_sudo: bool, stream=_stream):
+    prefix = _C_LOCALE + ("sudo -n " if use_sudo else "")
 
     # Paketlisten aktualisieren
     async for _ in _stream(
         conn,
-        f"{prefix}apt-get update -y -o=Dpkg::Use-Pty=0"
+        f"{prefix}apt-get update -y -o=Dpkg::Use-Pty=0",
+        kind="refresh",
     ):
         pass
 
@@ -204,122 +664,203 @@ async def _upgrade_debian(conn, use_sudo: bool):
         f"{prefix}DEBIAN_FRONTEND=noninteractive "
         "apt-get -y dist-upgrade -o=Dpkg::Use-Pty=0"
     )
-    async for line in _stream(conn, cmd):
+    async for line in stream(conn, cmd, kind="upgrade"):
         yield line
 
 
-async def _upgrade_rpm(conn):
-    async for line in _stream(conn, "sudo -n dnf -y upgrade --refresh"):
+async def _upgrade_rpm(conn, stream=_stream):
+    async for line in stream(conn, f"{_C_LOCALE}sudo -n dnf -y upgrade --refresh", kind="upgrade"):
         yield line
 
-async def _upgrade_arch(conn):
-    async for line in _stream(conn, "sudo -n pacman -Syu --noconfirm"):
+async def _upgrade_arch(conn, stream=_stream):
+    async for line in stream(conn, f"{_C_LOCALE}sudo -n pacman -Syu --noconfirm", kind="upgrade"):
         yield line
 
-async def upgrade_host_stream(host: Dict[str, Any]):
+async def upgrade_host_stream(host: Dict[str, Any], chunked: bool = False):
     """
     Async-Generator:
       - liefert während des Upgrades dicts: {"type":"line","line": "..."}
+        bzw. mit chunked=True gebündelt {"type":"chunk","host_id","offset","end","data"}
+      - dazwischen {"type":"progress","host_id","phase","percent","eta"} (download/unpack/configure,
+        eta = geschätzte Restzeit in Sekunden), {"type":"stall"|"resumed"} vom Watchdog und
+        {"type":"overdue","limit"}, wenn das Upgrade die Warnschwelle überschreitet (kein Abbruch)
       - am Ende ein dict: {"type":"result","result": {"status": "...", "note": "...", "distro": "..."}}
     """
-    name = host.get("name") or f"id:{host['id']}"
     ip = host.get("primary_ip")
-    port = int(host.get("port") or 22)
     user = host.get("user") or "root"
     if not ip or not user:
         # Ergebnis "yielden", nicht returnen
         yield {"type": "result", "result": {"status": "error", "note": "IP/User fehlt"}}
         return
 
-    params = _auth_params(host)
     try:
-        async with asyncssh.connect(ip, port=port, username=user, known_hosts=None, **params) as conn:
-            distro = await _detect_distro(conn)
+        async with _connect(host) as conn:
+            distro = (await _host_caps(conn, host))["family"]
             # nur sudo verwenden, wenn wir NICHT als root eingeloggt sind
             use_sudo = (user != "root")
+            packages, size = eta.planned(host)
+            predicted = eta.predict(host["id"], distro, packages, size)
+            # Warnschwelle wächst mit den geplanten Paketen; abgebrochen wird nie (timeouts.SOFT_KINDS)
+            stream = functools.partial(_stream_chunks if chunked else _stream,
+                                       timeout=timeouts.soft_limit(host["id"], "upgrade", predicted))
             if distro == "debian":
-                gen = _upgrade_debian(conn, use_sudo)
+                gen = _upgrade_debian(conn, use_sudo, stream)
             elif distro == "rpm":
-                gen = _upgrade_rpm(conn)
+                gen = _upgrade_rpm(conn, stream)
             elif distro == "arch":
-                gen = _upgrade_arch(conn)
+                gen = _upgrade_arch(conn, stream)
             else:
                 yield {"type": "result", "result": {"status": "error", "note": "Unbekannte Distro"}}
                 return
 
             rc = 0
-            async for line in gen:
-                # Zeilen streamen
-                if line.startswith("[RC="):
-                    # Exitcode extrahieren
-                    try:
-                        rc = int(line[4:-1])
-                    except Exception:
-                        rc = 0
+            progress = parsers.ProgressParser(distro)
+            t0 = time.monotonic()
+            async for ev in _relay(gen, host["id"], progress):
+                # Zeilen bzw. Pakete (+ Fortschritt mit Restzeit) streamen, Exitcode merken
+                if ev["type"] == "rc":
+                    rc = ev["rc"]
                 else:
-                    yield {"type": "line", "line": line}
-
+                    if ev["type"] == "progress":
+                        ev["eta"] = eta.remaining(predicted, time.monotonic() - t0, ev.get("percent"))
+                    yield ev
+
+            # keine Paketschritte erkannt, obwohl welche geplant waren (unbekanntes Ausgabeformat):
+            # nicht als "0 Pakete" speichern, das verfälscht die Schätzung
+            if rc == 0 and (progress.packages or not packages):
+                eta.record(host["id"], distro, progress.packages, progress.download_bytes, time.monotonic() - t0)
+            _invalidate_caps_if_stale(host, rc)
+            # Neustart-Bedarf gleich in derselben Sitzung erheben
+            try:
+                needs = await _collect_needs(conn, host)
+            except (asyncssh.Error, OSError):
+                needs = {}
             # Finales Ergebnis liefern
-            yield {"type": "result", "result": {"status": "ok" if rc == 0 else "error", "note": f"rc={rc}", "distro": distro}}
+            yield {"type": "result", "result": {"status": "ok" if rc == 0 else "error",
+                                                "note": f"rc={rc}{needs_note(needs)}", "distro": distro, **needs}}
             return
     except (asyncssh.Error, OSError) as e:
         yield {"type": "result", "result": {"status": "error", "note": f"SSH: {e}"}}
         return
+# ---------- Neustart-Bedarf / Dienste neu starten ----------
+
+async def _collect_needs(conn, host: Dict[str, Any]) -> Dict[str, Any]:
+    """reboot-required(.pkgs), needs-restarting, needrestart -b auswerten und speichern."""
+    code, out, _ = await _run(conn, "bash -l -s", input=probe.NEEDS_SCRIPT, kind="state")
+    _, block = probe.split_output(out or "")
+    if block is None:
+        return {}
+    needs = probe.parse_needs(block)
+    db.set_restart_needs(host["id"], needs)
+    return needs
+
+def needs_note(needs: Dict[str, Any]) -> str:
+    parts = []
+    if needs.get("reboot_required"):
+        pkgs = needs.get("reboot_pkgs") or []
+        parts.append("Neustart erforderlich" + (f" ({', '.join(pkgs)})" if pkgs else ""))
+    if needs.get("services"):
+        parts.append(f"{len(needs['services'])} Dienst(e) neu zu starten")
+    return "".join(f" – {p}" for p in parts)
+
+def _restart_skip():
+    try:
+        return re.compile(db.get_setting("restart_skip", RESTART_SKIP) or "$^")
+    except re.error:
+        return re.compile(RESTART_SKIP)
+
+async def restart_services_for_host(host: Dict[str, Any], dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Bedarf frisch erheben und nur die betroffenen Dienste neu starten
+    (needrestart/needs-restarting); Units aus RESTART_SKIP bleiben unangetastet.
+    dry_run=True meldet nur den Bedarf. Ein nötiger Reboot wird nur gemeldet.
+    """
+    name = host.get("name") or f"id:{host['id']}"
+    base = {"host_id": host["id"], "name": name}
+    if not host.get("primary_ip"):
+        return {**base, "status": "error", "note": "IP/User fehlt"}
+    try:
+        async with _connect(host) as conn:
+            needs = await _collect_needs(conn, host)
+            skip = _restart_skip()
+            todo = [s for s in needs.get("services", []) if not skip.search(s)]
+            skipped = [s for s in needs.get("services", []) if skip.search(s)]
+            if dry_run or not todo:
+                note = ("keine Dienste betroffen" if not needs.get("services") else "Dienste: " + " ".join(needs["services"]))
+                return {**base, "status": "ok", "restarted": [], "failed": [], "skipped": skipped,
+                        "note": note + needs_note({"reboot_required": needs.get("reboot_required")}), **needs}
+            prefix = "" if (host.get("user") or "root") == "root" else "sudo -n "
+            units = " ".join(shlex.quote(s) for s in todo)
+            cmd = f"for u in {units}; do {prefix}systemctl restart \"$u\" >/dev/null 2>&1 || echo \"FAIL=$u\"; done"
+            code, out, err = await _run(conn, cmd, kind="restart")
+            if code == 124:
+                return {**base, "status": "error", "note": err, **needs}
+            failed = [l[5:] for l in (out or "").splitlines() if l.startswith("FAIL=")]
+            after = await _collect_needs(conn, host)
+            restarted = [s for s in todo if s not in failed]
+            note = f"{len(restarted)} Dienst(e) neu gestartet"
+            if failed:
+                note += f", fehlgeschlagen: {' '.join(failed)}"
+            if skipped:
+                note += f", ausgelassen: {' '.join(skipped)}"
+            return {**base, "status": "error" if failed else "ok", "restarted": restarted, "failed": failed,
+                    "skipped": skipped, **after, "note": note + needs_note({"reboot_required": after.get("reboot_required")})}
+    except (asyncssh.Error, OSError) as e:
+        return {**base, "status": "error", "note": f"SSH: {e}"}
+
 # ---------- Autoremove (Simulation + Live-Run) ----------
 
 async def _sim_autoremove_debian(conn):
     # Simulation (sprachunabhängig)
-    code, out, err = await _run(conn, "bash -lc 'export LC_ALL=C LANG=C; apt-get -s autoremove --purge'")
-    # Zählen: Zeilen, die mit 'Remv ' beginnen, oder Summary '... to remove'
-    n = sum(1 for ln in out.splitlines() if ln.startswith("Remv "))
-    if n == 0:
-        m = re.search(r'(\d+)\s+to remove', out)
-        if m:
-            n = int(m.group(1))
-    return n, out, err
+    apt = parsers.AptParser()
+    code, err = await _run_lines(conn, "bash -lc 'export LC_ALL=C LANG=C; apt-get -s autoremove --purge'", apt.feed, kind="sim")
+    # Remv/Purg-Zeilen, sonst Summary '... to remove'
+    return apt.removals, "\n".join(apt.lines), err
 
 async def simulate_autoremove_for_host(host: Dict[str, Any]) -> Dict[str, Any]:
     name = host.get("name") or f"id:{host['id']}"
-    ip, port, user = host.get("primary_ip"), int(host.get("port") or 22), host.get("user") or "root"
+    ip, user = host.get("primary_ip"), host.get("user") or "root"
     if not ip or not user:
         return {"host_id": host["id"], "name": name, "status": "error", "note": "IP/User fehlt"}
 
-    params = _auth_params(host)
     try:
-        async with asyncssh.connect(ip, port=port, username=user, known_hosts=None, **params) as conn:
-            distro = await _detect_distro(conn)
+        async with _connect(host) as conn:
+            distro = (await _host_caps(conn, host))["family"]
             if distro != "debian":
                 return {"host_id": host["id"], "name": name, "status": "error", "note": "Autoremove nur Debian implementiert"}
             n, details, note = await _sim_autoremove_debian(conn)
+            _invalidate_caps_if_stale(host, 0, note)
             return {"host_id": host["id"], "name": name, "status": "ok", "distro": distro, "packages": n, "details": details, "note": note or ""}
     except (asyncssh.Error, OSError) as e:
         return {"host_id": host["id"], "name": name, "status": "error", "note": f"SSH: {e}"}
 
-async def _run_autoremove_debian(conn):
-    async for line in _stream(conn, "sudo -n apt-get -y autoremove --purge -o=Dpkg::Use-Pty=0"):
+async def _run_autoremove_debian(conn, stream=_stream):
+    async for line in stream(conn, f"{_C_LOCALE}sudo -n apt-get -y autoremove --purge -o=Dpkg::Use-Pty=0", kind="autoremove"):
         yield line
 
-async def autoremove_host_stream(host: Dict[str, Any]):
-    """Async-Generator: liefert {'type':'line','line':...} und am Ende {'type':'result',...}."""
-    name = host.get("name") or f"id:{host['id']}"
-    ip, port, user = host.get("primary_ip"), int(host.get("port") or 22), host.get("user") or "root"
+async def autoremove_host_stream(host: Dict[str, Any], chunked: bool = False):
+    """
+    Async-Generator: liefert {'type':'line','line':...} (chunked=True: {'type':'chunk',...}
+    wie upgrade_host_stream) und am Ende {'type':'result',...}.
+    """
+    ip, user = host.get("primary_ip"), host.get("user") or "root"
     if not ip or not user:
         yield {"type": "result", "result": {"status": "error", "note": "IP/User fehlt"}}
         return
-    params = _auth_params(host)
     try:
-        async with asyncssh.connect(ip, port=port, username=user, known_hosts=None, **params) as conn:
-            distro = await _detect_distro(conn)
+        async with _connect(host) as conn:
+            distro = (await _host_caps(conn, host))["family"]
             if distro != "debian":
                 yield {"type": "result", "result": {"status": "error", "note": "Autoremove nur Debian implementiert"}}
                 return
             rc = 0
-            async for line in _run_autoremove_debian(conn):
-                if line.startswith("[RC="):
-                    try: rc = int(line[4:-1])
-                    except: rc = 0
+            async for ev in _relay(_run_autoremove_debian(conn, _stream_chunks if chunked else _stream), host["id"],
+                                   parsers.ProgressParser(distro)):
+                if ev["type"] == "rc":
+                    rc = ev["rc"]
                 else:
-                    yield {"type": "line", "line": line}
+                    yield ev
+            _invalidate_caps_if_stale(host, rc)
             yield {"type": "result", "result": {"status": "ok" if rc == 0 else "error", "note": f"rc={rc}", "distro": distro}}
             return
     except (asyncssh.Error, OSError) as e:
@@ -328,30 +869,133 @@ async def autoremove_host_stream(host: Dict[str, Any]):
 
 # ---------- Reboot ----------
 
-async def reboot_host(host: Dict[str, Any]) -> Dict[str, Any]:
-    """Löst einen Reboot auf dem Zielhost aus (fire-and-forget)."""
+_BOOT_ID_CMD = "cat /proc/sys/kernel/random/boot_id 2>/dev/null"
+
+async def _boot_id(conn) -> str | None:
+    """Kernel-Boot-ID (ändert sich bei jedem Start); None, wenn nicht lesbar."""
+    code, out, _ = await _run(conn, _BOOT_ID_CMD, timeout=10)
+    out = (out or "").strip()
+    return out if code == 0 and out else None
+
+# Neuesten Kernel aus /boot per kexec laden und 'systemctl kexec' einreihen
+# (Firmware/POST wird übersprungen). Ausgabe: KEXEC=ok <version> | KEXEC=<Grund>
+_KEXEC_SCRIPT = r"""
+SUDO=""; [ "$(id -u)" = 0 ] || SUDO="sudo -n"
+command -v kexec >/dev/null 2>&1 || { echo "KEXEC=kexec-tools fehlt"; exit 0; }
+K=$(ls -1 /boot/vmlinuz-* 2>/dev/null | grep -v rescue | sort -V | tail -n 1)
+[ -n "$K" ] || { echo "KEXEC=kein Kernel in /boot"; exit 0; }
+V=${K#/boot/vmlinuz-}
+I=""
+for f in "/boot/initrd.img-$V" "/boot/initramfs-$V.img" "/boot/initramfs-$V"; do
+  [ -f "$f" ] && { I=$f; break; }
+done
+$SUDO kexec -l "$K" ${I:+--initrd="$I"} --reuse-cmdline >/dev/null 2>&1 || { echo "KEXEC=Laden von $V fehlgeschlagen"; exit 0; }
+$SUDO systemctl --no-block kexec >/dev/null 2>&1 || { $SUDO kexec -u >/dev/null 2>&1; echo "KEXEC=systemctl kexec fehlgeschlagen"; exit 0; }
+echo "KEXEC=ok $V"
+"""
+
+async def _trigger_kexec(conn, host: Dict[str, Any]) -> tuple[bool, str]:
+    """(True, Kernelversion) wenn kexec eingereiht wurde, sonst (False, Grund)."""
+    caps = await _host_caps(conn, host)
+    if caps.get("kexec") is False:
+        return False, "kexec-tools fehlt"
+    # ältere Caps ohne 'kexec'-Eintrag: das Skript prüft selbst
+    code, out, err = await _run(conn, "bash -s", input=_KEXEC_SCRIPT, timeout=30)
+    line = next((l for l in (out or "").splitlines() if l.startswith("KEXEC=")), "")
+    val = line.partition("=")[2].strip()
+    if code == 0 and val.startswith("ok"):
+        return True, val[2:].strip()
+    return False, val or (err or "").strip() or f"rc={code}"
+
+async def reboot_host(host: Dict[str, Any], wait: bool = False, fast: bool = False) -> Dict[str, Any]:
+    """
+    Löst einen Reboot auf dem Zielhost aus (fire-and-forget).
+    wait=True merkt vorher die Boot-ID ('boot_id') und den Auslösezeitpunkt
+    ('t_reboot') für wait_for_reboot.
+    fast=True versucht zuerst 'systemctl kexec' mit dem neuesten Kernel und
+    fällt sonst auf einen normalen Reboot zurück; 'method' = kexec | reboot.
+    """
     name = host.get("name") or f"id:{host['id']}"
     ip = host.get("primary_ip")
-    port = int(host.get("port") or 22)
     user = host.get("user") or "root"
     if not ip or not user:
         return {"host_id": host["id"], "name": name, "status": "error", "note": "IP/User fehlt"}
 
-    params = _auth_params(host)
+    extra: Dict[str, Any] = {}
     try:
-        async with asyncssh.connect(ip, port=port, username=user, known_hosts=None, **params) as conn:
+        async with _connect(host) as conn:
+            if wait:
+                extra["boot_id"] = await _boot_id(conn)
+            extra["t_reboot"] = time.time()
+            fallback = ""
+            if fast:
+                # bricht die Verbindung schon hier ab, lief kexec bereits an
+                extra["method"] = "kexec"
+                ok, detail = await _trigger_kexec(conn, host)
+                if ok:
+                    return {"host_id": host["id"], "name": name, "status": "ok",
+                            "note": f"kexec ausgelöst ({detail})", **extra}
+                fallback = f" (kexec nicht möglich: {detail})"
+            extra["method"] = "reboot"
             # Fire-and-forget: Command im Hintergrund starten und gleich zurückkehren
             cmd = "bash -lc 'nohup sudo -n systemctl reboot >/dev/null 2>&1 & disown; echo TRIGGERED'"
             code, out, err = await _run(conn, cmd, timeout=10)
             if code == 0 and "TRIGGERED" in (out or ""):
-                return {"host_id": host["id"], "name": name, "status": "ok", "note": "Reboot ausgelöst"}
+                return {"host_id": host["id"], "name": name, "status": "ok", "note": "Reboot ausgelöst" + fallback, **extra}
             else:
                 # Fallback versuchen
                 cmd2 = "bash -lc 'nohup sudo -n reboot >/dev/null 2>&1 & disown; echo TRIGGERED'"
                 code2, out2, err2 = await _run(conn, cmd2, timeout=10)
                 if code2 == 0 and "TRIGGERED" in (out2 or ""):
-                    return {"host_id": host["id"], "name": name, "status": "ok", "note": "Reboot ausgelöst"}
+                    return {"host_id": host["id"], "name": name, "status": "ok", "note": "Reboot ausgelöst" + fallback, **extra}
                 return {"host_id": host["id"], "name": name, "status": "error", "note": (err or err2 or 'Unbekannter Fehler')}
     except (asyncssh.Error, OSError) as e:
         # Wenn die Verbindung sofort gekappt wird, war der Reboot sehr wahrscheinlich erfolgreich
-        return {"host_id": host["id"], "name": name, "status": "ok", "note": f"Reboot (verbindung beendet): {e}"}
+        if "t_reboot" not in extra:
+            return {"host_id": host["id"], "name": name, "status": "error", "note": f"SSH: {e}"}
+        return {"host_id": host["id"], "name": name, "status": "ok", "note": f"Reboot (verbindung beendet): {e}", **extra}
+    finally:
+        # Nach dem Reboot ist die Verbindung tot -> nicht im Pool lassen
+        get_pool().discard(host)
+
+def _reboot_wait_timeout() -> float:
+    try:
+        return float(db.get_setting("reboot_wait_timeout", REBOOT_WAIT_TIMEOUT))
+    except (TypeError, ValueError):
+        return REBOOT_WAIT_TIMEOUT
+
+async def wait_for_reboot(host: Dict[str, Any], boot_id: str | None, since: float, deadline: float | None = None) -> Dict[str, Any]:
+    """
+    Wartet, bis der Host nach dem Reboot wieder per SSH erreichbar ist.
+    Billig zuerst: TCP-Connect inkl. SSH-Banner; erst wenn sshd antwortet, ein
+    SSH-Login mit Vergleich der Boot-ID (gleiche ID = Host fährt noch herunter).
+    Ohne Boot-ID gilt der Host als zurück, wenn er zwischendurch weg war.
+    Liefert 'downtime' (erster Ausfall bis zurück) und 'total' (Auslösung bis zurück).
+    """
+    name = host.get("name") or f"id:{host['id']}"
+    base = {"host_id": host["id"], "name": name}
+    limit = deadline or _reboot_wait_timeout()
+    loop = asyncio.get_running_loop()
+    t_end = loop.time() + max(0.0, limit - (time.time() - since))
+    down_at: float | None = None
+    while loop.time() < t_end:
+        res = await reach.probe_host(host, timeout=min(5.0, REBOOT_POLL_INTERVAL * 2), banner=True)
+        if not res["ok"]:
+            down_at = down_at or time.time()
+        elif boot_id or down_at:
+            get_pool().discard(host)  # evtl. noch alte, halbtote Verbindung
+            try:
+                async with _connect(host) as conn:
+                    new_id = await _boot_id(conn)
+            except (asyncssh.Error, OSError):
+                new_id = None
+                down_at = down_at or time.time()
+            else:
+                if (boot_id and new_id and new_id != boot_id) or (not boot_id and down_at):
+                    now = time.time()
+                    total = now - since
+                    downtime = now - (down_at or since)
+                    return {**base, "status": "ok", "boot_id": new_id, "downtime": round(downtime, 1),
+                            "total": round(total, 1), "note": f"wieder da nach {total:.0f} s (Downtime {downtime:.0f} s)"}
+        await asyncio.sleep(REBOOT_POLL_INTERVAL)
+    return {**base, "status": "error", "note": f"nach {limit:.0f} s nicht zurück" + ("" if down_at else " (nie offline gesehen – Reboot ausgeführt?)")}
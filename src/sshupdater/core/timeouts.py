@@ -0,0 +1,87 @@
+from __future__ import annotations
+import math
+from typing import Any, Dict, List, Optional
+from . import db
+from .settings import TIMEOUT_FACTOR, TIMEOUT_SAMPLES, TIMEOUT_MIN_SAMPLES
+
+# Befehlsart -> (Standard ohne Messwerte, Untergrenze, Obergrenze) in Sekunden
+KINDS: Dict[str, tuple] = {
+    "caps": (90, 10, 300),
+    "state": (90, 10, 300),
+    # Refresh/Check laufen meist gegen einen frischen Index (schnell) – die
+    # Untergrenze muss ein echtes 'apt-get update' trotzdem abdecken
+    "refresh": (90, 60, 900),
+    "check": (90, 60, 900),
+    # Check per Fingerprint-Abkürzung (Host unverändert, ~ms) – getrennt gelernt,
+    # sonst drückt sie das p99 echter Checks; nur Statistik, das Limit kommt von 'check'
+    "check_cached": (90, 10, 300),
+    "sim": (90, 30, 900),
+    "list": (90, 10, 300),
+    "upgrade": (7200, 600, 4 * 3600),
+    "autoremove": (3600, 300, 2 * 3600),
+    "restart": (120, 30, 900),
+}
+
+# Nie per Timeout abbrechen (Kill mitten in dpkg/rpm hinterlässt halb konfigurierte Pakete):
+# das Timeout ist hier nur ein Warnwert, Hänger erkennt der Stall-Watchdog
+SOFT_KINDS = ("upgrade", "autoremove")
+
+def _factor() -> float:
+    try:
+        return max(1.0, float(db.get_setting("timeout_factor", TIMEOUT_FACTOR)))
+    except (TypeError, ValueError):
+        return TIMEOUT_FACTOR
+
+def p99(values: List[float]) -> float:
+    """99. Perzentil (nearest rank) – bei wenigen Werten also das Maximum."""
+    vals = sorted(values)
+    return vals[max(0, math.ceil(0.99 * len(vals)) - 1)]
+
+def learn(kind: str, values: List[float]) -> Optional[float]:
+    """p99 × Faktor, auf [Untergrenze, Obergrenze] begrenzt; None bei zu wenigen Messwerten."""
+    if len(values) < TIMEOUT_MIN_SAMPLES:
+        return None
+    _default, floor, ceiling = KINDS[kind]
+    return round(min(ceiling, max(floor, p99(values) * _factor())), 1)
+
+def timeout_for(host_id: Optional[int], kind: str) -> float:
+    """Wirksames Timeout: manueller Wert > gelernter Wert > Standard."""
+    default = KINDS[kind][0]
+    if host_id is None:
+        return default
+    try:
+        row = db.get_timeout(host_id, kind)
+    except Exception:
+        return default
+    if row and row.get("override"):
+        return float(row["override"])
+    if row and row.get("learned"):
+        return float(row["learned"])
+    return default
+
+def soft_limit(host_id: Optional[int], kind: str, expected: Optional[float] = None) -> float:
+    """Warnschwelle für SOFT_KINDS: wirksames Timeout, mindestens erwartete Dauer × Faktor."""
+    limit = timeout_for(host_id, kind)
+    return max(limit, expected * _factor()) if expected else limit
+
+def record(host_id: Optional[int], kind: str, seconds: float) -> None:
+    """Laufzeit eines erfolgreichen Befehls speichern und gelernten Wert nachführen."""
+    if host_id is None or kind not in KINDS:
+        return
+    try:
+        values = db.add_duration(host_id, kind, seconds, TIMEOUT_SAMPLES)
+        learned = learn(kind, values)
+        if learned is not None:
+            db.set_learned_timeout(host_id, kind, learned)
+    except Exception:
+        pass  # Messwerte sind nur ein Hilfsmittel – nie den eigentlichen Job stören
+
+def overview(host_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Für Operatoren: je (Host, Art) Messwerte, p99, gelernt, manuell, wirksam."""
+    rows = [r for r in db.list_timeouts(host_id) if r["samples"] or r["learned"] or r["override"]]
+    for r in rows:
+        values = db.get_durations(r["host_id"], r["kind"])
+        r["p99"] = round(p99(values), 1) if values else None
+        r["default"] = KINDS.get(r["kind"], (None,))[0]
+        r["effective"] = timeout_for(r["host_id"], r["kind"]) if r["kind"] in KINDS else None
+    return rows
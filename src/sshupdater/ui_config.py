@@ -1,4 +1,5 @@
 from __future__ import annotations
+import json
 from pathlib import Path
 from PyQt6 import QtWidgets, QtCore
 from PyQt6.QtWidgets import (
@@ -13,11 +14,12 @@ from PyQt6.QtWidgets import (
     QLineEdit,
     QComboBox,
     QSpinBox,
+    QCheckBox,
     QFileDialog,
     QWidget,
     QLabel,
 )
-from .core import db, settings
+from .core import db, settings, timeouts
 
 
 class HostEditDialog(QDialog):
@@ -30,6 +32,12 @@ class HostEditDialog(QDialog):
         form = QFormLayout()
         self.in_name = QLineEdit(self._host.get("name", ""))
         self.in_ip = QLineEdit(self._host.get("primary_ip", ""))
+        try:
+            extra_ips = json.loads(self._host.get("ips_json") or "[]")
+        except ValueError:
+            extra_ips = []
+        self.in_ips = QLineEdit(", ".join(extra_ips))
+        self.in_ips.setPlaceholderText("Optional, z. B. 10.0.1.5, fd00::5")
         self.in_port = QSpinBox()
         self.in_port.setRange(1, 65535)
         self.in_port.setValue(self._host.get("port", 22) or 22)
@@ -54,6 +62,7 @@ class HostEditDialog(QDialog):
 
         form.addRow("Name*", self.in_name)
         form.addRow("Primär-IP/Host*", self.in_ip)
+        form.addRow("Weitere IPs", self.in_ips)
         form.addRow("Port", self.in_port)
         form.addRow("User*", self.in_user)
         form.addRow("Auth-Methode", self.in_auth)
@@ -102,6 +111,7 @@ class HostEditDialog(QDialog):
             "proxmox_uid": self._host.get("proxmox_uid"),
             "name": name,
             "primary_ip": ip,
+            "ips": [a for a in self.in_ips.text().replace(",", " ").split() if a != ip],
             "port": int(self.in_port.value()),
             "user": user,
             "auth_method": self.in_auth.currentText(),
@@ -113,6 +123,63 @@ class HostEditDialog(QDialog):
         self.accept()
 
 
+class TimeoutsDialog(QDialog):
+    """Gelernte und wirksame Timeouts je Host und Befehlsart (nur Anzeige)."""
+
+    def __init__(self, parent: QWidget | None = None):
+        super().__init__(parent)
+        self.setWindowTitle("Timeouts")
+        self.resize(720, 420)
+        lay = QVBoxLayout(self)
+
+        cols = ["Host", "Art", "n", "p99 (s)", "gelernt (s)", "manuell (s)", "wirksam (s)"]
+        self.table = QTableWidget(0, len(cols), self)
+        self.table.setHorizontalHeaderLabels(cols)
+        self.table.setEditTriggers(
+            QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers
+        )
+        self.table.horizontalHeader().setStretchLastSection(True)
+        lay.addWidget(self.table, 1)
+
+        hint = QLabel(
+            "Ohne Messwerte gilt der Standard je Art. Manuell setzen/zurücksetzen: "
+            "sshupdater timeouts --set upgrade=5400 / --clear all"
+        )
+        hint.setStyleSheet("color:#aaa;")
+        hint.setWordWrap(True)
+        lay.addWidget(hint)
+
+        btns = QHBoxLayout()
+        btns.addStretch(1)
+        b_reload = QPushButton("Aktualisieren")
+        b_close = QPushButton("Schließen")
+        b_reload.clicked.connect(self._reload)
+        b_close.clicked.connect(self.accept)
+        btns.addWidget(b_reload)
+        btns.addWidget(b_close)
+        lay.addLayout(btns)
+
+        self._reload()
+
+    def _reload(self):
+        names = {h["id"]: h.get("name") or "?" for h in db.list_hosts()}
+        rows = [r for r in timeouts.overview() if r["host_id"] in names]
+        rows.sort(key=lambda r: (names[r["host_id"]].lower(), r["kind"]))
+        self.table.setRowCount(len(rows))
+        for i, r in enumerate(rows):
+            cells = [r["p99"], r["learned"], r["override"], r["effective"]]
+            values = [names[r["host_id"]], r["kind"], str(r["samples"])]
+            values += ["–" if v is None else f"{v:g}" for v in cells]
+            for c, text in enumerate(values):
+                item = QTableWidgetItem(text)
+                if c >= 2:
+                    item.setTextAlignment(
+                        QtCore.Qt.AlignmentFlag.AlignRight | QtCore.Qt.AlignmentFlag.AlignVCenter
+                    )
+                self.table.setItem(i, c, item)
+        self.table.resizeColumnsToContents()
+
+
 class ConfigDialog(QDialog):
     def __init__(self, parent: QWidget | None = None):
         super().__init__(parent)
@@ -155,6 +222,87 @@ class ConfigDialog(QDialog):
             lambda *_: self._apply_theme_choice()
         )
 
+        # --- Parallelität: max. gleichzeitige Host-Verbindungen ---
+        row_par = QHBoxLayout()
+        row_par.addWidget(QLabel("Parallele Hosts:"))
+        self.spin_concurrency = QSpinBox()
+        self.spin_concurrency.setRange(1, 256)
+        self.spin_concurrency.setValue(
+            int(db.get_setting("concurrency", settings.DEFAULT_CONCURRENCY))
+        )
+        row_par.addWidget(self.spin_concurrency)
+        row_par.addSpacing(20)
+        row_par.addWidget(QLabel("Paketindex frisch für (min):"))
+        self.spin_index_age = QSpinBox()
+        self.spin_index_age.setRange(0, 7 * 24 * 60)
+        self.spin_index_age.setValue(
+            int(db.get_setting("index_max_age", settings.INDEX_MAX_AGE)) // 60
+        )
+        row_par.addWidget(self.spin_index_age)
+        row_par.addSpacing(20)
+        row_par.addWidget(QLabel("Ergebnis-Cache (s):"))
+        self.spin_result_ttl = QSpinBox()
+        self.spin_result_ttl.setRange(0, 24 * 3600)
+        self.spin_result_ttl.setValue(
+            int(db.get_setting("result_ttl", settings.RESULT_TTL))
+        )
+        row_par.addWidget(self.spin_result_ttl)
+        row_par.addStretch(1)
+        lay.addLayout(row_par)
+        self.spin_concurrency.valueChanged.connect(
+            lambda v: db.set_setting("concurrency", int(v))
+        )
+        self.spin_index_age.valueChanged.connect(
+            lambda v: db.set_setting("index_max_age", int(v) * 60)
+        )
+        self.spin_result_ttl.valueChanged.connect(
+            lambda v: db.set_setting("result_ttl", int(v))
+        )
+
+        # --- Erreichbarkeit: kurzer TCP-Connect vor dem SSH-Handshake ---
+        row_reach = QHBoxLayout()
+        self.chk_preprobe = QCheckBox("TCP-Vorabprüfung")
+        self.chk_preprobe.setChecked(
+            str(db.get_setting("preprobe", "1")).lower() not in ("0", "false", "no", "off")
+        )
+        row_reach.addWidget(self.chk_preprobe)
+        row_reach.addSpacing(20)
+        row_reach.addWidget(QLabel("Timeout (ms):"))
+        self.spin_reach_timeout = QSpinBox()
+        self.spin_reach_timeout.setRange(200, 30000)
+        self.spin_reach_timeout.setSingleStep(100)
+        self.spin_reach_timeout.setValue(
+            int(float(db.get_setting("reach_timeout", settings.REACH_TIMEOUT)) * 1000)
+        )
+        row_reach.addWidget(self.spin_reach_timeout)
+        row_reach.addSpacing(20)
+        self.chk_reach_banner = QCheckBox("SSH-Banner lesen")
+        self.chk_reach_banner.setChecked(
+            str(db.get_setting("reach_banner", "0")).lower() in ("1", "true", "yes", "on")
+        )
+        row_reach.addWidget(self.chk_reach_banner)
+        row_reach.addSpacing(20)
+        self.chk_agent = QCheckBox("ssh-agent verwenden")
+        self.chk_agent.setChecked(
+            str(db.get_setting("ssh_agent", True)).lower() not in ("0", "false", "no", "off")
+        )
+        self.chk_agent.setToolTip("Schlüssel aus einem laufenden ssh-agent (SSH_AUTH_SOCK) zuerst anbieten")
+        row_reach.addWidget(self.chk_agent)
+        row_reach.addStretch(1)
+        lay.addLayout(row_reach)
+        self.chk_preprobe.toggled.connect(
+            lambda on: db.set_setting("preprobe", bool(on))
+        )
+        self.spin_reach_timeout.valueChanged.connect(
+            lambda v: db.set_setting("reach_timeout", int(v) / 1000)
+        )
+        self.chk_reach_banner.toggled.connect(
+            lambda on: db.set_setting("reach_banner", bool(on))
+        )
+        self.chk_agent.toggled.connect(
+            lambda on: db.set_setting("ssh_agent", bool(on))
+        )
+
         # Buttons
         btns = QHBoxLayout()
         self.b_add = QPushButton("Hinzufügen")
@@ -164,6 +312,9 @@ class ConfigDialog(QDialog):
         btns.addWidget(self.b_edit)
         btns.addWidget(self.b_del)
         btns.addStretch(1)
+        self.b_timeouts = QPushButton("Timeouts…")
+        self.b_timeouts.setToolTip("Gelernte und wirksame Timeouts je Host anzeigen")
+        btns.addWidget(self.b_timeouts)
         self.b_close = QPushButton("Schließen")
         btns.addWidget(self.b_close)
         lay.addLayout(btns)
@@ -171,6 +322,7 @@ class ConfigDialog(QDialog):
         self.b_add.clicked.connect(self._add)
         self.b_edit.clicked.connect(self._edit)
         self.b_del.clicked.connect(self._delete)
+        self.b_timeouts.clicked.connect(lambda: TimeoutsDialog(self).exec())
         self.b_close.clicked.connect(self.accept)
 
         self._reload()
@@ -207,7 +359,7 @@ class ConfigDialog(QDialog):
                 proxmox_uid=None,
                 name=h["name"],
                 primary_ip=h["primary_ip"],
-                ips=None,
+                ips=h["ips"],
                 port=h["port"],
                 user=h["user"],
                 auth_method=h["auth_method"],
@@ -233,7 +385,7 @@ class ConfigDialog(QDialog):
                 proxmox_uid=host.get("proxmox_uid"),
                 name=h["name"],
                 primary_ip=h["primary_ip"],
-                ips=None,
+                ips=h["ips"],
                 port=h["port"],
                 user=h["user"],
                 auth_method=h["auth_method"],
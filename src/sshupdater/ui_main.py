@@ -5,6 +5,7 @@ import shutil
 import subprocess
 import ipaddress
 
+from collections import defaultdict
 from pathlib import Path
 from datetime import datetime, timedelta
 
@@ -421,6 +422,17 @@ class MainWindow(QtWidgets.QMainWindow):
         tb.addSeparator()
         tb.addAction(self.act_toggle_checks)
 
+        # Varianten als Dropdown am Button (Schnellprüfung / Cache ignorieren)
+        self.act_check_quick = QtGui.QAction("Schnellprüfung (ohne Index-Refresh)", self)
+        self.act_check_force = QtGui.QAction("Prüfen erzwingen (ohne Cache)", self)
+        self.act_sim_force = QtGui.QAction("Simulieren erzwingen (ohne Cache)", self)
+        self.act_clean_force = QtGui.QAction("Bereinigen erzwingen (ohne Cache)", self)
+        self._add_action_menu(
+            tb, self.act_check, [self.act_check_quick, self.act_check_force]
+        )
+        self._add_action_menu(tb, self.act_sim, [self.act_sim_force])
+        self._add_action_menu(tb, self.act_clean, [self.act_clean_force])
+
         # --- Autor-Hinweis rechts in der Toolbar ---
         spacer = QtWidgets.QWidget()
         spacer.setSizePolicy(
@@ -438,10 +450,14 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Klick-Handler
         self.act_config.triggered.connect(self._open_config)
-        self.act_check.triggered.connect(self._on_check)
-        self.act_sim.triggered.connect(self._on_sim)
+        self.act_check.triggered.connect(lambda: self._on_check())
+        self.act_check_quick.triggered.connect(lambda: self._on_check(refresh="never"))
+        self.act_check_force.triggered.connect(lambda: self._on_check(force=True))
+        self.act_sim.triggered.connect(lambda: self._on_sim())
+        self.act_sim_force.triggered.connect(lambda: self._on_sim(force=True))
         self.act_upg.triggered.connect(self._on_upgrade)
-        self.act_clean.triggered.connect(self._on_clean)
+        self.act_clean.triggered.connect(lambda: self._on_clean())
+        self.act_clean_force.triggered.connect(lambda: self._on_clean(force=True))
         self.act_reboot.triggered.connect(self._on_reboot)
         self.act_toggle_checks.toggled.connect(self._on_toggle_checks)
 
@@ -455,6 +471,7 @@ class MainWindow(QtWidgets.QMainWindow):
         # Tabelle
         self.table = QtWidgets.QTableView()
         self._reload_hosts()
+        self.table.setItemDelegateForColumn(8, _ProgressDelegate(self.table))
         self.table.setSelectionBehavior(
             QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows
         )
@@ -509,6 +526,29 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setWindowTitle(f"SSH Updater v{__version__}")
         self.statusBar().showMessage("Bereit")
 
+        # Alter der Ergebnisse in der Tabelle aktuell halten
+        self._age_timer = QtCore.QTimer(self)
+        self._age_timer.timeout.connect(self._refresh_ages)
+        self._age_timer.start(30000)
+
+        # Fortschritt laufender Upgrades gedrosselt in die Tabelle übernehmen
+        self._progress_pending: dict = {}
+        self._run_eta: dict = {}
+        self._progress_timer = QtCore.QTimer(self)
+        self._progress_timer.timeout.connect(self._flush_progress)
+        self._progress_timer.start(int(settings.PROGRESS_REFRESH * 1000))
+
+    @staticmethod
+    def _add_action_menu(tb: QtWidgets.QToolBar, action: QtGui.QAction, extra: list):
+        """Hängt Zusatz-Aktionen als Dropdown an den Toolbar-Button von `action`."""
+        menu = QtWidgets.QMenu(tb)
+        for a in extra:
+            menu.addAction(a)
+        btn = tb.widgetForAction(action)
+        if isinstance(btn, QtWidgets.QToolButton):
+            btn.setMenu(menu)
+            btn.setPopupMode(QtWidgets.QToolButton.ToolButtonPopupMode.MenuButtonPopup)
+
     def _get_selected_host_ids(self) -> list:
         model = self.table.model()
         ids = []
@@ -587,7 +627,7 @@ class MainWindow(QtWidgets.QMainWindow):
         return self._make_dot_icon("#3ac569" if updates == 0 else "#f2b84b")
 
     # ========= Prüfen =========
-    def _on_check(self):
+    def _on_check(self, refresh: str | None = None, force: bool = False):
         for a in (
             self.act_check,
             self.act_sim,
@@ -617,15 +657,24 @@ class MainWindow(QtWidgets.QMainWindow):
         self.log.clear()
         self.log.append("Starte Prüfungen...\n")
 
-        self.worker = _CheckWorker(selected)
+        self.worker = _CheckWorker(selected, refresh=refresh, force=force)
         self.worker.one_result.connect(self._on_check_result)
         self.worker.finished_all.connect(self._on_check_done)
         self.worker.start()
 
     def _on_check_result(self, res: dict):
         if res.get("status") == "ok":
+            extra = ""
+            if res.get("security"):
+                extra += f" ({res['security']} Sicherheit)"
+            if res.get("reboot_required"):
+                extra += " – Neustart erforderlich"
+            if res.get("cached"):
+                extra += " (unverändert)"
+            if res.get("cache_age") is not None:
+                extra += f" (Cache, {self._fmt_age(res['cache_age'])})"
             self.log.append(
-                f"✔ {res['name']} [{res.get('distro', '?')}]: {res.get('updates', 0)} Updates"
+                f"✔ {res['name']} [{res.get('distro', '?')}]: {res.get('updates', 0)} Updates{extra}"
             )
             online = True
             updates = int(res.get("updates", 0))
@@ -639,6 +688,15 @@ class MainWindow(QtWidgets.QMainWindow):
         if row >= 0:
             model = self.table.model()
 
+            if res.get("breaker"):
+                # übersprungen: Sperrtext zeigen, letzte Prüfung und DB bleiben unverändert
+                status_item = QtGui.QStandardItem(res["breaker"])
+                status_item.setIcon(self._status_icon_for(False, None))
+                status_item.setToolTip("Wiederholte Verbindungsfehler – Prüfen (erzwingen) umgeht die Sperre.")
+                status_item.setEditable(False)
+                model.setItem(row, 5, status_item)
+                return
+
             if online:
                 status_text = f"Online – {updates} Updates"
                 status_item = QtGui.QStandardItem(status_text)
@@ -649,13 +707,18 @@ class MainWindow(QtWidgets.QMainWindow):
 
             model.setItem(row, 5, status_item)
 
+            if res.get("cache_age") is not None:
+                # Ergebnis aus dem Cache: Zeitstempel/DB bleiben unverändert
+                return
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            model.setItem(row, 6, QtGui.QStandardItem(timestamp))
+            model.setItem(row, 6, self._last_check_item(timestamp))
 
             try:
                 from .core import db
 
-                db.set_check_result(res["host_id"], timestamp, updates)
+                db.set_check_result(
+                    res["host_id"], timestamp, updates, res.get("fingerprint")
+                )
             except Exception as e:
                 self.statusBar().showMessage(f"Speicherfehler: {e}", 5000)
 
@@ -672,7 +735,7 @@ class MainWindow(QtWidgets.QMainWindow):
             a.setEnabled(True)
 
     # ========= Simulieren =========
-    def _on_sim(self):
+    def _on_sim(self, force: bool = False):
         for a in (
             self.act_check,
             self.act_sim,
@@ -702,16 +765,29 @@ class MainWindow(QtWidgets.QMainWindow):
         self.log.clear()
         self.log.append("Starte Simulationen...\n")
 
-        self.sim_worker = _SimWorker(selected)
+        self._sim_etas = {}
+        self.sim_worker = _SimWorker(selected, force=force)
         self.sim_worker.one_result.connect(self._on_sim_result)
         self.sim_worker.finished_all.connect(self._on_sim_done)
         self.sim_worker.start()
 
     def _on_sim_result(self, res: dict):
         if res.get("status") == "ok":
+            from .core import eta
+
             n = res.get("packages", 0)
+            cached = (
+                f" (Cache, {self._fmt_age(res['cache_age'])})"
+                if res.get("cache_age") is not None
+                else ""
+            )
+            duration = ""
+            if res.get("eta") is not None:
+                self._sim_etas[res["host_id"]] = res["eta"]
+                duration = f", Dauer {eta.describe(res['eta'])}"
+                self._set_progress(res["host_id"], "geschätzt", None, res["eta"])
             self.log.append(
-                f"🧪 {res['name']} [{res.get('distro', '?')}]: {n} Pakete geplant"
+                f"🧪 {res['name']} [{res.get('distro', '?')}]: {n} Pakete geplant{duration}{cached}"
             )
             details = (res.get("details") or "").strip()
             if details:
@@ -728,6 +804,16 @@ class MainWindow(QtWidgets.QMainWindow):
         self.log.moveCursor(QtGui.QTextCursor.MoveOperation.End)
 
     def _on_sim_done(self):
+        etas = getattr(self, "_sim_etas", {})
+        if etas:
+            from .core import eta, executor
+
+            limit = executor.concurrency_limit()
+            total = eta.makespan(etas.values(), limit)
+            self.log.append(
+                f"\nGeschätzte Upgrade-Dauer: {eta.describe(total)} "
+                f"({len(etas)} Hosts, max. {limit} parallel)"
+            )
         self.log.append("\nFertig.")
         for a in (
             self.act_check,
@@ -780,39 +866,89 @@ class MainWindow(QtWidgets.QMainWindow):
         self.log.clear()
         self.log.append("Starte Upgrades...\n")
 
+        self._stalled_hosts = set()
+        self._start_progress(selected, getattr(self, "_sim_etas", None))
         self.upg_worker = _UpgradeWorker(selected)
         self.upg_worker.progress.connect(self._on_upgrade_progress)
+        self.upg_worker.host_progress.connect(self._on_host_progress)
+        self.upg_worker.stalled.connect(
+            lambda p, w=self.upg_worker: self._on_stream_stalled(w, p)
+        )
         self.upg_worker.host_done.connect(self._on_upgrade_host_done)
         self.upg_worker.finished_all.connect(self._on_upgrade_done)
         self.upg_worker.start()
 
     def _on_upgrade_progress(self, payload: dict):
-        self.log.append(f"{payload['name']}: {payload['line']}")
+        name = payload["name"]
+        self.log.append("\n".join(f"{name}: {line}" for line in payload["lines"]))
+        self.log.moveCursor(QtGui.QTextCursor.MoveOperation.End)
+
+    def _on_stream_stalled(self, worker, payload: dict):
+        """Watchdog: Host ohne Ausgabe -> einmal je Hänger fragen, ob abgebrochen werden soll."""
+        hid, name = payload["host_id"], payload["name"]
+        stalled = self._stalled_hosts
+        if payload["type"] == "resumed":
+            if hid in stalled:
+                stalled.discard(hid)
+                self.log.append(f"▶ {name}: Ausgabe läuft wieder")
+            return
+
+        hint = f" – {payload['hint']}" if payload.get("hint") else ""
+        self.log.append(f"⏸ {name}: seit {payload['idle']} s keine Ausgabe{hint}")
+        for line in payload.get("tree") or []:
+            self.log.append(f"    {line}")
         self.log.moveCursor(QtGui.QTextCursor.MoveOperation.End)
+        if hid in stalled:
+            return  # schon gefragt – weiter warten
+        stalled.add(hid)
+
+        last = payload.get("last_line") or "—"
+        ret = QtWidgets.QMessageBox.question(
+            self,
+            "Host reagiert nicht",
+            f"{name} liefert seit {payload['idle']} s keine Ausgabe{hint}.\n\n"
+            f"Letzte Zeile: {last}\n\n"
+            "Nur diesen Host abbrechen? Die übrigen Hosts laufen weiter.\n"
+            "(Nein = weiter warten)",
+        )
+        if ret != QtWidgets.QMessageBox.StandardButton.Yes:
+            return
+        if hid in stalled:
+            worker.abort(hid)
+            self.log.append(f"⏹ {name}: Abbruch angefordert")
+        else:
+            self.log.append(f"▶ {name}: läuft inzwischen wieder – nicht abgebrochen")
 
     def _on_upgrade_host_done(self, res: dict):
+        self._invalidate_cache(res.get("host_id"))
+        self._finish_progress(res)
         if res.get("status") == "ok":
+            from .core import ssh_client
+
             self.log.append(
-                f"✅ {res['name']}: Upgrade abgeschlossen ({res.get('distro', '?')})."
+                f"✅ {res['name']}: Upgrade abgeschlossen ({res.get('distro', '?')}).{ssh_client.needs_note(res)}"
             )
             row = self._find_row_by_host_id(res.get("host_id"))
             if row >= 0:
                 model = self.table.model()
                 ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 model.setItem(row, 5, QtGui.QStandardItem("Online – 0 Updates"))
-                model.setItem(row, 6, QtGui.QStandardItem(ts))
+                model.setItem(row, 6, self._last_check_item(ts))
                 try:
                     from .core import db
 
                     db.set_check_result(res["host_id"], ts, 0)
                 except Exception:
                     pass
+                self._update_status_cell(res.get("host_id"))
         else:
             self.log.append(f"❌ {res.get('name', '?')}: {res.get('note', 'Fehler')}")
         self.log.moveCursor(QtGui.QTextCursor.MoveOperation.End)
 
     def _on_upgrade_done(self):
         self.log.append("\nAlle Upgrades beendet.")
+        self._run_eta = {}
+        self.statusBar().showMessage("Bereit")
         for a in (
             self.act_check,
             self.act_sim,
@@ -824,7 +960,7 @@ class MainWindow(QtWidgets.QMainWindow):
             a.setEnabled(True)
 
     # ========= Bereinigen =========
-    def _on_clean(self):
+    def _on_clean(self, force: bool = False):
         selected = self._get_selected_host_ids()
         if not selected:
             QtWidgets.QMessageBox.information(
@@ -846,7 +982,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.log.clear()
         self.log.append("Starte Autoremove-Simulation...\n")
 
-        self.clean_sim_worker = _CleanSimWorker(selected)
+        self.clean_sim_worker = _CleanSimWorker(selected, force=force)
         self.clean_sim_worker.one_result.connect(self._on_clean_sim_result)
         self.clean_sim_worker.finished_all.connect(self._on_clean_sim_done)
         self.clean_sim_worker.start()
@@ -854,7 +990,12 @@ class MainWindow(QtWidgets.QMainWindow):
     def _on_clean_sim_result(self, res: dict):
         if res.get("status") == "ok":
             n = res.get("packages", 0)
-            self.log.append(f"🧪 {res['name']}: {n} Pakete würden entfernt.")
+            cached = (
+                f" (Cache, {self._fmt_age(res['cache_age'])})"
+                if res.get("cache_age") is not None
+                else ""
+            )
+            self.log.append(f"🧪 {res['name']}: {n} Pakete würden entfernt.{cached}")
             details = (res.get("details") or "").strip()
             if details:
                 lines = details.splitlines()
@@ -913,17 +1054,26 @@ class MainWindow(QtWidgets.QMainWindow):
             return
 
         self.log.append("\nStarte Autoremove...\n")
+        self._stalled_hosts = set()
+        self._start_progress(sel)
         self.clean_run_worker = _CleanRunWorker(sel)
         self.clean_run_worker.progress.connect(self._on_clean_progress)
+        self.clean_run_worker.host_progress.connect(self._on_host_progress)
+        self.clean_run_worker.stalled.connect(
+            lambda p, w=self.clean_run_worker: self._on_stream_stalled(w, p)
+        )
         self.clean_run_worker.host_done.connect(self._on_clean_host_done)
         self.clean_run_worker.finished_all.connect(self._on_clean_done)
         self.clean_run_worker.start()
 
     def _on_clean_progress(self, payload: dict):
-        self.log.append(f"{payload['name']}: {payload['line']}")
+        name = payload["name"]
+        self.log.append("\n".join(f"{name}: {line}" for line in payload["lines"]))
         self.log.moveCursor(QtGui.QTextCursor.MoveOperation.End)
 
     def _on_clean_host_done(self, res: dict):
+        self._invalidate_cache(res.get("host_id"))
+        self._finish_progress(res)
         if res.get("status") == "ok":
             self.log.append(f"✅ {res['name']}: Autoremove abgeschlossen.")
         else:
@@ -952,13 +1102,62 @@ class MainWindow(QtWidgets.QMainWindow):
             )
             return
 
-        ret = QtWidgets.QMessageBox.question(
-            self,
-            "Reboot ausführen",
-            f"Sollen {len(selected)} ausgewählte Host(s) neu gestartet werden?\nHinweis: Der SSH-Stream bricht ggf. sofort ab.",
+        # QMessageBox kann nur eine Checkbox -> kleiner eigener Dialog
+        box = QtWidgets.QDialog(self)
+        box.setWindowTitle("Reboot ausführen")
+        lay = QtWidgets.QVBoxLayout(box)
+        lay.addWidget(QtWidgets.QLabel(
+            f"Sollen {len(selected)} ausgewählte Host(s) neu gestartet werden?\nHinweis: Der SSH-Stream bricht ggf. sofort ab."
+        ))
+        chk_wait = QtWidgets.QCheckBox("Auf Rückkehr warten (Downtime messen)")
+        chk_wait.setChecked(
+            self._qset.value("reboot/wait", False, type=bool)
         )
-        if ret != QtWidgets.QMessageBox.StandardButton.Yes:
+        chk_fast = QtWidgets.QCheckBox("Schnell-Reboot per kexec (ohne BIOS/POST, falls verfügbar)")
+        chk_fast.setChecked(
+            self._qset.value("reboot/fast", False, type=bool)
+        )
+        chk_needed = QtWidgets.QCheckBox("Nur Hosts mit Neustart-Bedarf (reboot-required/needrestart)")
+        chk_needed.setChecked(
+            self._qset.value("reboot/only_required", False, type=bool)
+        )
+        lay.addWidget(chk_wait)
+        lay.addWidget(chk_fast)
+        lay.addWidget(chk_needed)
+        buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.StandardButton.Yes
+            | QtWidgets.QDialogButtonBox.StandardButton.No
+        )
+        btn_services = buttons.addButton(
+            "Nur Dienste neu starten", QtWidgets.QDialogButtonBox.ButtonRole.ActionRole
+        )
+        btn_services.clicked.connect(lambda: box.done(2))
+        buttons.accepted.connect(box.accept)
+        buttons.rejected.connect(box.reject)
+        lay.addWidget(buttons)
+        ret = box.exec()
+        if ret == 2:
+            self._on_restart_services(selected)
+            return
+        if ret != QtWidgets.QDialog.DialogCode.Accepted:
             return
+        wait = chk_wait.isChecked()
+        fast = chk_fast.isChecked()
+        self._qset.setValue("reboot/wait", wait)
+        self._qset.setValue("reboot/fast", fast)
+        self._qset.setValue("reboot/only_required", chk_needed.isChecked())
+        if chk_needed.isChecked():
+            from .core import db
+
+            needed = {h["id"] for h in db.list_hosts() if h.get("reboot_required")}
+            skipped = len(selected)
+            selected = [hid for hid in selected if hid in needed]
+            skipped -= len(selected)
+            if not selected:
+                QtWidgets.QMessageBox.information(
+                    self, "Kein Bedarf", "Keiner der ausgewählten Hosts meldet Neustart-Bedarf."
+                )
+                return
 
         for a in (
             self.act_check,
@@ -972,21 +1171,72 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.log.clear()
         self.log.append("Starte Reboot...\n")
+        if chk_needed.isChecked() and skipped:
+            self.log.append(f"{skipped} Host(s) ohne Neustart-Bedarf übersprungen.\n")
+        self._reboot_wait = wait
 
-        self.reboot_worker = _RebootWorker(selected)
+        self.reboot_worker = _RebootWorker(selected, wait=wait, fast=fast)
         self.reboot_worker.host_done.connect(self._on_reboot_host_done)
         self.reboot_worker.finished_all.connect(self._on_reboot_done)
         self.reboot_worker.start()
 
     def _on_reboot_host_done(self, res: dict):
-        if res.get("status") == "ok":
+        self._invalidate_cache(res.get("host_id"))
+        if res.get("stage") == "done":
+            self._update_status_cell(res.get("host_id"))
+        if res.get("stage") == "triggered":
+            self.log.append(f"🔁 {res['name']}: {res.get('note', 'Reboot ausgelöst')} – warte auf Rückkehr …")
+        elif res.get("status") == "ok" and "downtime" in res:
+            self.log.append(f"✅ {res['name']}: {res['note']}")
+        elif res.get("status") == "ok":
             self.log.append(f"🔁 {res['name']}: {res.get('note', 'Reboot ausgelöst')}")
         else:
             self.log.append(f"❌ {res.get('name', '?')}: {res.get('note', 'Fehler')}")
         self.log.moveCursor(QtGui.QTextCursor.MoveOperation.End)
 
+    # ========= Dienste neu starten =========
+    def _on_restart_services(self, selected: list[int]):
+        for a in (
+            self.act_check,
+            self.act_sim,
+            self.act_upg,
+            self.act_clean,
+            self.act_reboot,
+            self.act_config,
+        ):
+            a.setEnabled(False)
+
+        self.log.clear()
+        self.log.append("Starte betroffene Dienste neu...\n")
+
+        self.restart_worker = _RestartWorker(selected)
+        self.restart_worker.one_result.connect(self._on_restart_result)
+        self.restart_worker.finished_all.connect(self._on_restart_done)
+        self.restart_worker.start()
+
+    def _on_restart_result(self, res: dict):
+        icon = "♻" if res.get("status") == "ok" else "❌"
+        self.log.append(f"{icon} {res.get('name', '?')}: {res.get('note', 'Fehler')}")
+        self.log.moveCursor(QtGui.QTextCursor.MoveOperation.End)
+        self._update_status_cell(res.get("host_id"))
+
+    def _on_restart_done(self):
+        self.log.append("\nDienst-Neustarts abgeschlossen.")
+        for a in (
+            self.act_check,
+            self.act_sim,
+            self.act_upg,
+            self.act_clean,
+            self.act_reboot,
+            self.act_config,
+        ):
+            a.setEnabled(True)
+
     def _on_reboot_done(self):
-        self.log.append("\nReboot-Befehle abgesetzt.")
+        if getattr(self, "_reboot_wait", False):
+            self.log.append("\nReboot abgeschlossen.")
+        else:
+            self.log.append("\nReboot-Befehle abgesetzt.")
         for a in (
             self.act_check,
             self.act_sim,
@@ -997,15 +1247,168 @@ class MainWindow(QtWidgets.QMainWindow):
         ):
             a.setEnabled(True)
 
+    def _invalidate_cache(self, host_id):
+        if host_id is None:
+            return
+        try:
+            from .core import cache
+
+            cache.invalidate(int(host_id))
+        except Exception:
+            pass
+
+    # ========= Alter von Ergebnissen =========
+    @staticmethod
+    def _fmt_age(seconds: float) -> str:
+        seconds = int(max(0, seconds))
+        if seconds < 60:
+            return f"vor {seconds} s"
+        if seconds < 3600:
+            return f"vor {seconds // 60} min"
+        if seconds < 86400:
+            return f"vor {seconds // 3600} h"
+        return f"vor {seconds // 86400} d"
+
+    def _last_check_item(self, ts: str | None) -> QtGui.QStandardItem:
+        """'Letzte Prüfung' mit Alter; Zeitstempel bleibt für _refresh_ages im Item."""
+        item = QtGui.QStandardItem(ts or "—")
+        item.setEditable(False)
+        if ts:
+            item.setData(ts, QtCore.Qt.ItemDataRole.UserRole)
+            try:
+                age = (datetime.now() - datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")).total_seconds()
+                item.setText(f"{ts} ({self._fmt_age(age)})")
+            except ValueError:
+                pass
+        return item
+
+    def _refresh_ages(self):
+        model = self.table.model()
+        if model is None:
+            return
+        # Neuere Prüfungen aus der DB übernehmen (z. B. vom Daemon geschrieben)
+        try:
+            from .core import db, breaker
+
+            stored = {h["id"]: h for h in db.list_hosts()}
+        except Exception:
+            stored = {}
+        for r in range(model.rowCount()):
+            it = model.item(r, 6)
+            ts = it.data(QtCore.Qt.ItemDataRole.UserRole) if it else None
+            name_item = model.item(r, 1)
+            h = stored.get(name_item.data(QtCore.Qt.ItemDataRole.UserRole)) if name_item else None
+            if h and h.get("last_check") and h["last_check"] > (ts or ""):
+                ts = h["last_check"]
+                pending = h.get("pending_updates")
+                blocked = breaker.describe(h)
+                if blocked:
+                    status = QtGui.QStandardItem(blocked)
+                    status.setIcon(self._status_icon_for(False, None))
+                elif pending is None:
+                    status = QtGui.QStandardItem("Offline")
+                    status.setIcon(self._status_icon_for(False, None))
+                else:
+                    status = QtGui.QStandardItem(f"Online – {int(pending)} Updates")
+                    status.setIcon(self._status_icon_for(True, int(pending)))
+                    self._mark_restart_needs(status, h)
+                status.setEditable(False)
+                model.setItem(r, 5, status)
+            if ts:
+                model.setItem(r, 6, self._last_check_item(ts))
+
+    def _mark_restart_needs(self, status: QtGui.QStandardItem, h: dict):
+        from .core import db
+
+        needs = db.get_restart_needs(h)
+        tips = []
+        if needs.get("reboot_required"):
+            status.setText(status.text() + " – Neustart nötig")
+            if needs.get("reboot_pkgs"):
+                tips.append("Neustart wegen: " + ", ".join(needs["reboot_pkgs"]))
+        if needs.get("services"):
+            tips.append("Dienste neu starten: " + ", ".join(needs["services"]))
+        if tips:
+            status.setToolTip("\n".join(tips))
+
+    def _update_status_cell(self, host_id: int | None):
+        """Status-Spalte eines Hosts aus der DB neu aufbauen (Häkchen bleiben erhalten)."""
+        from .core import db
+
+        row = self._find_row_by_host_id(host_id) if host_id is not None else -1
+        h = db.get_host(host_id) if row >= 0 else None
+        if not h or h.get("pending_updates") is None:
+            return
+        pending = int(h["pending_updates"])
+        status = QtGui.QStandardItem(f"Online – {pending} Updates")
+        status.setIcon(self._status_icon_for(True, pending))
+        self._mark_restart_needs(status, h)
+        status.setEditable(False)
+        self.table.model().setItem(row, 5, status)
+
+    # ========= Fortschritt =========
+    _PHASES = {"download": "Download", "unpack": "Entpacken", "configure": "Konfigurieren"}
+
+    def _set_progress(self, host_id: int | None, phase: str, percent: int | None, remaining: float | None = None):
+        row = self._find_row_by_host_id(host_id) if host_id is not None else -1
+        if row < 0:
+            return
+        model = self.table.model()
+        text = self._PHASES.get(phase, phase)
+        if remaining is not None:
+            from .core import eta
+
+            text += f" ({eta.describe(remaining)})"
+        item = QtGui.QStandardItem(text)
+        item.setEditable(False)
+        model.setItem(row, 7, item)
+        bar = QtGui.QStandardItem("" if percent is None else f"{percent} %")
+        bar.setData(percent, QtCore.Qt.ItemDataRole.UserRole)
+        bar.setEditable(False)
+        model.setItem(row, 8, bar)
+
+    def _on_host_progress(self, payload: dict):
+        # nur merken – _flush_progress setzt höchstens alle PROGRESS_REFRESH s
+        self._progress_pending[payload["host_id"]] = payload
+
+    def _flush_progress(self):
+        pending, self._progress_pending = self._progress_pending, {}
+        for hid, p in pending.items():
+            self._set_progress(hid, p["phase"], p.get("percent"), p.get("eta"))
+            if p.get("eta") is not None:
+                self._run_eta[hid] = p["eta"]
+        if pending and self._run_eta:
+            from .core import eta, executor
+
+            total = eta.makespan(self._run_eta.values(), executor.concurrency_limit())
+            self.statusBar().showMessage(f"Restzeit (geschätzt): {eta.describe(total)}")
+
+    def _start_progress(self, host_ids: list, etas: dict | None = None):
+        """Fortschrittsspalten zurücksetzen; etas (Host -> Sekunden) speist die Gesamt-Restzeit."""
+        self._progress_pending = {}
+        self._run_eta = {hid: etas[hid] for hid in host_ids if etas and hid in etas}
+        for hid in host_ids:
+            self._set_progress(hid, "wartet", None, self._run_eta.get(hid))
+
+    def _finish_progress(self, res: dict):
+        hid = res.get("host_id")
+        last = self._progress_pending.pop(hid, None) or {}
+        if hid in self._run_eta:
+            self._run_eta[hid] = 0.0
+        if res.get("status") == "ok":
+            self._set_progress(hid, "fertig", 100)
+        else:
+            self._set_progress(hid, "Fehler", last.get("percent"))
+
     # ========= Hosts laden =========
     def _reload_hosts(self):
-        from .core import db
+        from .core import db, breaker
 
         hosts = db.list_hosts()
 
         model = QtGui.QStandardItemModel()
         model.setHorizontalHeaderLabels(
-            ["✓", "Name", "IP", "User", "Auth", "Status", "Letzte Prüfung"]
+            ["✓", "Name", "IP", "User", "Auth", "Status", "Letzte Prüfung", "Phase", "Fortschritt"]
         )
 
         for h in hosts:
@@ -1022,19 +1425,27 @@ class MainWindow(QtWidgets.QMainWindow):
             auth = QtGui.QStandardItem(h.get("auth_method") or "")
 
             pending = h.get("pending_updates")
-            if pending is None:
+            blocked = breaker.describe(h)
+            if blocked:
+                status = QtGui.QStandardItem(blocked)
+                status.setIcon(self._status_icon_for(False, None))
+                status.setToolTip("Wiederholte Verbindungsfehler – Prüfen (erzwingen) umgeht die Sperre.")
+            elif pending is None:
                 status = QtGui.QStandardItem("—")
                 status.setIcon(self._status_icon_for(True, None))
             else:
                 status = QtGui.QStandardItem(f"Online – {int(pending)} Updates")
                 status.setIcon(self._status_icon_for(True, int(pending)))
+                self._mark_restart_needs(status, h)
 
-            last_item = QtGui.QStandardItem(h.get("last_check") or "—")
+            last_item = self._last_check_item(h.get("last_check"))
 
-            for it in (name, ip, user, auth, status, last_item):
+            phase, bar = QtGui.QStandardItem(""), QtGui.QStandardItem("")
+
+            for it in (name, ip, user, auth, status, last_item, phase, bar):
                 it.setEditable(False)
 
-            model.appendRow([chk, name, ip, user, auth, status, last_item])
+            model.appendRow([chk, name, ip, user, auth, status, last_item, phase, bar])
 
         self.table.setModel(model)
         self.table.resizeColumnsToContents()
@@ -1054,6 +1465,10 @@ class MainWindow(QtWidgets.QMainWindow):
                     "ui/right_splitter_sizes", self.right_splitter.sizes()
                 )
         finally:
+            from .core import executor, crypto
+
+            executor.shutdown()
+            crypto.lock()  # Schlüssel und entschlüsselte Passwörter verwerfen
             super().closeEvent(event)
 
     def _set_all_checks(self, state: bool):
@@ -1093,34 +1508,35 @@ class _CheckWorker(QtCore.QThread):
     one_result = QtCore.pyqtSignal(dict)
     finished_all = QtCore.pyqtSignal()
 
-    def __init__(self, host_ids: list | None = None):
+    def __init__(self, host_ids: list | None = None, refresh: str | None = None, force: bool = False):
         super().__init__()
         self.host_ids = host_ids
+        self.refresh = refresh
+        self.force = force
 
     def run(self):
-        import asyncio
-        from .core import db, ssh_client
+        from .core import db, ssh_client, executor, cache, breaker
 
         all_hosts = db.list_hosts()
         hosts = [h for h in all_hosts if not self.host_ids or h["id"] in self.host_ids]
 
         async def _job():
-            for h in hosts:
-                if not h.get("primary_ip") or not h.get("user"):
-                    self.one_result.emit(
-                        {
-                            "host_id": h["id"],
-                            "name": h.get("name", "?"),
-                            "status": "error",
-                            "note": "IP/User fehlt",
-                        }
-                    )
-                    continue
-                res = await ssh_client.check_updates_for_host(h)
+            def check(h):
+                return ssh_client.check_updates_for_host(
+                    h, refresh=self.refresh, force=self.force
+                )
+
+            job = cache.cached_job(cache.check_op(self.refresh), check, force=self.force)
+            async for h, res in executor.FanOut(hosts, job, force=self.force, kind="check"):
+                if isinstance(res, breaker.BreakerOpen):
+                    # nicht geprüft (gesperrt) – kein Verbindungsfehler
+                    res = {**executor.error_result(h, str(res)), "breaker": breaker.describe(h) or str(res)}
+                elif isinstance(res, Exception):
+                    res = executor.error_result(h, f"Check-Fehler: {res}")
                 res.setdefault("host_id", h["id"])
                 self.one_result.emit(res)
 
-        asyncio.run(_job())
+        executor.run(_job())
         self.finished_all.emit()
 
 
@@ -1128,48 +1544,30 @@ class _SimWorker(QtCore.QThread):
     one_result = QtCore.pyqtSignal(dict)
     finished_all = QtCore.pyqtSignal()
 
-    def __init__(self, host_ids: list | None = None):
+    def __init__(self, host_ids: list | None = None, force: bool = False):
         super().__init__()
         self.host_ids = host_ids
+        self.force = force
 
     def run(self):
-        from .core import db, ssh_client
-        import asyncio
+        from .core import db, ssh_client, executor, cache
         import traceback
 
         all_hosts = db.list_hosts()
         hosts = [h for h in all_hosts if not self.host_ids or h["id"] in self.host_ids]
 
         async def _job():
-            for h in hosts:
-                if not h.get("primary_ip") or not h.get("user"):
-                    self.one_result.emit(
-                        {
-                            "host_id": h["id"],
-                            "name": h.get("name", "?"),
-                            "status": "error",
-                            "note": "IP/User fehlt",
-                        }
-                    )
-                    continue
-                try:
-                    res = await ssh_client.simulate_upgrade_for_host(h)
-                    res.setdefault("host_id", h["id"])
-                    self.one_result.emit(res)
-                except Exception as ex:
-                    self.one_result.emit(
-                        {
-                            "host_id": h["id"],
-                            "name": h.get("name", "?"),
-                            "status": "error",
-                            "note": f"Sim-Fehler: {ex}",
-                        }
-                    )
+            job = cache.cached_job(
+                "sim", ssh_client.simulate_upgrade_for_host, force=self.force
+            )
+            async for h, res in executor.FanOut(hosts, job, force=self.force, kind="sim"):
+                if isinstance(res, Exception):
+                    res = executor.error_result(h, f"Sim-Fehler: {res}")
+                res.setdefault("host_id", h["id"])
+                self.one_result.emit(res)
 
-        loop = asyncio.new_event_loop()
         try:
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(_job())
+            executor.run(_job())
         except Exception:
             self.one_result.emit(
                 {
@@ -1178,63 +1576,111 @@ class _SimWorker(QtCore.QThread):
                     "note": "Uncaught: " + traceback.format_exc(limit=1),
                 }
             )
-        finally:
-            loop.close()
 
         self.finished_all.emit()
 
 
+class _ChunkLines:
+    """
+    Gebündelte Ausgabe (chunked streams) je Host zu ganzen Zeilen zusammensetzen;
+    ein progress-Signal pro Paket statt pro Zeile.
+    """
+
+    def __init__(self, signal):
+        from .core import parsers
+
+        self._signal = signal
+        self._splitters: dict = defaultdict(parsers.LineSplitter)
+
+    def _emit(self, h: dict, lines: list):
+        if lines:
+            self._signal.emit({"host_id": h["id"], "name": h.get("name", "?"), "lines": lines})
+
+    def feed(self, h: dict, text: str):
+        self._emit(h, self._splitters[h["id"]].feed(text))
+
+    def flush(self, h: dict):
+        splitter = self._splitters.pop(h["id"], None)
+        if splitter:
+            self._emit(h, splitter.flush())
+
+
+def _overdue_text(msg: dict) -> str:
+    from .core import eta
+
+    return f"⏱ läuft länger als erwartet (> {eta.describe(msg['limit'])}) – wird nicht abgebrochen"
+
+
+class _ProgressDelegate(QtWidgets.QStyledItemDelegate):
+    """Spalte 'Fortschritt': Prozentwert (UserRole) als Balken zeichnen."""
+
+    def paint(self, painter, option, index):
+        value = index.data(QtCore.Qt.ItemDataRole.UserRole)
+        if value is None:
+            super().paint(painter, option, index)
+            return
+        bar = QtWidgets.QStyleOptionProgressBar()
+        bar.rect = option.rect.adjusted(2, 2, -2, -2)
+        bar.state = QtWidgets.QStyle.StateFlag.State_Enabled | QtWidgets.QStyle.StateFlag.State_Horizontal
+        bar.minimum, bar.maximum, bar.progress = 0, 100, int(value)
+        bar.text, bar.textVisible = f"{int(value)} %", True
+        style = option.widget.style() if option.widget else QtWidgets.QApplication.style()
+        style.drawControl(QtWidgets.QStyle.ControlElement.CE_ProgressBar, bar, painter, option.widget)
+
+
 class _UpgradeWorker(QtCore.QThread):
     progress = QtCore.pyqtSignal(dict)
+    host_progress = QtCore.pyqtSignal(dict)
+    stalled = QtCore.pyqtSignal(dict)
     host_done = QtCore.pyqtSignal(dict)
     finished_all = QtCore.pyqtSignal()
 
     def __init__(self, host_ids: list | None = None):
         super().__init__()
         self.host_ids = host_ids
+        self._fan = None
+
+    def abort(self, host_id: int):
+        """Nur diesen Host abbrechen (aus dem GUI-Thread)."""
+        from .core import executor
+
+        if self._fan is not None:
+            executor.call_soon(self._fan.cancel, host_id)
 
     def run(self):
-        import asyncio
-        from .core import db, ssh_client
+        from .core import db, ssh_client, executor
 
         all_hosts = db.list_hosts()
         hosts = [h for h in all_hosts if not self.host_ids or h["id"] in self.host_ids]
 
+        def upgrade(h):
+            return ssh_client.upgrade_host_stream(h, chunked=True)
+
         async def _job():
-            for h in hosts:
+            lines = _ChunkLines(self.progress)
+            self._fan = executor.FanOut(hosts, upgrade, kind="upgrade")
+            async for h, msg in self._fan:
                 name = h.get("name", "?")
-                if not h.get("primary_ip") or not h.get("user"):
-                    self.host_done.emit(
-                        {
-                            "host_id": h["id"],
-                            "name": name,
-                            "status": "error",
-                            "note": "IP/User fehlt",
-                        }
-                    )
+                if isinstance(msg, Exception):
+                    lines.flush(h)
+                    self.host_done.emit(executor.error_result(h, str(msg)))
+                elif not isinstance(msg, dict):
                     continue
-                try:
-                    agen = ssh_client.upgrade_host_stream(h)
-                    async for msg in agen:
-                        if not isinstance(msg, dict):
-                            continue
-                        if msg.get("type") == "line":
-                            self.progress.emit({"name": name, "line": msg["line"]})
-                        elif msg.get("type") == "result":
-                            res = msg["result"] or {}
-                            res.update({"host_id": h["id"], "name": name})
-                            self.host_done.emit(res)
-                except Exception as ex:
-                    self.host_done.emit(
-                        {
-                            "host_id": h["id"],
-                            "name": name,
-                            "status": "error",
-                            "note": str(ex),
-                        }
-                    )
+                elif msg.get("type") == "chunk":
+                    lines.feed(h, msg["data"])
+                elif msg.get("type") == "progress":
+                    self.host_progress.emit(msg)
+                elif msg.get("type") == "overdue":
+                    self.progress.emit({"host_id": h["id"], "name": name, "lines": [_overdue_text(msg)]})
+                elif msg.get("type") in ("stall", "resumed"):
+                    self.stalled.emit({**msg, "name": name})
+                elif msg.get("type") == "result":
+                    lines.flush(h)
+                    res = msg["result"] or {}
+                    res.update({"host_id": h["id"], "name": name})
+                    self.host_done.emit(res)
 
-        asyncio.run(_job())
+        executor.run(_job())
         self.finished_all.emit()
 
 
@@ -1242,65 +1688,104 @@ class _CleanSimWorker(QtCore.QThread):
     one_result = QtCore.pyqtSignal(dict)
     finished_all = QtCore.pyqtSignal()
 
-    def __init__(self, host_ids: list[int]):
+    def __init__(self, host_ids: list[int], force: bool = False):
         super().__init__()
         self.host_ids = host_ids
+        self.force = force
 
     def run(self):
-        import asyncio
-        from .core import db, ssh_client
+        from .core import db, ssh_client, executor, cache
 
         all_hosts = db.list_hosts()
         hosts = [h for h in all_hosts if h["id"] in self.host_ids]
 
         async def _job():
-            for h in hosts:
-                res = await ssh_client.simulate_autoremove_for_host(h)
+            job = cache.cached_job(
+                "clean-sim", ssh_client.simulate_autoremove_for_host, force=self.force
+            )
+            async for h, res in executor.FanOut(hosts, job, force=self.force, kind="sim"):
+                if isinstance(res, Exception):
+                    res = executor.error_result(h, f"Sim-Fehler: {res}")
                 self.one_result.emit(res)
 
-        asyncio.run(_job())
+        executor.run(_job())
         self.finished_all.emit()
 
 
 class _CleanRunWorker(QtCore.QThread):
     progress = QtCore.pyqtSignal(dict)
+    host_progress = QtCore.pyqtSignal(dict)
+    stalled = QtCore.pyqtSignal(dict)
     host_done = QtCore.pyqtSignal(dict)
     finished_all = QtCore.pyqtSignal()
 
     def __init__(self, host_ids: list[int]):
         super().__init__()
         self.host_ids = host_ids
+        self._fan = None
+
+    def abort(self, host_id: int):
+        """Nur diesen Host abbrechen (aus dem GUI-Thread)."""
+        from .core import executor
+
+        if self._fan is not None:
+            executor.call_soon(self._fan.cancel, host_id)
 
     def run(self):
-        import asyncio
-        from .core import db, ssh_client
+        from .core import db, ssh_client, executor
 
         all_hosts = db.list_hosts()
         hosts = [h for h in all_hosts if h["id"] in self.host_ids]
 
+        def autoremove(h):
+            return ssh_client.autoremove_host_stream(h, chunked=True)
+
         async def _job():
-            for h in hosts:
+            lines = _ChunkLines(self.progress)
+            self._fan = executor.FanOut(hosts, autoremove, kind="autoremove")
+            async for h, msg in self._fan:
                 name = h.get("name", "?")
-                try:
-                    agen = ssh_client.autoremove_host_stream(h)
-                    async for msg in agen:
-                        if isinstance(msg, dict) and msg.get("type") == "line":
-                            self.progress.emit({"name": name, "line": msg["line"]})
-                        elif isinstance(msg, dict) and msg.get("type") == "result":
-                            res = msg["result"] or {}
-                            res.update({"host_id": h["id"], "name": name})
-                            self.host_done.emit(res)
-                except Exception as ex:
-                    self.host_done.emit(
-                        {
-                            "host_id": h["id"],
-                            "name": name,
-                            "status": "error",
-                            "note": str(ex),
-                        }
-                    )
+                if isinstance(msg, Exception):
+                    lines.flush(h)
+                    self.host_done.emit(executor.error_result(h, str(msg)))
+                elif isinstance(msg, dict) and msg.get("type") == "chunk":
+                    lines.feed(h, msg["data"])
+                elif isinstance(msg, dict) and msg.get("type") == "progress":
+                    self.host_progress.emit(msg)
+                elif isinstance(msg, dict) and msg.get("type") == "overdue":
+                    self.progress.emit({"host_id": h["id"], "name": name, "lines": [_overdue_text(msg)]})
+                elif isinstance(msg, dict) and msg.get("type") in ("stall", "resumed"):
+                    self.stalled.emit({**msg, "name": name})
+                elif isinstance(msg, dict) and msg.get("type") == "result":
+                    lines.flush(h)
+                    res = msg["result"] or {}
+                    res.update({"host_id": h["id"], "name": name})
+                    self.host_done.emit(res)
+
+        executor.run(_job())
+        self.finished_all.emit()
+
+
+class _RestartWorker(QtCore.QThread):
+    one_result = QtCore.pyqtSignal(dict)
+    finished_all = QtCore.pyqtSignal()
+
+    def __init__(self, host_ids: list[int]):
+        super().__init__()
+        self.host_ids = host_ids
+
+    def run(self):
+        from .core import db, ssh_client, executor
+
+        hosts = [h for h in db.list_hosts() if h["id"] in self.host_ids]
+
+        async def _job():
+            async for h, res in executor.FanOut(hosts, ssh_client.restart_services_for_host, kind="restart"):
+                if isinstance(res, Exception):
+                    res = executor.error_result(h, str(res))
+                self.one_result.emit(res)
 
-        asyncio.run(_job())
+        executor.run(_job())
         self.finished_all.emit()
 
 
@@ -1308,38 +1793,22 @@ class _RebootWorker(QtCore.QThread):
     host_done = QtCore.pyqtSignal(dict)
     finished_all = QtCore.pyqtSignal()
 
-    def __init__(self, host_ids: list[int] | None = None):
+    def __init__(self, host_ids: list[int] | None = None, wait: bool = False, fast: bool = False):
         super().__init__()
         self.host_ids = host_ids or []
+        self.wait = wait
+        self.fast = fast
 
     def run(self):
-        from .core import db, ssh_client
-        import asyncio
+        from .core import db, executor, reboot
 
         all_hosts = db.list_hosts()
         hosts = [h for h in all_hosts if not self.host_ids or h["id"] in self.host_ids]
 
         async def _job():
-            for h in hosts:
-                try:
-                    res = await ssh_client.reboot_host(h)
-                    res.setdefault("host_id", h["id"])
-                    self.host_done.emit(res)
-                except Exception as ex:
-                    self.host_done.emit(
-                        {
-                            "host_id": h["id"],
-                            "name": h.get("name", "?"),
-                            "status": "error",
-                            "note": f"Reboot-Fehler: {ex}",
-                        }
-                    )
+            async for h, res in reboot.reboot_fleet(hosts, wait=self.wait, fast=self.fast):
+                self.host_done.emit(res)
 
-        loop = asyncio.new_event_loop()
-        try:
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(_job())
-        finally:
-            loop.close()
+        executor.run(_job())
 
         self.finished_all.emit()